@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from learnhub.authcache import check_shared_caches
+        from . import signals  # noqa: F401
+        check_shared_caches()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from learnhub.authcache import metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = 'Report session and user cache hit rates and the database round trips they saved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting')
+
+    def handle(self, *args, **options):
+        totals = metrics()
+        for label, loads, hits in (
+            ('sessions', totals['session_loads'], totals['session_hits']),
+            ('users', totals['user_loads'], totals['user_hits']),
+        ):
+            rate = hits / loads * 100 if loads else 0.0
+            self.stdout.write(f'{label:9} {loads:10} loads {hits:10} cache hits ({rate:5.1f}%)')
+        self.stdout.write(
+            f"users     {totals['user_local_hits']:10} local {totals['user_shared_hits']:10} shared "
+            f"{totals['user_db_loads']:10} database"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Database round trips saved: {totals['db_round_trips_saved']}"))
+        if options['reset']:
+            reset_metrics()
@@ -0,0 +1,37 @@
+### accounts/signals.py
+
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from learnhub.authcache import forget_local_user, invalidate_user, store_user, user_values
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+def write_through_cached_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    user_id = instance.pk
+    # Don't serve this worker's copy while the transaction is open
+    forget_local_user(user_id)
+    if update_fields is None:
+        # A full save wrote every field (profile edits, password changes)
+        values = user_values(instance)
+        transaction.on_commit(lambda: store_user(user_id, values))
+    else:
+        # Fields not saved may be older in memory than in the row
+        transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_delete, sender=CustomUser)
+def drop_deleted_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(user_logged_out)
+def drop_logged_out_cached_user(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
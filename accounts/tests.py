@@ -1,3 +1,140 @@
-from django.test import TestCase
+from http.cookies import SimpleCookie
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses.models import Course, CourseStats, Topic
+from courses.tests import HOLD_BUFFERED_WRITES, make_catalogue
+from learnhub import authcache
+from learnhub.instrumentation import QueryBudgetMixin
+from videos.progress import rebuild_course_progress
+from .models import CustomUser
+
+
+class TeacherDashboardTests(TestCase):
+
+    def setUp(self):
+        # Cached users are written on commit, which a TestCase never does
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        topic = Topic.objects.create(name='Python')
+        self.course = Course.objects.create(title='Django', description='d', teacher=self.teacher, topic=topic)
+        self.client.force_login(self.teacher)
+
+    def test_course_without_stats_row(self):
+        CourseStats.objects.filter(course=self.course).delete()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_videos'], 0)
+        self.assertEqual(response.context['total_students'], 0)
+
+
+@override_settings(**HOLD_BUFFERED_WRITES)
+class DashboardBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher, self.student = make_catalogue()
+        rebuild_course_progress()
+
+    def test_student_dashboard(self):
+        self.client.force_login(self.student)
+        with self.assertQueryBudget(8):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['course_progress']), 6)
+
+    def test_teacher_dashboard(self):
+        self.client.force_login(self.teacher)
+        with self.assertQueryBudget(7):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_videos'], 30)
+
+
+class AuthCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        authcache.reset_metrics()
+        self.user = CustomUser.objects.create_user('student', password='pw')
+        self.client.force_login(self.user)
+
+    def auth_queries(self, url='/courses/topics/'):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return [q['sql'] for q in queries if 'accounts_customuser' in q['sql'] or 'django_session' in q['sql']]
+
+    def test_session_and_user_come_from_the_cache(self):
+        self.auth_queries()
+        self.assertEqual(self.auth_queries(), [])
+        totals = authcache.metrics()
+        self.assertEqual(totals['session_db_loads'], 0)
+        self.assertGreaterEqual(totals['db_round_trips_saved'], 3)
+
+        out = StringIO()
+        call_command('auth_cache_stats', reset=True, stdout=out)
+        self.assertIn(f"Database round trips saved: {totals['db_round_trips_saved']}", out.getvalue())
+        self.assertEqual(authcache.metrics()['db_round_trips_saved'], 0)
+
+    @override_settings(AUTH_USER_LOCAL_TIMEOUT=0)
+    def test_full_saves_write_through(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Ada'
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(authcache.build_user(authcache.cached_user_values(self.user.pk)).first_name, 'Ada')
+
+    @override_settings(AUTH_USER_LOCAL_TIMEOUT=0)
+    def test_partial_saves_invalidate(self):
+        authcache.cached_user_values(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Ada'
+            self.user.save(update_fields=['first_name'])
+        with self.assertNumQueries(1):
+            self.assertEqual(authcache.build_user(authcache.cached_user_values(self.user.pk)).first_name, 'Ada')
+
+
+@override_settings(AUTH_USER_LOCAL_TIMEOUT=0)
+class SharedAuthCacheTests(TestCase):
+    """Sign-outs reach a second client whichever worker serves it."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('student', password='pw')
+        self.client.force_login(self.user)
+        self.other = Client()
+
+    def assertSignedIn(self, client, signed_in=True):
+        response = client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200 if signed_in else 302)
+
+    def test_logout_ends_the_session_for_every_client(self):
+        self.other.cookies = SimpleCookie(self.client.cookies)
+        self.assertSignedIn(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('logout'))
+        self.assertSignedIn(self.other, False)
+
+    def test_password_change_signs_out_other_sessions(self):
+        self.other.login(username='student', password='pw')
+        self.assertSignedIn(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new password')
+            self.user.save()
+        self.assertSignedIn(self.other, False)
+        self.assertTrue(self.other.login(username='student', password='new password'))
+        self.assertSignedIn(self.other)
+
+    def test_workers_refuse_a_process_local_cache(self):
+        with override_settings(WEB_CONCURRENCY=2), self.assertRaisesMessage(ImproperlyConfigured, 'REDIS_URL'):
+            authcache.check_shared_caches()
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                             'LOCATION': 'redis://localhost:6379/0'}}
+        for overrides in ({'WEB_CONCURRENCY': 1}, {'WEB_CONCURRENCY': 2, 'CACHES': redis}):
+            with override_settings(**overrides):
+                authcache.check_shared_caches()
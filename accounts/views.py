@@ -5,8 +5,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login
 from django.contrib import messages
 from .forms import CustomUserCreationForm
+from analytics.dashboard import teacher_dashboard
+from analytics.recommendations import recommended_for
+from analytics.trending import top_courses
 from courses.models import Course
-from videos.models import Bookmark
+from videos.models import Bookmark, CourseProgress
 
 def register_view(request):
     if request.method == 'POST':
@@ -25,20 +28,24 @@ def dashboard_view(request):
     context = {}
     
     if request.user.is_teacher():
-        # Teacher dashboard
-        my_courses = Course.objects.filter(teacher=request.user)
-        context.update({
-            'my_courses': my_courses,
-            'total_courses': my_courses.count(),
-            'total_videos': sum(course.videos.count() for course in my_courses)
-        })
+        # Teacher dashboard - a fixed number of queries however many courses
+        context.update(teacher_dashboard(request.user))
         template = 'accounts/teacher_dashboard.html'
     else:
         # Student dashboard
         bookmarked_videos = Bookmark.objects.filter(user=request.user).select_related('video', 'video__course')
-        recent_courses = Course.objects.all()[:6]
+        # Precomputed leaderboard; newest courses until one has been computed
+        trending_courses = top_courses('trending')
+        recent_courses = [] if trending_courses else Course.objects.select_related('teacher', 'stats')[:6]
+        # Per-course rollup, newest first, off the (user, -last_watched) index
+        course_progress = (CourseProgress.objects.filter(user=request.user)
+                           .select_related('course', 'course__stats', 'last_video')
+                           .order_by('-last_watched')[:6])
         context.update({
             'bookmarked_videos': bookmarked_videos,
+            'course_progress': course_progress,
+            'trending_courses': trending_courses,
+            'recommended_courses': recommended_for(request.user),
             'recent_courses': recent_courses,
             'total_bookmarks': bookmarked_videos.count()
         })
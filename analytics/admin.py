@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import Leaderboard, RollupCheckpoint, ViewRollup
+
+
+@admin.register(ViewRollup)
+class ViewRollupAdmin(admin.ModelAdmin):
+    list_display = ('granularity', 'bucket', 'course', 'video', 'views')
+    list_filter = ('granularity',)
+    raw_id_fields = ('course', 'video')
+
+
+admin.site.register(RollupCheckpoint)
+
+
+@admin.register(Leaderboard)
+class LeaderboardAdmin(admin.ModelAdmin):
+    list_display = ('key', 'computed_at')
+    search_fields = ('key',)
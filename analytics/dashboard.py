@@ -0,0 +1,125 @@
+### analytics/dashboard.py
+
+"""
+Data for the teacher analytics dashboard.
+
+Everything a teacher sees is loaded with a fixed number of queries however
+many courses they own: one over their courses with per-course aggregates
+attached as correlated subqueries (so comments and ratings can't multiply
+each other's rows the way chained joins would), and the daily views from
+the rollups in analytics/rollups.py.
+"""
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from courses.counters import pending_views
+from courses.models import Course
+from ratings.models import CourseRating
+from videos.models import Comment, VideoProgress
+from .rollups import buckets, view_counts
+from .trending import ranks
+
+
+def _per_course(queryset, course_path, aggregate, output_field):
+    """Correlated subquery computing ``aggregate`` for the outer course."""
+    subquery = (queryset
+                .filter(**{course_path: OuterRef('pk')})
+                .order_by()
+                .values(course_path)
+                .annotate(value=aggregate)
+                .values('value'))
+    return Coalesce(Subquery(subquery, output_field=output_field), Value(0), output_field=output_field)
+
+
+def teacher_courses(teacher):
+    """The teacher's courses, each annotated with its engagement numbers."""
+    courses = (Course.objects
+               .filter(teacher=teacher)
+               .select_related('stats', 'topic')
+               .annotate(
+                   # Courses made before CourseStats existed may have no stats row
+                   video_count=Coalesce('stats__video_count', Value(0)),
+                   student_count=Coalesce('stats__student_count', Value(0)),
+                   comment_count=_per_course(Comment.objects, 'video__course', Count('pk'), IntegerField()),
+                   rating_count=_per_course(CourseRating.objects, 'course', Count('pk'), IntegerField()),
+                   rating_avg=_per_course(CourseRating.objects, 'course', Avg('rating'), FloatField()),
+                   started_count=_per_course(VideoProgress.objects, 'video__course', Count('pk'), IntegerField()),
+                   completed_count=_per_course(
+                       VideoProgress.objects, 'video__course', Count('pk', filter=Q(completed=True)), IntegerField()
+                   ),
+               )
+               .order_by('-created_at'))
+    courses = list(courses)
+    pending = pending_views(Course, [course.pk for course in courses])
+    for course in courses:
+        course.total_views = course.view_count + pending.get(course.pk, 0)
+        # Share of started videos that were watched to the end
+        course.completion_rate = (
+            round(100 * course.completed_count / course.started_count) if course.started_count else None
+        )
+    return courses
+
+
+@dataclass
+class ViewsSeries:
+    days: list
+    totals: list
+    by_course: dict = field(default_factory=dict)
+
+    @property
+    def peak(self):
+        return max(self.totals, default=0)
+
+    @property
+    def bars(self):
+        """``(day, views, height %)`` triples for the bar chart."""
+        peak = self.peak or 1
+        return [(day, views, round(100 * views / peak)) for day, views in zip(self.days, self.totals)]
+
+
+def views_over_time(teacher, days=30):
+    """Daily course page views of the teacher's courses over the last ``days`` days."""
+    end = timezone.now()
+    calendar = buckets(end - timedelta(days=days - 1), end)
+    index = {day: position for position, day in enumerate(calendar)}
+
+    totals = [0] * len(calendar)
+    by_course = {}
+    counts = view_counts(calendar[0], end, 'day', courses=Course.objects.filter(teacher=teacher).values('pk'))
+    for (course_id, day), views in counts.items():
+        totals[index[day]] += views
+        by_course.setdefault(course_id, [0] * len(calendar))[index[day]] += views
+    return ViewsSeries(days=calendar, totals=totals, by_course=by_course)
+
+
+def teacher_dashboard(teacher, days=30):
+    courses = teacher_courses(teacher)
+    series = views_over_time(teacher, days)
+    trending = ranks('trending')
+    for course in courses:
+        course.recent_views = sum(series.by_course.get(course.pk, ()))
+        course.trending_rank = trending.get(course.pk)
+    started = sum(course.started_count for course in courses)
+    completed = sum(course.completed_count for course in courses)
+    ratings = sum(course.rating_count for course in courses)
+    return {
+        'my_courses': courses,
+        'views_series': series,
+        'total_courses': len(courses),
+        'total_videos': sum(course.video_count for course in courses),
+        'total_students': sum(course.student_count for course in courses),
+        'total_views': sum(course.total_views for course in courses),
+        'recent_views': sum(series.totals),
+        'total_comments': sum(course.comment_count for course in courses),
+        'average_rating': (
+            sum(course.rating_avg * course.rating_count for course in courses) / ratings if ratings else None
+        ),
+        'completion_rate': round(100 * completed / started) if started else None,
+        'chart_days': days,
+        'trending_count': sum(1 for course in courses if course.trending_rank),
+    }
@@ -0,0 +1,65 @@
+### analytics/events.py
+
+"""
+Buffered writes to the append-only ``ViewEvent`` log.
+
+Views are kept in a per-worker list and inserted with one ``bulk_create``
+when it reaches ``VIEW_EVENT_FLUSH_THRESHOLD`` events or is older than
+``VIEW_EVENT_FLUSH_INTERVAL`` seconds. Each event keeps the time it was
+recorded, so buffering doesn't move views into a later hour.
+"""
+
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ViewEvent
+
+_buffer = []
+_lock = threading.Lock()
+_state = {'last_flush': time.monotonic()}
+
+
+def record_event(course_id, video_id=None, user_id=None):
+    """Log one view of a course page (or of ``video_id`` in that course)."""
+    with _lock:
+        _buffer.append(ViewEvent(
+            course_id=course_id,
+            video_id=video_id,
+            user_id=user_id,
+            created_at=timezone.now(),
+        ))
+        due = (
+            len(_buffer) >= getattr(settings, 'VIEW_EVENT_FLUSH_THRESHOLD', 500)
+            or time.monotonic() - _state['last_flush'] >= getattr(settings, 'VIEW_EVENT_FLUSH_INTERVAL', 10)
+        )
+    if due:
+        flush()
+
+
+def flush():
+    """Insert buffered events; returns the number written."""
+    with _lock:
+        batch = list(_buffer)
+        _buffer.clear()
+        _state['last_flush'] = time.monotonic()
+    if not batch:
+        return 0
+    try:
+        ViewEvent.objects.bulk_create(batch, batch_size=1000)
+    except Exception:
+        with _lock:
+            _buffer[:0] = batch
+        raise
+    return len(batch)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
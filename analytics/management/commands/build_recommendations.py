@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.recommendations import build_similarities
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the item-to-item course similarity table used for recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help='Neighbours kept per course')
+        parser.add_argument('--memory-mb', type=int, help='Memory budget for each similarity block')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        courses, rows = build_similarities(options['top_k'], options['memory_mb'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} similarities for {courses} courses in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from analytics import events
+from analytics.rollups import compact, prune
+
+
+class Command(BaseCommand):
+    help = 'Fold raw view events into hourly/daily rollups and prune expired history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50_000, help='Events folded per transaction')
+        parser.add_argument('--no-prune', action='store_true', help='Only compact, keep expired rows')
+
+    def handle(self, *args, **options):
+        events.flush()
+        folded = compact(options['batch_size'])
+        self.stdout.write(f'Folded {folded} view events into rollups')
+        if not options['no_prune']:
+            deleted_events, deleted_hourly = prune()
+            self.stdout.write(f'Pruned {deleted_events} raw events and {deleted_hourly} hourly rollups')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import compact
+from analytics.trending import compute_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending and popular course leaderboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-compact', action='store_true',
+                            help='Skip folding new view events into the rollups first')
+
+    def handle(self, *args, **options):
+        if not options['no_compact']:
+            compact()
+        boards = compute_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f'Stored {boards} leaderboards'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('courses', '0005_course_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='courses.course')),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('course', 'day'), name='unique_course_day_views')],
+            },
+        ),
+    ]
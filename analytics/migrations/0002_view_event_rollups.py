@@ -0,0 +1,83 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:36
+
+from datetime import datetime, time
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_daily_views(apps, schema_editor):
+    """Carry the course views per day over as daily course rollups."""
+    CourseDailyViews = apps.get_model('analytics', 'CourseDailyViews')
+    ViewRollup = apps.get_model('analytics', 'ViewRollup')
+    rows = CourseDailyViews.objects.iterator(chunk_size=2000)
+    ViewRollup.objects.bulk_create(
+        (ViewRollup(
+            granularity='day',
+            bucket=timezone.make_aware(datetime.combine(row.day, time.min)),
+            course_id=row.course_id,
+            views=row.views,
+        ) for row in rows),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('courses', '0005_course_keyset_indexes'),
+        ('videos', '0004_media_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ViewEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('course', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='courses.course')),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('video', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='videos.video')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='courses.course')),
+                ('video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='videos.video')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='viewrollup',
+            index=models.Index(fields=['granularity', 'bucket'], name='view_rollup_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='viewrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('video__isnull', True)), fields=('granularity', 'course', 'bucket'), name='unique_course_view_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='viewrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('video__isnull', False)), fields=('granularity', 'video', 'bucket'), name='unique_video_view_rollup'),
+        ),
+        migrations.RunPython(copy_daily_views, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='CourseDailyViews',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_leaderboard'),
+        ('courses', '0005_course_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_courses', to='courses.course')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='courses.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'rank'), name='unique_course_similarity_rank')],
+            },
+        ),
+    ]
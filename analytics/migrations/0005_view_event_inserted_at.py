@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_course_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='viewevent',
+            name='inserted_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.db import models
+from courses.models import Course
+from videos.models import Video
+
+
+class ViewEvent(models.Model):
+    """
+    Append-only log of course page and video views. Rows are only ever
+    inserted, folded into ``ViewRollup`` by ``compact_view_events`` and
+    deleted once older than ``VIEW_EVENT_RETENTION_DAYS``.
+    """
+    # No constraints or cascades: deleting a course must not have to scan
+    # the log, and compaction skips events whose course or video is gone
+    course = models.ForeignKey(Course, on_delete=models.DO_NOTHING, related_name='+',
+                               db_constraint=False, db_index=False)
+    video = models.ForeignKey(Video, on_delete=models.DO_NOTHING, related_name='+', null=True, blank=True,
+                              db_constraint=False, db_index=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, related_name='+',
+                             null=True, blank=True, db_constraint=False, db_index=False)
+    created_at = models.DateTimeField(db_index=True)
+    # When the row was written, which can be well after the view; compaction
+    # lags behind this so ids taken by still-open inserts aren't skipped
+    inserted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        target = f"video {self.video_id}" if self.video_id else f"course {self.course_id}"
+        return f"View of {target} at {self.created_at}"
+
+
+class ViewRollup(models.Model):
+    """
+    View counts per hour or day. Rows with no video count course page views;
+    rows with a video count views of that video.
+    """
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hourly'),
+        ('day', 'Daily'),
+    ]
+
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='view_rollups')
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='view_rollups', null=True, blank=True)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs never conflict in a unique index, so course and video rows
+            # each get their own partial constraint
+            models.UniqueConstraint(
+                fields=['granularity', 'course', 'bucket'],
+                condition=models.Q(video__isnull=True),
+                name='unique_course_view_rollup',
+            ),
+            models.UniqueConstraint(
+                fields=['granularity', 'video', 'bucket'],
+                condition=models.Q(video__isnull=False),
+                name='unique_video_view_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='view_rollup_bucket_idx'),
+        ]
+
+    def __str__(self):
+        target = f"video {self.video_id}" if self.video_id else f"course {self.course_id}"
+        return f"{target} {self.granularity} {self.bucket}: {self.views} views"
+
+
+class RollupCheckpoint(models.Model):
+    """Highest ``ViewEvent`` id already folded into the rollups."""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} at event {self.last_event_id}"
+
+
+class Leaderboard(models.Model):
+    """
+    Precomputed top-N courses for one board ('trending' or 'popular'),
+    either global or per topic, as ``[[course_id, score], ...]``. Written by
+    ``compute_trending`` and served through the cache by analytics/trending.py.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    entries = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} ({len(self.entries)} courses)"
+
+
+class CourseSimilarity(models.Model):
+    """
+    Precomputed "students who took this also took" neighbours of a course,
+    rebuilt by ``build_recommendations``.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='similar_courses')
+    similar = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'rank'], name='unique_course_similarity_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} ~ {self.similar_id} ({self.score:.3f})"
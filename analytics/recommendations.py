@@ -0,0 +1,206 @@
+### analytics/recommendations.py
+
+"""
+Offline item-to-item course recommendations ("students who took this also
+took").
+
+``build_similarities`` (run by the ``build_recommendations`` command) turns
+bookmarks, watch progress and ratings into a sparse user x course matrix,
+computes the cosine similarity between courses block by block with NumPy,
+and stores the top ``RECOMMENDATIONS_TOP_K`` neighbours of every course in
+``CourseSimilarity``. Pages read them back with a single indexed query.
+
+A block of courses costs a dense ``block x n_courses`` score matrix plus
+one entry per (course, user, other course of that user) triple expanded on
+the way there, so blocks are cut wherever the two together would pass
+``RECOMMENDATIONS_BLOCK_MEMORY_MB``: popular courses, whose students took
+many others, get smaller blocks. The interaction matrix itself is only held
+in CSR/CSC form.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from courses.models import Course
+from ratings.models import CourseRating
+from videos.models import Bookmark, VideoProgress
+from .models import CourseSimilarity
+
+DEFAULT_WEIGHTS = {'progress': 1.0, 'completion': 1.0, 'bookmark': 1.0, 'rating': 1.0}
+# Bytes per dense score: the block row plus bincount's working copy
+SCORE_BYTES = 8 * 2
+# Bytes per expanded triple: the int64/float64 arrays co_occurrence builds
+# (offsets, targets, keys, products and their repeat() inputs)
+TRIPLE_BYTES = 8 * 7
+
+
+def _weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'RECOMMENDATIONS_WEIGHTS', {})}
+
+
+def interactions():
+    """``{(user_id, course_id): strength}`` from every engagement signal."""
+    weights = _weights()
+    strength = defaultdict(float)
+    progress = (VideoProgress.objects.values_list('user_id', 'video__course_id')
+                .annotate(completed=Count('pk', filter=Q(completed=True)))
+                .order_by())
+    for user_id, course_id, completed in progress:
+        strength[user_id, course_id] += weights['progress'] + (weights['completion'] if completed else 0)
+    bookmarks = Bookmark.objects.values_list('user_id', 'video__course_id').distinct()
+    for user_id, course_id in bookmarks:
+        strength[user_id, course_id] += weights['bookmark']
+    # Low ratings still show interest in the subject, just less of it
+    for user_id, course_id, rating in CourseRating.objects.values_list('user_id', 'course_id', 'rating'):
+        strength[user_id, course_id] += weights['rating'] * rating / 5
+    return strength
+
+
+class InteractionMatrix:
+    """A user x course matrix held both row-wise (CSR) and column-wise (CSC)."""
+
+    def __init__(self, strength):
+        pairs = np.array(list(strength), dtype=np.int64).reshape(-1, 2)
+        values = np.fromiter(strength.values(), dtype=np.float64, count=len(strength))
+        self.user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+        self.course_ids, courses = np.unique(pairs[:, 1], return_inverse=True)
+        self.n_users, self.n_courses = len(self.user_ids), len(self.course_ids)
+
+        # CSR: the courses (and strengths) of each user
+        order = np.lexsort((courses, users))
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(users, minlength=self.n_users))))
+        self.row_courses, self.row_values = courses[order], values[order]
+        # CSC: the users (and strengths) of each course
+        order = np.lexsort((users, courses))
+        self.col_ptr = np.concatenate(([0], np.cumsum(np.bincount(courses, minlength=self.n_courses))))
+        self.col_users, self.col_values = users[order], values[order]
+
+        self.norms = np.sqrt(np.bincount(courses, weights=values ** 2, minlength=self.n_courses))
+
+    def co_occurrence(self, start, stop):
+        """
+        Dense ``(stop - start) x n_courses`` block of XᵀX: the summed products
+        of strengths over the users two courses share.
+        """
+        block = stop - start
+        lo, hi = self.col_ptr[start], self.col_ptr[stop]
+        users, left = self.col_users[lo:hi], self.col_values[lo:hi]
+        local = np.repeat(np.arange(block), np.diff(self.col_ptr[start:stop + 1]))
+
+        # Expand every (course in block, user) pair to all of that user's courses
+        lengths = self.row_ptr[users + 1] - self.row_ptr[users]
+        offsets = np.repeat(self.row_ptr[users] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        targets = self.row_courses[offsets]
+        products = np.repeat(left, lengths) * self.row_values[offsets]
+        keys = np.repeat(local, lengths) * self.n_courses + targets
+        return np.bincount(keys, weights=products, minlength=block * self.n_courses).reshape(block, self.n_courses)
+
+    def blocks(self, memory_bytes):
+        """
+        Yield ``(start, stop)`` course ranges whose ``co_occurrence`` fits in
+        ``memory_bytes`` (a single course always makes a block).
+        """
+        # Triples expanded for the courses before each column, from the
+        # users' row lengths: cumulative over col_users, cut at col_ptr
+        per_user = np.diff(self.row_ptr)[self.col_users]
+        triples = np.concatenate(([0], np.cumsum(per_user)))[self.col_ptr]
+        cost = np.arange(self.n_courses + 1) * (self.n_courses * SCORE_BYTES) + triples * TRIPLE_BYTES
+        start = 0
+        while start < self.n_courses:
+            stop = int(np.searchsorted(cost, cost[start] + memory_bytes, side='right')) - 1
+            stop = min(max(stop, start + 1), self.n_courses)
+            yield start, stop
+            start = stop
+
+    def similar(self, top_k, memory_bytes):
+        """Yield ``(course_id, [(similar_id, score), ...])`` best first."""
+        k = min(top_k, self.n_courses - 1)
+        if k <= 0:
+            return
+        norms = np.where(self.norms > 0, self.norms, 1.0)
+        for start, stop in self.blocks(memory_bytes):
+            scores = self.co_occurrence(start, stop)
+            scores /= norms[start:stop, None]
+            scores /= norms[None, :]
+            scores[np.arange(stop - start), np.arange(start, stop)] = 0  # not similar to itself
+
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, best, axis=1)
+            order = np.argsort(-best_scores, axis=1)
+            best = np.take_along_axis(best, order, axis=1)
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            for row in range(stop - start):
+                keep = best_scores[row] > 0
+                yield int(self.course_ids[start + row]), [
+                    (int(self.course_ids[j]), float(s)) for j, s in zip(best[row][keep], best_scores[row][keep])
+                ]
+
+
+def build_similarities(top_k=None, memory_mb=None):
+    """Recompute ``CourseSimilarity``; returns ``(courses, rows)`` written."""
+    top_k = top_k or getattr(settings, 'RECOMMENDATIONS_TOP_K', 10)
+    memory_mb = memory_mb or getattr(settings, 'RECOMMENDATIONS_BLOCK_MEMORY_MB', 64)
+    strength = interactions()
+    if not strength:
+        CourseSimilarity.objects.all().delete()
+        return 0, 0
+
+    matrix = InteractionMatrix(strength)
+    del strength
+    live = set(Course.objects.values_list('pk', flat=True))
+
+    courses = written = 0
+    with transaction.atomic():
+        CourseSimilarity.objects.all().delete()
+        batch = []
+        for course_id, neighbours in matrix.similar(top_k, memory_mb * 1024 * 1024):
+            neighbours = [(pk, score) for pk, score in neighbours if pk in live]
+            if course_id not in live or not neighbours:
+                continue
+            courses += 1
+            for rank, (similar_id, score) in enumerate(neighbours, start=1):
+                batch.append(CourseSimilarity(course_id=course_id, similar_id=similar_id, score=score, rank=rank))
+            if len(batch) >= 5000:
+                CourseSimilarity.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        CourseSimilarity.objects.bulk_create(batch)
+        written += len(batch)
+    return courses, written
+
+
+def similar_courses(course, limit=4):
+    """Stored neighbours of ``course``, best first, in one indexed query."""
+    rows = (CourseSimilarity.objects
+            .filter(course=course, rank__lte=limit, similar__is_active=True)
+            .select_related('similar__teacher', 'similar__topic', 'similar__stats')
+            .order_by('rank'))
+    return [row.similar for row in rows]
+
+
+def recommended_for(user, limit=6):
+    """
+    Courses most similar to those ``user`` engaged with, excluding those, in
+    three queries.
+    """
+    seen_ids = list(
+        VideoProgress.objects.filter(user=user).values_list('video__course_id', flat=True)
+        .union(Bookmark.objects.filter(user=user).values_list('video__course_id', flat=True),
+               CourseRating.objects.filter(user=user).values_list('course_id', flat=True))
+    )
+    if not seen_ids:
+        return []
+    ranked = (CourseSimilarity.objects
+              .filter(course_id__in=seen_ids)
+              .exclude(similar_id__in=seen_ids)
+              .values('similar_id')
+              .annotate(total=Sum('score'))
+              .order_by('-total', 'similar_id')
+              .values_list('similar_id', flat=True)[:limit])
+    ranked = list(ranked)
+    courses = Course.objects.select_related('teacher', 'topic', 'stats').in_bulk(ranked)
+    return [courses[pk] for pk in ranked if pk in courses and courses[pk].is_active]
@@ -0,0 +1,194 @@
+### analytics/rollups.py
+
+"""
+Compaction of the ``ViewEvent`` log into ``ViewRollup`` rows, and the
+time-range queries served from them.
+
+Compaction works from an id watermark (``RollupCheckpoint``) rather than a
+time cut-off, so events flushed late by a worker are still counted, into the
+hour they happened in. Ids are handed out when a row is inserted but become
+visible when its transaction commits, so an insert can commit below ids
+that are already visible. The watermark therefore only moves up to events
+inserted more than ``VIEW_EVENT_COMPACTION_LAG`` seconds ago, longer than
+any insert runs; newer ones stay in the uncompacted tail. Reads combine the rollups with the few raw events
+above the watermark, so figures are current between compaction runs without
+ever scanning the full log.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from courses.models import Course
+from videos.models import Video
+from .models import RollupCheckpoint, ViewEvent, ViewRollup
+
+CHECKPOINT = 'view-events'
+TRUNCATE = {'hour': TruncHour, 'day': TruncDay}
+
+
+def truncate(moment, granularity):
+    """Start of the hour/day (in the current time zone) containing ``moment``."""
+    moment = timezone.localtime(moment)
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _watermark():
+    return RollupCheckpoint.objects.filter(name=CHECKPOINT).values_list('last_event_id', flat=True).first() or 0
+
+
+def _add_views(granularity, counts):
+    """Add ``{(course_id, video_id, bucket): views}`` to the rollup rows."""
+    # Create missing rows at zero, then increment with F(), so the rows are
+    # only ever added to; one UPDATE per (bucket, delta, kind) group
+    ViewRollup.objects.bulk_create(
+        [ViewRollup(granularity=granularity, course_id=course_id, video_id=video_id, bucket=bucket)
+         for course_id, video_id, bucket in counts],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    groups = defaultdict(list)
+    for (course_id, video_id, bucket), views in counts.items():
+        if video_id is None:
+            groups[bucket, views, 'course'].append(course_id)
+        else:
+            groups[bucket, views, 'video'].append(video_id)
+    rollups = ViewRollup.objects.filter(granularity=granularity)
+    for (bucket, views, kind), ids in groups.items():
+        if kind == 'course':
+            target = rollups.filter(bucket=bucket, video__isnull=True, course_id__in=ids)
+        else:
+            target = rollups.filter(bucket=bucket, video_id__in=ids)
+        target.update(views=F('views') + views)
+
+
+def compact(batch_size=50_000):
+    """
+    Fold events above the watermark into hourly and daily rollups, in
+    batches of ``batch_size`` events. Returns the number of events folded.
+    """
+    folded = 0
+    settled = timezone.now() - timedelta(seconds=getattr(settings, 'VIEW_EVENT_COMPACTION_LAG', 300))
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+            start = checkpoint.last_event_id
+            pending = ViewEvent.objects.filter(pk__gt=start, inserted_at__lt=settled)
+            end = next(iter(pending.order_by('pk').values_list('pk', flat=True)[batch_size - 1:batch_size]), None)
+            if end is None:
+                end = pending.aggregate(last=Max('pk'))['last']
+            if end is None:
+                return folded
+
+            events = ViewEvent.objects.filter(pk__gt=start, pk__lte=end)
+            # Views of courses or videos deleted since are dropped here
+            live = events.filter(course_id__in=Course.objects.values('pk')).filter(
+                Q(video__isnull=True) | Q(video_id__in=Video.objects.values('pk'))
+            )
+            tz = timezone.get_current_timezone()
+            for granularity, trunc in TRUNCATE.items():
+                rows = (live.annotate(bucket=trunc('created_at', tzinfo=tz))
+                        .values_list('course_id', 'video_id', 'bucket')
+                        .annotate(views=Count('pk'))
+                        .order_by())
+                _add_views(granularity, {(c, v, b): n for c, v, b, n in rows})
+
+            folded += events.count()
+            checkpoint.last_event_id = end
+            checkpoint.save(update_fields=['last_event_id', 'updated_at'])
+
+
+def prune(now=None):
+    """
+    Delete compacted raw events older than ``VIEW_EVENT_RETENTION_DAYS`` and
+    hourly rollups older than ``VIEW_ROLLUP_HOURLY_RETENTION_DAYS``; daily
+    rollups are kept. Returns ``(events, hourly rows)`` deleted.
+    """
+    now = now or timezone.now()
+    event_cutoff = now - timedelta(days=getattr(settings, 'VIEW_EVENT_RETENTION_DAYS', 7))
+    hourly_cutoff = now - timedelta(days=getattr(settings, 'VIEW_ROLLUP_HOURLY_RETENTION_DAYS', 90))
+    # Never delete events the rollups haven't seen yet
+    events, _ = ViewEvent.objects.filter(pk__lte=_watermark(), created_at__lt=event_cutoff).delete()
+    hourly, _ = ViewRollup.objects.filter(granularity='hour', bucket__lt=hourly_cutoff).delete()
+    return events, hourly
+
+
+def _counts(rollups, events, key, granularity):
+    """
+    ``{(key, bucket): views}`` from ``rollups`` plus the ``events`` above the
+    watermark, read in one transaction. Under READ COMMITTED each query
+    still sees its own snapshot, so a compaction committing in between would
+    count the events it folded twice; the watermark is re-read afterwards
+    and the reads are retried if it moved.
+    """
+    tz = timezone.get_current_timezone()
+    while True:
+        # Reads only, so no savepoint is needed inside an outer transaction
+        with transaction.atomic(savepoint=False):
+            watermark = _watermark()
+            counts = defaultdict(int)
+            for target, bucket, views in rollups.values_list(key, 'bucket').annotate(views=Sum('views')).order_by():
+                counts[target, timezone.localtime(bucket)] += views
+            tail = (events.filter(pk__gt=watermark)
+                    .annotate(bucket=TRUNCATE[granularity]('created_at', tzinfo=tz))
+                    .values_list(key, 'bucket').annotate(views=Count('pk')).order_by())
+            for target, bucket, views in tail:
+                counts[target, timezone.localtime(bucket)] += views
+            if _watermark() == watermark:
+                return dict(counts)
+
+
+def view_counts(start, end, granularity='day', courses=None, videos=False):
+    """
+    View counts between ``start`` and ``end`` (datetimes, end exclusive) as
+    ``{(course_id, bucket): views}``, or ``{(video_id, bucket): views}`` when
+    ``videos`` is true. ``courses`` is an optional course queryset or id list.
+    """
+    start = truncate(start, granularity)
+    rollups = ViewRollup.objects.filter(
+        granularity=granularity, bucket__gte=start, bucket__lt=end, video__isnull=not videos,
+    )
+    events = ViewEvent.objects.filter(created_at__gte=start, created_at__lt=end, video__isnull=not videos)
+    if courses is not None:
+        rollups = rollups.filter(course_id__in=courses)
+        events = events.filter(course_id__in=courses)
+    return _counts(rollups, events, 'video_id' if videos else 'course_id', granularity)
+
+
+def course_views(start, granularity='hour'):
+    """
+    Course page and video views together since ``start``, as
+    ``{(course_id, bucket): views}``.
+    """
+    start = truncate(start, granularity)
+    rollups = ViewRollup.objects.filter(granularity=granularity, bucket__gte=start)
+    events = ViewEvent.objects.filter(created_at__gte=start)
+    return _counts(rollups, events, 'course_id', granularity)
+
+
+def buckets(start, end, granularity='day'):
+    """Every bucket start from ``start`` up to (excluding) ``end``."""
+    if granularity == 'hour':
+        # Step in UTC: wall-clock arithmetic on aware datetimes breaks at DST
+        current, result = truncate(start, 'hour').astimezone(dt_timezone.utc), []
+        while current < end:
+            result.append(timezone.localtime(current))
+            current += timedelta(hours=1)
+        return result
+    # Whole local days, built from dates so DST changes can't shift midnight
+    day, last = timezone.localtime(start).date(), timezone.localtime(end).date()
+    result = []
+    while day <= last:
+        midnight = timezone.make_aware(datetime.combine(day, time.min))
+        if midnight < end:
+            result.append(midnight)
+        day += timedelta(days=1)
+    return result
@@ -0,0 +1,136 @@
+import random
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from courses.models import Course, Topic
+from .models import ViewEvent, ViewRollup
+from . import rollups
+from .recommendations import SCORE_BYTES, TRIPLE_BYTES, InteractionMatrix
+from .rollups import _watermark, compact, prune, view_counts
+from .trending import compute_leaderboards, leaderboard, score_courses
+
+
+@override_settings(VIEW_EVENT_COMPACTION_LAG=300)
+class CompactionTests(TestCase):
+
+    def setUp(self):
+        teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        self.course = Course.objects.create(title='Django', description='d', teacher=teacher,
+                                            topic=Topic.objects.create(name='Python'))
+        self.now = timezone.now()
+
+    def log(self, inserted_ago):
+        event = ViewEvent.objects.create(course=self.course, created_at=self.now - timedelta(days=30))
+        ViewEvent.objects.filter(pk=event.pk).update(inserted_at=self.now - timedelta(seconds=inserted_ago))
+        return event
+
+    def course_views(self):
+        return sum(view_counts(self.now - timedelta(days=31), self.now).values())
+
+    def test_recent_inserts_stay_above_the_watermark(self):
+        settled = self.log(inserted_ago=600)
+        recent = self.log(inserted_ago=10)
+        self.assertEqual(compact(), 1)
+        self.assertEqual(_watermark(), settled.pk)
+        # The recent event is still counted, from the tail
+        self.assertEqual(self.course_views(), 2)
+
+        # Nothing above the watermark is pruned, however old its view is
+        prune(now=self.now)
+        self.assertTrue(ViewEvent.objects.filter(pk=recent.pk).exists())
+        ViewEvent.objects.filter(pk=recent.pk).update(inserted_at=self.now - timedelta(seconds=600))
+        self.assertEqual(compact(), 1)
+        self.assertEqual(self.course_views(), 2)
+        self.assertEqual(ViewRollup.objects.get(granularity='day', video=None).views, 2)
+
+    def test_a_compaction_between_reads_is_not_counted_twice(self):
+        self.log(inserted_ago=600)
+        real = rollups._watermark
+
+        def compact_after_reading():
+            watermark = real()
+            if not compacted:
+                compacted.append(compact())
+            return watermark
+
+        compacted = []
+        with mock.patch('analytics.rollups._watermark', side_effect=compact_after_reading):
+            self.assertEqual(self.course_views(), 1)
+        self.assertEqual(compacted, [1])
+
+
+@override_settings(VIEW_EVENT_COMPACTION_LAG=0, TRENDING_HALF_LIFE_HOURS=48)
+class TrendingTests(TestCase):
+
+    def setUp(self):
+        teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        topic = Topic.objects.create(name='Python')
+        self.courses = [Course.objects.create(title=f'Course {i}', description='d', teacher=teacher, topic=topic)
+                        for i in range(2)]
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def log(self, course, hours_ago, count=1):
+        ViewEvent.objects.bulk_create([ViewEvent(course=course, created_at=self.now - timedelta(hours=hours_ago))
+                                       for _ in range(count)])
+
+    def test_views_count_before_and_after_compaction(self):
+        first, second = self.courses
+        self.log(first, hours_ago=48, count=2)
+        compact()
+        # A half-life old, so each view counts half
+        self.log(first, hours_ago=48, count=2)
+        self.log(second, hours_ago=0)
+        scores = score_courses(self.now)
+        self.assertEqual((scores[first.pk], scores[second.pk]), (2, 1))
+        compact()
+        self.assertEqual(score_courses(self.now), scores)
+
+        compute_leaderboards(self.now)
+        self.assertEqual(leaderboard('trending'), [[first.pk, 2], [second.pk, 1]])
+
+
+class InteractionMatrixTests(TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        # Course 0 is taken by everyone, so its block expands far more triples
+        self.strength = {(user, 0): 1.0 for user in range(60)}
+        self.strength.update({(rng.randrange(60), rng.randrange(1, 40)): rng.uniform(0.5, 3) for _ in range(300)})
+        self.matrix = InteractionMatrix(self.strength)
+
+    def dense(self):
+        x = np.zeros((self.matrix.n_users, self.matrix.n_courses))
+        users = {pk: i for i, pk in enumerate(self.matrix.user_ids)}
+        courses = {pk: i for i, pk in enumerate(self.matrix.course_ids)}
+        for (user, course), value in self.strength.items():
+            x[users[user], courses[course]] = value
+        return x.T @ x
+
+    def test_blocks_are_sized_by_what_they_expand(self):
+        matrix = self.matrix
+        per_course = np.bincount(
+            np.repeat(np.arange(matrix.n_courses), np.diff(matrix.col_ptr)),
+            weights=np.diff(matrix.row_ptr)[matrix.col_users],
+        )
+        budget = 40 * matrix.n_courses * SCORE_BYTES
+        blocks = list(matrix.blocks(budget))
+        self.assertEqual([start for start, _ in blocks], [0] + [stop for _, stop in blocks[:-1]])
+        self.assertEqual(blocks[-1][1], matrix.n_courses)
+        for start, stop in blocks:
+            cost = (stop - start) * matrix.n_courses * SCORE_BYTES + per_course[start:stop].sum() * TRIPLE_BYTES
+            self.assertTrue(stop - start == 1 or cost <= budget, (start, stop))
+        # The course everyone took gets a smaller block than the rest
+        self.assertLess(blocks[0][1] - blocks[0][0], max(stop - start for start, stop in blocks[1:]))
+
+    def test_block_size_does_not_change_the_result(self):
+        expected = self.dense()
+        for memory in (1, 10_000, 10 ** 9):
+            blocks = [self.matrix.co_occurrence(start, stop) for start, stop in self.matrix.blocks(memory)]
+            np.testing.assert_allclose(np.vstack(blocks), expected)
+        self.assertEqual(len(list(self.matrix.blocks(1))), self.matrix.n_courses)
+        self.assertEqual(len(list(self.matrix.blocks(10 ** 9))), 1)
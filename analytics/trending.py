@@ -0,0 +1,162 @@
+### analytics/trending.py
+
+"""
+Trending and popular course leaderboards.
+
+``compute_leaderboards`` (run on a schedule by the ``compute_trending``
+command) scores every course from grouped aggregates over views, bookmarks,
+ratings and completions and stores the top ``TRENDING_TOP_N`` per topic and
+globally in ``Leaderboard`` rows:
+
+* ``trending`` weights each signal by ``0.5 ** (age / half-life)`` over the
+  last ``TRENDING_WINDOW_DAYS``, so recent engagement counts most;
+* ``popular`` uses lifetime totals without decay.
+
+Pages read a board with one cache lookup (one indexed query on a miss) plus
+one query for the courses themselves, however many courses exist.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from courses.models import Course
+from ratings.models import CourseRating
+from videos.models import Bookmark, VideoProgress
+from .models import Leaderboard
+from .rollups import course_views
+
+BOARDS = ('trending', 'popular')
+CACHE_PREFIX = 'leaderboard'
+
+DEFAULT_WEIGHTS = {'view': 1, 'bookmark': 5, 'rating': 3, 'completion': 8}
+
+
+def board_key(board, topic_id=None):
+    return f'{board}:topic:{topic_id}' if topic_id else f'{board}:all'
+
+
+def _cache_key(key):
+    return f'{CACHE_PREFIX}:{key}'
+
+
+def _weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_WEIGHTS', {})}
+
+
+def _signals(since=None):
+    """
+    Yield ``(signal, course_id, moment, amount)`` for engagement since
+    ``since``, bucketed by hour; ``moment`` is None when ``since`` is None
+    (lifetime totals, no bucketing).
+    """
+    tz = timezone.get_current_timezone()
+
+    def grouped(queryset, course_path, time_field, amount):
+        if since is not None:
+            queryset = queryset.filter(**{f'{time_field}__gte': since})
+            return (queryset.annotate(hour=TruncHour(time_field, tzinfo=tz))
+                    .values_list(course_path, 'hour').annotate(amount=amount).order_by())
+        return ((course_id, None, value) for course_id, value in
+                queryset.values_list(course_path).annotate(amount=amount).order_by())
+
+    if since is not None:
+        # Hourly, with the uncompacted tail of the log so views count at once
+        views = ((course_id, bucket, amount) for (course_id, bucket), amount in course_views(since).items())
+    else:
+        views = ((pk, None, count) for pk, count in Course.objects.values_list('pk', 'view_count') if count)
+    for course_id, moment, amount in views:
+        yield 'view', course_id, moment, amount
+    for course_id, moment, amount in grouped(Bookmark.objects, 'video__course_id', 'created_at', Count('pk')):
+        yield 'bookmark', course_id, moment, amount
+    # A five-star rating counts fully, a one-star rating a fifth as much
+    for course_id, moment, amount in grouped(CourseRating.objects, 'course_id', 'created_at', Sum('rating')):
+        yield 'rating', course_id, moment, amount / 5
+    completions = VideoProgress.objects.filter(completed=True)
+    for course_id, moment, amount in grouped(completions, 'video__course_id', 'last_watched', Count('pk')):
+        yield 'completion', course_id, moment, amount
+
+
+def score_courses(now=None, decay=True):
+    """``{course_id: score}`` for every course with any engagement."""
+    now = now or timezone.now()
+    weights = _weights()
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 48) * 3600
+    since = now - timedelta(days=getattr(settings, 'TRENDING_WINDOW_DAYS', 14)) if decay else None
+
+    scores = defaultdict(float)
+    for signal, course_id, moment, amount in _signals(since):
+        factor = 0.5 ** (max((now - moment).total_seconds(), 0) / half_life) if decay else 1
+        scores[course_id] += weights[signal] * amount * factor
+    return scores
+
+
+def _top(scores, course_ids, limit):
+    ranked = sorted(course_ids, key=lambda pk: (-scores[pk], -pk))[:limit]
+    return [[pk, round(scores[pk], 3)] for pk in ranked]
+
+
+def compute_leaderboards(now=None):
+    """Recompute and store every board; returns the number of boards written."""
+    limit = getattr(settings, 'TRENDING_TOP_N', 20)
+    by_topic = defaultdict(list)
+    active = []
+    for pk, topic_id in Course.objects.filter(is_active=True).values_list('pk', 'topic_id').iterator():
+        active.append(pk)
+        if topic_id:
+            by_topic[topic_id].append(pk)
+
+    boards = {}
+    for board in BOARDS:
+        scores = score_courses(now, decay=board == 'trending')
+        scored = [pk for pk in active if scores.get(pk)]
+        boards[board_key(board)] = _top(scores, scored, limit)
+        for topic_id, course_ids in by_topic.items():
+            entries = _top(scores, [pk for pk in course_ids if scores.get(pk)], limit)
+            if entries:
+                boards[board_key(board, topic_id)] = entries
+
+    stale = Leaderboard.objects.exclude(key__in=boards)
+    with transaction.atomic():
+        stale_keys = list(stale.values_list('key', flat=True))
+        stale.delete()
+        Leaderboard.objects.bulk_create(
+            [Leaderboard(key=key, entries=entries) for key, entries in boards.items()],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['entries', 'computed_at'],
+        )
+    cache.delete_many([_cache_key(key) for key in stale_keys])
+    cache.set_many({_cache_key(key): entries for key, entries in boards.items()},
+                   timeout=getattr(settings, 'TRENDING_CACHE_TIMEOUT', 3600))
+    return len(boards)
+
+
+def leaderboard(board='trending', topic_id=None):
+    """The stored ``[[course_id, score], ...]`` for a board, cached."""
+    key = board_key(board, topic_id)
+    entries = cache.get(_cache_key(key))
+    if entries is None:
+        entries = Leaderboard.objects.filter(key=key).values_list('entries', flat=True).first() or []
+        cache.set(_cache_key(key), entries, timeout=getattr(settings, 'TRENDING_CACHE_TIMEOUT', 3600))
+    return entries
+
+
+def top_courses(board='trending', topic_id=None, limit=6):
+    """Course objects of a board, in rank order, in one query."""
+    ids = [pk for pk, _ in leaderboard(board, topic_id)[:limit]]
+    if not ids:
+        return []
+    courses = Course.objects.select_related('teacher', 'topic', 'stats').in_bulk(ids)
+    return [courses[pk] for pk in ids if pk in courses and courses[pk].is_active]
+
+
+def ranks(board='trending', topic_id=None):
+    """``{course_id: rank}`` (1-based) for the courses on a board."""
+    return {pk: position for position, (pk, _) in enumerate(leaderboard(board, topic_id), start=1)}
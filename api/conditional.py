@@ -0,0 +1,81 @@
+### api/conditional.py
+
+"""
+Conditional GET for the API without serializing unchanged responses.
+
+Every viewset annotates its queryset with ``last_modified``: the newest
+``updated_at`` of the row and of anything it embeds (a course's stats and
+topic, for instance). The ETag is a hash of the request path and querystring
+(so ``?fields=`` and cursors get their own tags), ``API_ETAG_VERSION`` and
+the ``(pk, last_modified)`` pairs of the rows in the response, and for
+lists the next/previous links (a full last page gains a ``next`` when a
+row is added after it, without any of its own rows changing). A detail
+request costs one small query to decide; a list request reuses the page
+query it has to make anyway. Either way the serializer only runs when the
+client's copy is stale.
+
+Counters that are written with ``QuerySet.update()`` (view counts) don't
+touch ``updated_at`` and are therefore not exposed by the API.
+"""
+
+import hashlib
+
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+# Bump when the representation changes so clients don't keep stale bodies
+API_ETAG_VERSION = 1
+
+
+def validators(request, rows, links=()):
+    """
+    ``(etag, last_modified timestamp)`` for ``[(pk, last_modified), ...]``
+    and a list page's ``links``.
+    """
+    digest = hashlib.sha1(f'{API_ETAG_VERSION}|{request.get_full_path()}'.encode())
+    for link in links:
+        digest.update(f'|{link or ""}'.encode())
+    newest = None
+    for pk, modified in rows:
+        digest.update(f'|{pk}:{modified.isoformat() if modified else ""}'.encode())
+        if modified and (newest is None or modified > newest):
+            newest = modified
+    return quote_etag(digest.hexdigest()), int(newest.timestamp()) if newest else None
+
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ``list``/``retrieve`` for viewsets whose ``get_queryset`` annotates
+    ``last_modified``; answers 304 before building the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        links = (self.paginator.get_next_link(), self.paginator.get_previous_link())
+        etag, last_modified = validators(request, [(obj.pk, obj.last_modified) for obj in page], links)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        serializer = self.get_serializer(page, many=True)
+        return with_validators(self.get_paginated_response(serializer.data), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        queryset = self.filter_queryset(self.get_queryset()).filter(**lookup).prefetch_related(None)
+        row = queryset.values_list('pk', 'last_modified').first()
+        if row is None:
+            raise Http404
+        etag, last_modified = validators(request, [row])
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return with_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,97 @@
+### api/pagination.py
+
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ApiCursorPagination(CursorPagination):
+    """
+    Opaque ``?cursor=`` pagination; each view picks its own ordering with
+    ``cursor_ordering``. Like courses/pagination.py, deep pages cost the same
+    as the first and concurrent inserts never shift rows between pages.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, 'cursor_ordering', self.ordering)
+
+
+class KeysetPagination(ApiCursorPagination):
+    """
+    Forward-only keyset pagination over every column of ``cursor_ordering``,
+    which must end in a unique one.
+
+    ``CursorPagination`` positions on the first ordering column only and
+    skips rows sharing its value with an OFFSET, capped at ``offset_cutoff``
+    rows; ordering videos by ``course_id`` first, a course with more videos
+    than that can't be paged through. Here the cursor holds the last row's
+    value for each column and the next page starts strictly after it.
+    """
+    cursor_salt = 'api.pagination.keyset'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        fields = [name.lstrip('-') for name in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            try:
+                values = signing.loads(token, salt=self.cursor_salt)
+            except signing.BadSignature:
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self._after(ordering, values))
+
+        # One extra row tells us whether another page exists without a COUNT
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+        self.next_values = None
+        if len(rows) > self.page_size:
+            self.next_values = [_plain(getattr(page[-1], name)) for name in fields]
+        return page
+
+    @staticmethod
+    def _after(ordering, values):
+        """Rows after ``values``: equal on a prefix of columns, past it on the next."""
+        conditions = []
+        for i, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {other.lstrip('-'): value for other, value in zip(ordering[:i], values)}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+        return reduce(or_, conditions)
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        token = signing.dumps(self.next_values, salt=self.cursor_salt)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+
+def _plain(value):
+    # Cursor values go through JSON; the ORM parses ISO strings back
+    return value.isoformat() if hasattr(value, 'isoformat') else value
@@ -0,0 +1,93 @@
+### api/serializers.py
+
+from rest_framework import serializers
+
+from courses.models import Course, Topic
+from videos.models import Bookmark, Comment, Video
+
+
+def requested_fields(request):
+    """The ``?fields=a,b`` sparse fieldset, or None for every field."""
+    raw = request.query_params.get('fields') if request is not None else None
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Drop every field not named in ``?fields=`` (unknown names are ignored)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is not None:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+class TopicSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Topic
+        fields = ['id', 'slug', 'name', 'description', 'created_at', 'updated_at']
+
+
+class TopicSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Topic
+        fields = ['id', 'slug', 'name']
+
+
+class VideoSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Video
+        fields = ['id', 'title', 'order', 'duration']
+
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    teacher = serializers.CharField(source='teacher.username', read_only=True)
+    topic = TopicSummarySerializer(read_only=True)
+    video_count = serializers.IntegerField(source='stats.video_count', read_only=True)
+    total_duration = serializers.DurationField(source='stats.total_duration', read_only=True)
+    student_count = serializers.IntegerField(source='stats.student_count', read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'slug', 'title', 'description', 'teacher', 'topic', 'thumbnail',
+            'video_count', 'total_duration', 'student_count', 'created_at', 'updated_at',
+        ]
+
+
+class CourseDetailSerializer(CourseSerializer):
+    videos = VideoSummarySerializer(many=True, read_only=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['videos']
+
+
+class VideoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    course = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
+    class Meta:
+        model = Video
+        fields = [
+            'id', 'course', 'title', 'description', 'order', 'duration', 'thumbnail',
+            'created_at', 'updated_at',
+        ]
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'video', 'user', 'content', 'created_at', 'updated_at']
+
+
+class BookmarkSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    video = VideoSummarySerializer(read_only=True)
+    course = serializers.SlugRelatedField(source='video.course', slug_field='slug', read_only=True)
+
+    class Meta:
+        model = Bookmark
+        fields = ['id', 'video', 'course', 'created_at']
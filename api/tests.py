@@ -0,0 +1,93 @@
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from accounts.models import CustomUser
+from courses.models import Course, Topic
+from videos.models import Video
+from .pagination import ApiCursorPagination
+
+
+class VideoPaginationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        topic = Topic.objects.create(name='Python')
+        for title in ('Django', 'Flask'):
+            course = Course.objects.create(title=title, description='d', teacher=teacher, topic=topic)
+            # Videos share order values, so only the id breaks the tie
+            for i in range(5):
+                Video.objects.create(title=f'{title} {i}', course=course, video_file='videos/x.mp4', order=i // 2)
+
+    def walk(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(video['title'] for video in response.json()['results'])
+            url = response.json()['next']
+        return titles
+
+    # CursorPagination gives up past offset_cutoff rows sharing the first
+    # ordering column; a course's videos all share course_id
+    @mock.patch.object(ApiCursorPagination, 'offset_cutoff', 2)
+    def test_pages_follow_playlist_order(self):
+        expected = list(Video.objects.order_by('course_id', 'order', 'id').values_list('title', flat=True))
+        self.assertEqual(self.walk('/api/v1/videos/?page_size=3'), expected)
+        self.assertEqual(self.walk('/api/v1/videos/?course=flask&page_size=2'), [f'Flask {i}' for i in range(5)])
+
+    def test_tampered_cursor(self):
+        next_url = self.client.get('/api/v1/videos/?page_size=3').json()['next']
+        cursor = parse_qs(urlsplit(next_url).query)['cursor'][0]
+        for bad in (cursor[:-3] + 'xyz', 'garbage'):
+            self.assertEqual(self.client.get('/api/v1/videos/', {'cursor': bad}).status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        self.topic = Topic.objects.create(name='Python')
+        self.course = Course.objects.create(title='Django', description='d', teacher=teacher, topic=self.topic)
+        Video.objects.create(title='Intro', course=self.course, video_file='videos/x.mp4')
+        self.url = f'/api/v1/courses/{self.course.slug}/'
+
+    def test_unchanged_detail_is_not_serialized_again(self):
+        response = self.client.get(self.url)
+        etag, modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, headers={'If-Modified-Since': modified}).status_code, 304)
+
+        self.course.title = 'Django in depth'
+        self.course.save()
+        response = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['title'], 'Django in depth')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_tag_covers_the_next_link(self):
+        Topic.objects.create(name='Go')
+        url = '/api/v1/topics/?page_size=2'
+        response = self.client.get(url)
+        self.assertIsNone(response.json()['next'])
+        # A row after a full last page changes no row on it, only ``next``
+        Topic.objects.create(name='Rust')
+        response = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.json()['next'])
+
+    def test_sparse_fieldsets(self):
+        full = self.client.get(self.url)
+        self.assertIn('videos', full.json())
+        with self.assertNumQueries(2):
+            sparse = self.client.get(self.url, {'fields': 'id, title,nonsense'})
+        self.assertEqual(sparse.json(), {'id': self.course.pk, 'title': 'Django'})
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+        results = self.client.get('/api/v1/videos/', {'fields': 'title'}).json()['results']
+        self.assertEqual(results, [{'title': 'Intro'}])
+
@@ -0,0 +1,20 @@
+### api/urls.py
+
+from django.urls import path
+from rest_framework.routers import SimpleRouter
+
+from . import views
+
+router = SimpleRouter()
+router.register('topics', views.TopicViewSet, basename='api-topic')
+router.register('courses', views.CourseViewSet, basename='api-course')
+router.register('videos', views.VideoViewSet, basename='api-video')
+router.register('bookmarks', views.BookmarkViewSet, basename='api-bookmark')
+
+comment_list = views.CommentViewSet.as_view({'get': 'list'})
+comment_detail = views.CommentViewSet.as_view({'get': 'retrieve'})
+
+urlpatterns = router.urls + [
+    path('videos/<int:video_pk>/comments/', comment_list, name='api-comment-list'),
+    path('videos/<int:video_pk>/comments/<int:pk>/', comment_detail, name='api-comment-detail'),
+]
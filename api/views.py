@@ -0,0 +1,107 @@
+### api/views.py
+
+"""
+Read-only JSON API (``/api/v1/``) for the mobile client.
+
+Querysets select or prefetch everything their serializer touches, so a page
+costs a fixed number of queries, and skip the ``videos`` prefetch when a
+sparse fieldset leaves it out. See api/conditional.py for ETag handling.
+"""
+
+from django.db.models import F, Prefetch
+from django.db.models.functions import Coalesce, Greatest
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, viewsets
+
+from courses.models import Course, Topic
+from videos.models import Bookmark, Comment, Video
+from .conditional import ConditionalGetMixin
+from .pagination import KeysetPagination
+from .serializers import (
+    BookmarkSerializer, CommentSerializer, CourseDetailSerializer, CourseSerializer,
+    TopicSerializer, VideoSerializer, requested_fields,
+)
+
+
+class ReadOnlyViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+
+    def wants(self, field):
+        fields = requested_fields(self.request)
+        return fields is None or field in fields
+
+
+class TopicViewSet(ReadOnlyViewSet):
+    serializer_class = TopicSerializer
+    lookup_field = 'slug'
+    cursor_ordering = ('name',)
+
+    def get_queryset(self):
+        return Topic.objects.annotate(last_modified=F('updated_at'))
+
+
+class CourseViewSet(ReadOnlyViewSet):
+    """Active courses; filter with ``?topic=<slug>`` or ``?teacher=<username>``."""
+    lookup_field = 'slug'
+
+    def get_serializer_class(self):
+        return CourseDetailSerializer if self.action == 'retrieve' else CourseSerializer
+
+    def get_queryset(self):
+        # Saving or deleting a video refreshes the stats row, so its
+        # updated_at also covers the embedded video list
+        queryset = (Course.objects.filter(is_active=True)
+                    .select_related('teacher', 'topic', 'stats')
+                    .annotate(last_modified=Greatest(
+                        'updated_at',
+                        Coalesce('stats__updated_at', 'updated_at'),
+                        'topic__updated_at',
+                    )))
+        if self.action == 'retrieve' and self.wants('videos'):
+            videos = Video.objects.only('id', 'course_id', 'title', 'order', 'duration')
+            queryset = queryset.prefetch_related(Prefetch('videos', queryset=videos))
+        if self.request.query_params.get('topic'):
+            queryset = queryset.filter(topic__slug=self.request.query_params['topic'])
+        if self.request.query_params.get('teacher'):
+            queryset = queryset.filter(teacher__username=self.request.query_params['teacher'])
+        return queryset
+
+
+
+class VideoViewSet(ReadOnlyViewSet):
+    """Videos of active courses; filter with ``?course=<slug>``."""
+    serializer_class = VideoSerializer
+    # Playlist order; a course can hold more videos than CursorPagination's
+    # offset_cutoff, so every column goes into the cursor
+    pagination_class = KeysetPagination
+    cursor_ordering = ('course_id', 'order', 'id')
+
+    def get_queryset(self):
+        queryset = (Video.objects.filter(course__is_active=True)
+                    .select_related('course')
+                    .annotate(last_modified=F('updated_at')))
+        if self.request.query_params.get('course'):
+            queryset = queryset.filter(course__slug=self.request.query_params['course'])
+        return queryset
+
+
+class CommentViewSet(ReadOnlyViewSet):
+    """Comments on one video (``/videos/<id>/comments/``), newest first."""
+    serializer_class = CommentSerializer
+
+    def get_queryset(self):
+        video = get_object_or_404(Video, pk=self.kwargs['video_pk'], course__is_active=True)
+        return (Comment.objects.filter(video=video)
+                .select_related('user')
+                .annotate(last_modified=F('updated_at')))
+
+
+class BookmarkViewSet(ReadOnlyViewSet):
+    """The signed-in user's bookmarks, newest first."""
+    serializer_class = BookmarkSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # Bookmarks are never edited; embedded videos are
+        return (Bookmark.objects.filter(user=self.request.user)
+                .select_related('video__course')
+                .annotate(last_modified=Greatest('created_at', 'video__updated_at')))
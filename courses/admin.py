@@ -1,7 +1,7 @@
 ### courses/admin.py
 
 from django.contrib import admin
-from .models import Course, Topic
+from .models import Course, CourseStats, Topic
 
 @admin.register(Topic)
 class TopicAdmin(admin.ModelAdmin):
@@ -15,4 +15,9 @@ class CourseAdmin(admin.ModelAdmin):
     list_filter = ('topic', 'created_at', 'teacher')
     search_fields = ('title', 'description', 'teacher__username')
     prepopulated_fields = {'slug': ('title',)}
-    raw_id_fields = ('teacher',)
\ No newline at end of file
+    raw_id_fields = ('teacher',)
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ('course', 'video_count', 'total_duration', 'student_count', 'updated_at')
+    readonly_fields = ('video_count', 'total_duration', 'student_count', 'updated_at')
+    raw_id_fields = ('course',)
@@ -0,0 +1,175 @@
+### courses/counters.py
+
+"""
+Buffered view counters for courses and videos.
+
+Views are accumulated as pending deltas in the cache (per-process LocMemCache
+in development, a shared backend such as Redis/Memcached in production) and
+written back to ``view_count`` in batched ``F()`` updates, instead of one
+UPDATE per page view.
+"""
+
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+
+KEY_PREFIX = 'views'
+FLUSH_LOCK_KEY = f'{KEY_PREFIX}:flush-lock'
+
+# Pending ids touched by this worker since its last flush, keyed by model label
+_dirty = defaultdict(set)
+_dirty_lock = threading.Lock()
+_state = {'hits': 0, 'last_flush': time.monotonic()}
+
+
+def _cache():
+    return caches[getattr(settings, 'VIEW_COUNTER_CACHE', 'default')]
+
+
+def _key(label, pk):
+    return f'{KEY_PREFIX}:{label}:{pk}'
+
+
+def _add_pending(cache, key, amount):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # Key evicted between add() and incr()
+        cache.set(key, amount, timeout=None)
+
+
+def record_view(obj, amount=1):
+    """Add ``amount`` pending views for ``obj`` and flush if a limit is hit."""
+    label = obj._meta.label_lower
+    _add_pending(_cache(), _key(label, obj.pk), amount)
+
+    with _dirty_lock:
+        _dirty[label].add(obj.pk)
+        _state['hits'] += amount
+        due = (
+            _state['hits'] >= getattr(settings, 'VIEW_COUNTER_FLUSH_THRESHOLD', 100)
+            or time.monotonic() - _state['last_flush']
+            >= getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30)
+        )
+    if due:
+        flush()
+
+
+def pending_views(model, pks):
+    """Return ``{pk: pending_delta}`` for the given primary keys."""
+    label = model._meta.label_lower
+    keys = {_key(label, pk): pk for pk in pks}
+    found = _cache().get_many(list(keys))
+    return {keys[key]: value for key, value in found.items() if value}
+
+
+def get_view_count(obj):
+    """Stored ``view_count`` plus any views that have not been flushed yet."""
+    return obj.view_count + pending_views(type(obj), [obj.pk]).get(obj.pk, 0)
+
+
+def _flush_model(model, pks):
+    """Write pending deltas for ``pks`` to the database; returns views written."""
+    label = model._meta.label_lower
+    cache = _cache()
+    deltas = pending_views(model, pks)
+    if not deltas:
+        return 0
+
+    # Take the deltas off the cache before writing them, so a failure after
+    # the UPDATE commits can't leave them pending to be written a second time
+    for pk, delta in deltas.items():
+        try:
+            cache.decr(_key(label, pk), delta)
+        except ValueError:
+            pass
+
+    # Objects with the same delta share a single UPDATE
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        by_delta[delta].append(pk)
+
+    try:
+        with transaction.atomic():
+            for delta, ids in by_delta.items():
+                model.objects.filter(pk__in=ids).update(view_count=F('view_count') + delta)
+    except Exception:
+        # Nothing was written, so hand the deltas back for the next flush
+        for pk, delta in deltas.items():
+            _add_pending(cache, _key(label, pk), delta)
+        raise
+    return sum(deltas.values())
+
+
+def flush(labels=None):
+    """
+    Flush the pending views this worker has recorded.
+
+    Returns the number of views written, or ``None`` if another worker holds
+    the flush lock (the ids stay dirty and are retried on the next flush).
+    """
+    cache = _cache()
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=60):
+        return None
+    try:
+        with _dirty_lock:
+            selected = [label for label in _dirty if labels is None or label in labels]
+            batch = {label: _dirty.pop(label) for label in selected}
+            _state['hits'] = 0
+            _state['last_flush'] = time.monotonic()
+        written = 0
+        try:
+            for label, pks in batch.items():
+                written += _flush_model(apps.get_model(label), pks)
+        except Exception:
+            with _dirty_lock:
+                for label, pks in batch.items():
+                    _dirty[label].update(pks)
+            raise
+        return written
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def flush_all(model, chunk_size=1000):
+    """
+    Flush pending views for every row of ``model``, whichever worker recorded
+    them. Used by the ``flush_view_counts`` command when a shared cache is
+    configured.
+    """
+    cache = _cache()
+    if not cache.add(FLUSH_LOCK_KEY, 1, timeout=600):
+        return None
+    try:
+        written = 0
+        pks = model.objects.order_by('pk').values_list('pk', flat=True)
+        chunk = []
+        for pk in pks.iterator(chunk_size=chunk_size):
+            chunk.append(pk)
+            if len(chunk) >= chunk_size:
+                written += _flush_model(model, chunk)
+                chunk = []
+        if chunk:
+            written += _flush_model(model, chunk)
+        with _dirty_lock:
+            _dirty.pop(model._meta.label_lower, None)
+        return written
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+@atexit.register
+def _flush_at_exit():
+    # Per-process caches vanish with the worker, so write back what we can
+    try:
+        flush()
+    except Exception:
+        pass
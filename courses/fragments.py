@@ -0,0 +1,67 @@
+### courses/fragments.py
+
+"""
+Per-course version numbers for template fragment caching.
+
+Cached fragments include the course's version in their key, so bumping the
+version (done by the signal handlers in courses/signals.py whenever the
+course, its videos or their comments change) retires every fragment for that
+course at once. Old entries are never read again and age out of the cache.
+
+Versions and fragments are only useful if every worker sees the same ones,
+so both live in the shared ``default`` cache (see CACHES in settings). A
+version outlives the fragments keyed on it (``COURSE_VERSION_TIMEOUT``),
+and one that expires or is evicted anyway is replaced by a new time-based
+value, never an older one.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'course-version'
+DEFAULT_TIMEOUT = 7 * 24 * 3600
+
+
+def _key(course_id):
+    return f'{KEY_PREFIX}:{course_id}'
+
+
+def _timeout():
+    return getattr(settings, 'COURSE_VERSION_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def _fresh_version():
+    # Time-based so a version lost to eviction never repeats an older one
+    return time.time_ns() // 1000
+
+
+def get_versions(course_ids):
+    """Return ``{course_id: version}``, initialising any missing versions."""
+    keys = {_key(pk): pk for pk in course_ids}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: value for key, value in found.items()}
+    for key, pk in keys.items():
+        if pk not in versions:
+            version = _fresh_version()
+            cache.add(key, version, timeout=_timeout())
+            versions[pk] = cache.get(key, version)
+    return versions
+
+
+def attach_versions(courses):
+    """Set ``cache_version`` on each course with a single cache round trip."""
+    versions = get_versions([course.pk for course in courses])
+    for course in courses:
+        course.cache_version = versions[course.pk]
+    return courses
+
+
+def bump_version(course_id):
+    key = _key(course_id)
+    try:
+        cache.incr(key)
+        cache.touch(key, _timeout())
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=_timeout())
@@ -0,0 +1,281 @@
+### courses/importer.py
+
+"""
+Streaming bulk import of topics, courses and videos from CSV or JSONL.
+
+Rows are read lazily and handled in chunks. Each chunk is validated with a
+fixed number of lookups (teachers, topics, referenced courses), gets its
+course slugs from one ``allocate_slugs`` call, and is written with
+``bulk_create`` in its own transaction, so a bad chunk never undoes the
+ones before it and memory stays flat however large the file is.
+
+Every row has a ``type`` of ``course`` or ``video``:
+
+* course: ``title``, ``teacher`` (username), ``topic`` (name, created if
+  missing), optional ``description`` and ``ref`` (a file-local key);
+* video: ``title``, ``course`` (a ``ref`` from the same file or an existing
+  course slug), ``video_file`` (a path in media storage), optional
+  ``description``, ``order`` and ``duration`` (seconds or HH:MM:SS).
+
+Videos without a duration get a probe job, as uploads do. bulk_create skips
+``post_save``, so the importer also does what the signal handlers would:
+stats rows, search indexing and fragment cache versions.
+"""
+
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.utils.dateparse import parse_duration
+
+from videos.models import MediaJob, Video
+from .fragments import bump_version
+from .models import Course, CourseStats, Topic
+from .search import get_search_backend
+from .slugs import allocate_slugs
+from .stats import refresh_video_stats_many
+
+ROW_TYPES = ('course', 'video')
+TOPIC_INSERT_ATTEMPTS = 3
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row_dict)``; unparseable lines yield ``None`` rows."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key: (value or '').strip() for key, value in row.items() if key}
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+@dataclass
+class FailedRow:
+    line: int
+    errors: list
+    row: dict = None
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    topics: int = 0
+    courses: int = 0
+    videos: int = 0
+    failed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class CourseImporter:
+
+    def __init__(self, chunk_size=1000, dry_run=False, on_chunk=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.on_chunk = on_chunk
+        # File-local course refs -> course pk (None in a dry run)
+        self.refs = {}
+        self.result = ImportResult()
+
+    def run(self, rows):
+        started = time.perf_counter()
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        self.result.elapsed = time.perf_counter() - started
+        return self.result
+
+    def _process(self, chunk):
+        started = time.perf_counter()
+        courses, videos = self.validate(chunk)
+        if not self.dry_run and (courses or videos):
+            try:
+                self.write(courses, videos)
+            except DatabaseError as e:
+                for line, row, _ in courses + videos:
+                    self.result.failed.append(FailedRow(line, [f'Chunk rolled back: {e}'], row))
+                for _, row, _ in courses:
+                    self.refs.pop(_text(row, 'ref'), None)
+        elif self.dry_run:
+            self.result.courses += len(courses)
+            self.result.videos += len(videos)
+        self.result.rows += len(chunk)
+        if self.on_chunk:
+            self.on_chunk(len(chunk), time.perf_counter() - started, self.result)
+
+    # Validation
+
+    def validate(self, chunk):
+        """
+        Check a chunk's rows; returns ``(courses, videos)`` as lists of
+        ``(line, row, unsaved object)`` and records failures.
+        """
+        parsed = []
+        for line, row in chunk:
+            if row is None:
+                self.result.failed.append(FailedRow(line, ['Not a JSON object']))
+                continue
+            kind = _text(row, 'type').lower()
+            if kind not in ROW_TYPES:
+                self.result.failed.append(FailedRow(line, [f"type must be one of {', '.join(ROW_TYPES)}"], row))
+                continue
+            parsed.append((line, row, kind))
+
+        course_rows = [(line, row) for line, row, kind in parsed if kind == 'course']
+        video_rows = [(line, row) for line, row, kind in parsed if kind == 'video']
+        courses = self._validate_courses(course_rows)
+        videos = self._validate_videos(video_rows)
+        return courses, videos
+
+    def _validate_courses(self, rows):
+        usernames = {_text(row, 'teacher') for _, row in rows}
+        teachers = {user.username: user for user in get_user_model().objects.filter(username__in=usernames)}
+        valid = []
+        for line, row in rows:
+            errors = []
+            title, ref = _text(row, 'title'), _text(row, 'ref')
+            if not title:
+                errors.append('title is required')
+            elif len(title) > Course._meta.get_field('title').max_length:
+                errors.append('title is too long')
+            teacher = teachers.get(_text(row, 'teacher'))
+            if teacher is None:
+                errors.append(f"unknown teacher {_text(row, 'teacher')!r}")
+            elif not teacher.is_teacher():
+                errors.append(f'{teacher.username!r} is not a teacher')
+            if ref and ref in self.refs:
+                errors.append(f'duplicate ref {ref!r}')
+            if not _text(row, 'topic'):
+                errors.append('topic is required')
+            elif len(_text(row, 'topic')) > Topic._meta.get_field('name').max_length:
+                errors.append('topic name is too long')
+            if errors:
+                self.result.failed.append(FailedRow(line, errors, row))
+                continue
+            if ref:
+                self.refs[ref] = None
+            valid.append((line, row, Course(title=title, description=_text(row, 'description'), teacher=teacher)))
+        return valid
+
+    def _validate_videos(self, rows):
+        wanted = {_text(row, 'course') for _, row in rows} - set(self.refs)
+        by_slug = dict(Course.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+        valid = []
+        for line, row in rows:
+            errors = []
+            title, course_key = _text(row, 'title'), _text(row, 'course')
+            if not title:
+                errors.append('title is required')
+            elif len(title) > Video._meta.get_field('title').max_length:
+                errors.append('title is too long')
+            if not _text(row, 'video_file'):
+                errors.append('video_file is required')
+            if course_key not in self.refs and course_key not in by_slug:
+                errors.append(f'unknown course {course_key!r}')
+            order = _text(row, 'order') or '0'
+            if not order.isdigit():
+                errors.append('order must be a non-negative integer')
+            duration = None
+            if _text(row, 'duration'):
+                duration = parse_duration(_text(row, 'duration'))
+                if duration is None:
+                    errors.append('duration must be seconds or HH:MM:SS')
+            if errors:
+                self.result.failed.append(FailedRow(line, errors, row))
+                continue
+            video = Video(
+                title=title,
+                description=_text(row, 'description'),
+                video_file=_text(row, 'video_file'),
+                order=int(order),
+                duration=duration,
+            )
+            # Resolved to a pk at write time, once this chunk's courses exist
+            video.import_course_key = course_key
+            video.course_id = by_slug.get(course_key)
+            valid.append((line, row, video))
+        return valid
+
+    # Writing
+
+    def _topics(self, names):
+        """
+        ``{name: Topic}`` for ``names``, creating missing topics. Another
+        import can take an allocated slug first, and ignore_conflicts drops
+        that insert silently, so names still missing afterwards get fresh
+        slugs and are retried.
+        """
+        topics = {topic.name: topic for topic in Topic.objects.filter(name__in=names)}
+        missing = sorted(names - set(topics))
+        for _ in range(TOPIC_INSERT_ATTEMPTS):
+            if not missing:
+                return topics
+            slugs = allocate_slugs(Topic, missing)
+            Topic.objects.bulk_create(
+                [Topic(name=name, slug=slug) for name, slug in zip(missing, slugs)], ignore_conflicts=True
+            )
+            found = {topic.name: topic for topic in Topic.objects.filter(name__in=missing)}
+            topics.update(found)
+            self.result.topics += len(found)
+            missing = [name for name in missing if name not in found]
+        if missing:
+            raise DatabaseError(f'no free slug for topics {", ".join(missing)}')
+        return topics
+
+    def write(self, courses, videos):
+        with transaction.atomic():
+            topics = self._topics({_text(row, 'topic') for _, row, _ in courses}) if courses else {}
+
+            new_courses = [course for _, _, course in courses]
+            for (_, row, course), slug in zip(courses, allocate_slugs(Course, [c.title for c in new_courses])):
+                course.slug = slug
+                course.topic = topics.get(_text(row, 'topic'))
+            Course.objects.bulk_create(new_courses)
+            CourseStats.objects.bulk_create([CourseStats(course=course) for course in new_courses])
+            get_search_backend().index(new_courses)
+
+            for _, row, course in courses:
+                if _text(row, 'ref'):
+                    self.refs[_text(row, 'ref')] = course.pk
+
+            new_videos = []
+            for _, _, video in videos:
+                if video.course_id is None:
+                    video.course_id = self.refs[video.import_course_key]
+                new_videos.append(video)
+            Video.objects.bulk_create(new_videos)
+            MediaJob.objects.bulk_create(
+                [MediaJob(video=video, kind='probe') for video in new_videos if video.duration is None]
+            )
+
+            touched = {video.course_id for video in new_videos}
+            if touched:
+                refresh_video_stats_many(touched)
+                existing = touched - {course.pk for course in new_courses}
+                transaction.on_commit(lambda: [bump_version(pk) for pk in existing])
+
+        self.result.courses += len(new_courses)
+        self.result.videos += len(new_videos)
@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from courses.models import Course, Topic
+from courses.search import get_search_backend
+
+WORDS = (
+    'python django data science machine learning web design algebra calculus '
+    'history painting guitar photography marketing finance statistics docker '
+    'kubernetes networking security cooking nutrition spanish french writing'
+).split()
+
+# Long tail of filler terms so query words are selective, as in a real catalogue
+FILLER = [f'term{i}' for i in range(20_000)]
+
+QUERIES = ['python', 'machine learning', 'guitar', 'finan', 'web design django', 'kubernetes security']
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains search with the search backend on a synthetic catalogue (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['courses'])
+                self.run(options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        rng = random.Random(42)
+        started = time.perf_counter()
+        User = get_user_model()
+        teachers = User.objects.bulk_create(
+            User(username=f'bench-teacher-{i}', user_type='teacher') for i in range(200)
+        )
+        topics = Topic.objects.bulk_create(
+            Topic(name=f'Bench {word}', slug=f'bench-{word}') for word in WORDS
+        )
+        def words(k):
+            return [rng.choice(WORDS) if rng.random() < 0.02 else rng.choice(FILLER) for _ in range(k)]
+
+        courses = [
+            Course(
+                title=' '.join(words(4)).title(),
+                description=' '.join(words(60)),
+                teacher=rng.choice(teachers),
+                topic=rng.choice(topics),
+                slug=f'bench-course-{i}',
+            )
+            for i in range(count)
+        ]
+        Course.objects.bulk_create(courses, batch_size=2000)
+        backend = get_search_backend()
+        queryset = Course.objects.filter(slug__startswith='bench-course-').select_related('teacher', 'topic')
+        batch = []
+        for course in queryset.iterator(chunk_size=2000):
+            batch.append(course)
+            if len(batch) == 2000:
+                backend.index(batch)
+                batch = []
+        backend.index(batch)
+        self.stdout.write(f'Seeded and indexed {count} courses in {time.perf_counter() - started:.1f}s')
+
+    def run(self, repeat):
+        backend = get_search_backend()
+        for query in QUERIES:
+            like, indexed = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(Course.objects.filter(
+                    Q(title__icontains=query) |
+                    Q(description__icontains=query) |
+                    Q(teacher__username__icontains=query) |
+                    Q(topic__name__icontains=query)
+                ).values_list('pk', flat=True)[:200])
+                like.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                backend.search(query, limit=200)
+                indexed.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{query!r:24} icontains p50={statistics.median(like):7.2f}ms p95={percentile(like, 95):7.2f}ms | '
+                f'index p50={statistics.median(indexed):7.2f}ms p95={percentile(indexed, 95):7.2f}ms'
+            )
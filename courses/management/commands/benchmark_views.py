@@ -0,0 +1,198 @@
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course
+from learnhub.instrumentation import record_queries
+from videos.models import Video, VideoProgress
+
+# Metrics compared against a baseline; higher is worse for all of them
+COMPARED = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_max', 'peak_kib')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the core views through the test client and report latency '
+        'percentiles, queries per request and peak memory. Run seed_data first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--memory-samples', type=int, default=20,
+                            help='Requests per view re-run under tracemalloc for peak memory')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--only', nargs='*', help='Only run these scenarios')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--save', metavar='FILE', help='Write the results as a JSON baseline')
+        parser.add_argument('--compare', metavar='FILE', help='Compare with a saved baseline')
+        parser.add_argument('--tolerance', type=float, default=15.0,
+                            help='Allowed regression against the baseline, in percent')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.cold = options['cold']
+        scenarios = self.scenarios()
+        if options['only']:
+            scenarios = [s for s in scenarios if s[0] in options['only']]
+
+        results = {}
+        for name, client, urls in scenarios:
+            results[name] = self.run(client, urls, options)
+            self.report(name, results[name])
+
+        if options['compare']:
+            regressions = self.compare(options['compare'], results, options['tolerance'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} metrics regressed: ' + ', '.join(regressions))
+        if options['save']:
+            with open(options['save'], 'w') as fh:
+                json.dump({'meta': self.meta(options), 'results': results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['save']}"))
+
+    def client_for(self, user=None):
+        # ALLOWED_HOSTS is empty in development, which only admits localhost
+        client = Client(SERVER_NAME='localhost')
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def sample_pks(self, model, count):
+        """Random existing primary keys, without loading every id."""
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            raise CommandError(f'No {model._meta.verbose_name_plural} found; run seed_data first')
+        pks = set()
+        for _ in range(count):
+            pk = (model.objects.filter(pk__gte=self.rng.randint(bounds['low'], bounds['high']))
+                  .order_by('pk').values_list('pk', flat=True).first())
+            pks.add(pk)
+        return list(pks)
+
+    def scenarios(self):
+        User = get_user_model()
+        student_id = VideoProgress.objects.filter(user__user_type='student').values_list('user_id', flat=True).first()
+        teacher_id = Course.objects.values_list('teacher_id', flat=True).order_by('-pk').first()
+        if student_id is None or teacher_id is None:
+            raise CommandError('Need a student with progress and a teacher with courses; run seed_data first')
+        student = self.client_for(User.objects.get(pk=student_id))
+        teacher = self.client_for(User.objects.get(pk=teacher_id))
+
+        slugs = list(Course.objects.filter(pk__in=self.sample_pks(Course, 100)).values_list('slug', flat=True))
+        videos = self.sample_pks(Video, 100)
+        return [
+            ('course_list', self.client_for(), [reverse('course_list')]),
+            ('course_detail', student, [reverse('course_detail', args=[slug]) for slug in slugs]),
+            ('video_detail', student, [reverse('video_detail', args=[pk]) for pk in videos]),
+            ('dashboard_student', student, [reverse('dashboard')]),
+            ('dashboard_teacher', teacher, [reverse('dashboard')]),
+        ]
+
+    def get(self, client, url):
+        if self.cold:
+            cache.clear()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        return response
+
+    def run(self, client, urls, options):
+        for _ in range(options['warmup']):
+            self.get(client, self.rng.choice(urls))
+
+        latencies, queries = [], []
+        for _ in range(options['requests']):
+            url = self.rng.choice(urls)
+            with record_queries() as recorder:
+                started = time.perf_counter()
+                self.get(client, url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+
+        # tracemalloc slows every allocation down, so memory is measured in a
+        # separate pass that does not skew the latency numbers
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(options['memory_samples']):
+                url = self.rng.choice(urls)
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                self.get(client, url)
+                peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'requests': len(latencies),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries_mean': round(statistics.fmean(queries), 1),
+            'queries_max': max(queries),
+            'peak_kib': round(max(peaks), 1) if peaks else None,
+        }
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:18} p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms "
+            f"p99={result['p99_ms']:8.2f}ms queries={result['queries_mean']:5.1f} "
+            f"(max {result['queries_max']}) peak={result['peak_kib'] or 0:9.1f}KiB"
+        )
+
+    def compare(self, path, results, tolerance):
+        try:
+            with open(path) as fh:
+                baseline = json.load(fh)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Cannot read baseline {path}: {e}')
+
+        self.stdout.write(f'\nCompared with {path} (tolerance {tolerance:g}%):')
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            changes = []
+            for metric in COMPARED:
+                before, after = baseline[name].get(metric), result.get(metric)
+                if not before or after is None:
+                    continue
+                delta = (after - before) / before * 100
+                flag = ''
+                # Query counts are deterministic, so any increase counts
+                if delta > (0 if metric.startswith('queries') else tolerance):
+                    flag = '!'
+                    regressions.append(f'{name}.{metric}')
+                changes.append(f'{metric} {delta:+.1f}%{flag}')
+            style = self.style.ERROR if any(c.endswith('!') for c in changes) else self.style.SUCCESS
+            self.stdout.write(style(f"{name:18} {'  '.join(changes)}"))
+        return regressions
+
+    def meta(self, options):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'cold_cache': options['cold'],
+            'courses': Course.objects.count(),
+            'videos': Video.objects.count(),
+        }
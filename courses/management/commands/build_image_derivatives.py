@@ -0,0 +1,59 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from learnhub import images
+from videos.models import Video
+
+
+class Command(BaseCommand):
+    help = 'Generate missing WebP/JPEG renditions of thumbnails and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Processes resizing images')
+        parser.add_argument('--only', nargs='*', choices=['courses', 'videos', 'profiles'],
+                            help='Only these kinds of image')
+
+    def sources(self, only):
+        fields = {
+            'courses': (Course, 'thumbnail'),
+            'videos': (Video, 'thumbnail'),
+            'profiles': (get_user_model(), 'profile_picture'),
+        }
+        seen = set()
+        for kind, (model, field) in fields.items():
+            if only and kind not in only:
+                continue
+            names = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for name in names.values_list(field, flat=True).distinct().iterator():
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+    def handle(self, *args, **options):
+        quality = getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80)
+        written = failed = missing = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {}
+            for name in self.sources(options['only']):
+                # Hashing (and recording the source) happens here, resizing in the pool
+                digest = images.source_digest(name)
+                if digest is None:
+                    missing += 1
+                    continue
+                futures[pool.submit(
+                    images.render, default_storage.path(name), default_storage.path(images.derivative_dir(digest)),
+                    images.widths(), images.formats(), quality,
+                )] = name
+            for future in as_completed(futures):
+                try:
+                    written += future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {exc}')
+        self.stdout.write(f'Wrote {written} renditions; {missing} source files missing, {failed} failed')
+        self.stdout.write(self.style.SUCCESS('Done'))
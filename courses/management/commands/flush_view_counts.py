@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from courses.counters import flush_all
+from courses.models import Course
+from videos.models import Video
+
+
+class Command(BaseCommand):
+    help = 'Write buffered course and video views back to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Course, Video):
+            written = flush_all(model, chunk_size=options['chunk_size'])
+            if written is None:
+                self.stderr.write(f'{model._meta.label}: flush already in progress, skipped')
+                continue
+            self.stdout.write(f'{model._meta.label}: {written} views flushed')
@@ -0,0 +1,49 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.importer import CourseImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream courses and videos from a CSV or JSONL file (use - for stdin) into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to the file extension, or jsonl for stdin')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--errors', metavar='FILE', help='Write failed rows here as JSONL')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        importer = CourseImporter(options['chunk_size'], options['dry_run'], on_chunk=self.report_chunk)
+        with stream:
+            result = importer.run(read_rows(stream, fmt))
+
+        prefix = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {result.rows} rows in {result.elapsed:.1f}s ({result.rate:,.0f} rows/s): '
+            f'{result.courses} courses, {result.videos} videos, {result.topics} new topics'
+        ))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{len(result.failed)} rows failed'))
+            for failure in result.failed[:20]:
+                self.stdout.write(f"  line {failure.line}: {'; '.join(failure.errors)}")
+            if options['errors']:
+                with open(options['errors'], 'w', encoding='utf-8') as fh:
+                    for failure in result.failed:
+                        fh.write(json.dumps({'line': failure.line, 'errors': failure.errors, 'row': failure.row}) + '\n')
+                self.stdout.write(f"Failed rows written to {options['errors']}")
+
+    def report_chunk(self, rows, seconds, result):
+        rate = rows / seconds if seconds else rows
+        self.stdout.write(f'  {result.rows} rows done ({rate:,.0f} rows/s), {len(result.failed)} failed')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses.models import Course
+from courses.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        batch_size = options['batch_size']
+        courses = Course.objects.select_related('teacher', 'topic').order_by('pk')
+        indexed = 0
+        with transaction.atomic():
+            backend.clear()
+            batch = []
+            for course in courses.iterator(chunk_size=batch_size):
+                batch.append(course)
+                if len(batch) >= batch_size:
+                    backend.index(batch)
+                    indexed += len(batch)
+                    batch = []
+            backend.index(batch)
+            indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} courses'))
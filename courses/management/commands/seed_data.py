@@ -0,0 +1,220 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from courses.models import Course, CourseStats, Topic
+from videos.models import Bookmark, Comment, Video, VideoProgress
+
+WORDS = (
+    'python django data science machine learning web design algebra calculus '
+    'history painting guitar photography marketing finance statistics docker '
+    'kubernetes networking security cooking nutrition spanish french writing '
+    'physics chemistry biology economics philosophy drawing piano excel sql'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Seed a large synthetic dataset with bulk_create for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Prefix for generated usernames and slugs')
+        parser.add_argument('--students', type=int, default=10_000)
+        parser.add_argument('--teachers', type=int, default=1_000)
+        parser.add_argument('--topics', type=int, default=50)
+        parser.add_argument('--courses', type=int, default=50_000)
+        parser.add_argument('--videos', type=int, default=500_000)
+        parser.add_argument('--comments', type=int, default=5_000_000)
+        parser.add_argument('--progress', type=int, default=5_000_000)
+        parser.add_argument('--bookmarks', type=int, default=200_000)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--no-index', action='store_true', help='Skip rebuilding the search index')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        students = self.seed_users(options['students'], 'student')
+        teachers = self.seed_users(options['teachers'], 'teacher')
+        topics = self.seed_topics(options['topics'])
+        courses = self.seed_courses(options['courses'], teachers, topics)
+        videos = self.seed_videos(options['videos'], courses)
+        self.seed_pairs(Comment, options['comments'], students, videos, self.make_comment)
+        self.seed_pairs(VideoProgress, options['progress'], students, videos, self.make_progress, unique=True)
+        self.seed_pairs(Bookmark, options['bookmarks'], students, videos, self.make_bookmark, unique=True)
+
+        self.seed_stats(courses)
+        call_command('rebuild_course_progress', stdout=self.stdout)
+        if not options['no_index']:
+            call_command('reindex_courses', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
+
+    def batched_insert(self, model, objects, total):
+        """bulk_create ``objects`` (a generator) in transactions of batch_size."""
+        label = model._meta.verbose_name_plural
+        # ignore_conflicts drops rows silently, so count what actually landed
+        before = model.objects.count()
+        done = 0
+        started = time.perf_counter()
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                done += self._insert(model, batch)
+                batch = []
+                self.stdout.write(f'  {label}: {done}/{total}', ending='\r')
+        if batch:
+            done += self._insert(model, batch)
+        elapsed = time.perf_counter() - started
+        inserted = model.objects.count() - before
+        rate = inserted / elapsed if elapsed else inserted
+        skipped = f', {done - inserted} already existed' if done != inserted else ''
+        self.stdout.write(f'  {label}: {inserted} rows in {elapsed:.1f}s ({rate:,.0f}/s){skipped}')
+        return inserted
+
+    @staticmethod
+    def _insert(model, batch):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
+
+    def ids(self, model, **filters):
+        return list(model.objects.filter(**filters).order_by('pk').values_list('pk', flat=True))
+
+    def seed_users(self, count, user_type):
+        User = get_user_model()
+        password = make_password('password')
+        name = f'{self.prefix}-{user_type}'
+        self.batched_insert(User, (
+            User(username=f'{name}-{i}', user_type=user_type, password=password)
+            for i in range(count)
+        ), count)
+        return self.ids(User, username__startswith=f'{name}-')
+
+    def seed_topics(self, count):
+        self.batched_insert(Topic, (
+            Topic(name=f'{self.prefix} {WORDS[i % len(WORDS)]} {i}', slug=f'{self.prefix}-topic-{i}')
+            for i in range(count)
+        ), count)
+        return self.ids(Topic, slug__startswith=f'{self.prefix}-topic-')
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def seed_courses(self, count, teachers, topics):
+        now = timezone.now()
+        self.batched_insert(Course, (
+            Course(
+                title=self.sentence(4).title(),
+                description=self.sentence(50),
+                teacher_id=self.rng.choice(teachers),
+                topic_id=self.rng.choice(topics),
+                slug=f'{self.prefix}-course-{i}',
+            )
+            for i in range(count)
+        ), count)
+        courses = self.ids(Course, slug__startswith=f'{self.prefix}-course-')
+        # auto_now_add stamps every row in a batch alike; spread them out so
+        # keyset pagination sees realistic, mostly distinct timestamps
+        for start in range(0, len(courses), self.batch_size):
+            chunk = courses[start:start + self.batch_size]
+            with transaction.atomic():
+                Course.objects.bulk_update(
+                    [Course(pk=pk, created_at=now - timedelta(minutes=len(courses) - start - i))
+                     for i, pk in enumerate(chunk)],
+                    ['created_at'],
+                )
+        return courses
+
+    def seed_videos(self, count, courses):
+        self.batched_insert(Video, (
+            Video(
+                title=self.sentence(3).title(),
+                description=self.sentence(20),
+                course_id=courses[i % len(courses)],
+                video_file=f'videos/{self.prefix}-{i}.mp4',
+                duration=timedelta(seconds=self.rng.randint(60, 3600)),
+                order=i // len(courses),
+            )
+            for i in range(count)
+        ), count)
+        return self.ids(Video, video_file__startswith=f'videos/{self.prefix}-')
+
+    def seed_pairs(self, model, count, users, videos, factory, unique=False):
+        """
+        Rows pointing at a random (user, video). With ``unique``, each user
+        gets an even share of ``count`` as distinct videos, so no pair can
+        repeat and nothing has to be remembered from one user to the next.
+        """
+        if unique:
+            count = min(count, len(users) * len(videos))
+
+        def rows():
+            if not count:
+                return
+            if not unique:
+                for _ in range(count):
+                    yield factory(self.rng.choice(users), self.rng.choice(videos))
+                return
+            share, extra = divmod(count, len(users))
+            for i, user in enumerate(users):
+                for video in self.rng.sample(videos, share + (i < extra)):
+                    yield factory(user, video)
+        self.batched_insert(model, rows(), count)
+
+    def seed_stats(self, courses):
+        """
+        Fill CourseStats with two grouped aggregates; rebuild_course_stats
+        would run two queries per course.
+        """
+        started = time.perf_counter()
+        videos = {
+            row['course_id']: row
+            for row in (Video.objects.filter(course_id__in=courses).values('course_id')
+                        .annotate(video_count=Count('id'), total_duration=Sum('duration')))
+        }
+        students = dict(
+            VideoProgress.objects.filter(video__course_id__in=courses, user__user_type='student')
+            .values('video__course_id')
+            .annotate(students=Count('user', distinct=True))
+            .values_list('video__course_id', 'students')
+        )
+        stats = []
+        for pk in courses:
+            row = videos.get(pk, {})
+            stats.append(CourseStats(
+                course_id=pk,
+                video_count=row.get('video_count', 0),
+                total_duration=row.get('total_duration') or timedelta(),
+                student_count=students.get(pk, 0),
+            ))
+        with transaction.atomic():
+            CourseStats.objects.bulk_create(
+                stats,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['course'],
+                update_fields=['video_count', 'total_duration', 'student_count'],
+            )
+        self.stdout.write(f'  course stats: {len(stats)} rows in {time.perf_counter() - started:.1f}s')
+
+    def make_comment(self, user_id, video_id):
+        return Comment(user_id=user_id, video_id=video_id, content=self.sentence(15))
+
+    def make_progress(self, user_id, video_id):
+        watched = self.rng.randint(0, 3600)
+        return VideoProgress(user_id=user_id, video_id=video_id, watched_seconds=watched,
+                             completed=watched > 3000)
+
+    def make_bookmark(self, user_id, video_id):
+        return Bookmark(user_id=user_id, video_id=video_id)
@@ -0,0 +1,38 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the local read replicas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replica aliases (default: DATABASE_REPLICAS)')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or list(getattr(settings, 'DATABASE_REPLICAS', ()))
+        if not aliases:
+            raise CommandError('No replicas configured (set LEARNHUB_SQLITE_REPLICA or DATABASE_REPLICAS)')
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Unknown database alias {alias!r}')
+            for config in (primary, settings.DATABASES[alias]):
+                if config['ENGINE'] != 'django.db.backends.sqlite3':
+                    raise CommandError('sync_replica only copies SQLite databases; use real replication elsewhere')
+
+        for alias in aliases:
+            # Drop our own connection so the replica file isn't held open
+            connections[alias].close()
+            source = sqlite3.connect(str(primary['NAME']))
+            target = sqlite3.connect(str(settings.DATABASES[alias]['NAME']))
+            try:
+                # Online backup: consistent even while the primary takes writes
+                source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f'Copied {primary["NAME"]} to {alias} ({settings.DATABASES[alias]["NAME"]})')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:20
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    from django.db.models import Count, Sum
+
+    Course = apps.get_model('courses', 'Course')
+    CourseStats = apps.get_model('courses', 'CourseStats')
+    VideoProgress = apps.get_model('videos', 'VideoProgress')
+    for course in Course.objects.annotate(n=Count('videos'), total=Sum('videos__duration')):
+        students = (VideoProgress.objects
+                    .filter(video__course=course, user__user_type='student')
+                    .values('user').distinct().count())
+        CourseStats.objects.create(
+            course=course,
+            video_count=course.n,
+            total_duration=course.total or datetime.timedelta(),
+            student_count=students,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_alter_course_options_alter_topic_options_and_more'),
+        ('videos', '0002_video_view_count_videoprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('video_count', models.PositiveIntegerField(default=0)),
+                ('total_duration', models.DurationField(default=datetime.timedelta)),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Course stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
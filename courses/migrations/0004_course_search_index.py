@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from courses.search.sqlite import CREATE_TABLE_SQL, DROP_TABLE_SQL, TABLE
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Course = apps.get_model('courses', 'Course')
+    schema_editor.execute(CREATE_TABLE_SQL)
+    rows = (Course.objects
+            .values_list('pk', 'title', 'description', 'teacher__username', 'topic__name')
+            .iterator())
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, title, description, teacher, topic) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            rows
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_TABLE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
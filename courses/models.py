@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify
@@ -30,17 +32,14 @@ class Course(models.Model):
     view_count = models.PositiveIntegerField(default=0)
     
     def increment_views(self):
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
-    
-    def get_total_duration(self):
-        """Returns total duration in minutes"""
-        from datetime import timedelta
-        total = sum(
-            (video.duration.total_seconds() for video in self.videos.all() if video.duration),
-            timedelta()
-        )
-        return round(total.total_seconds() / 60, 1)
+        """Buffer a view; it is written back in a batched F() update"""
+        from .counters import record_view
+        record_view(self)
+
+    def get_view_count(self):
+        """View count including views that have not been flushed yet"""
+        from .counters import get_view_count
+        return get_view_count(self)
     
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -69,16 +68,16 @@ class Course(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = 'Courses'
+        indexes = [
+            # Keyset pagination in courses/pagination.py
+            models.Index(fields=['-created_at', '-id'], name='course_recent_idx'),
+            models.Index(fields=['topic', '-created_at', '-id'], name='course_topic_recent_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            base_slug = slugify(self.title)
-            unique_slug = base_slug
-            num = 1
-            while Course.objects.filter(slug=unique_slug).exists():
-                unique_slug = f"{base_slug}-{num}"
-                num += 1
-            self.slug = unique_slug
+            from .slugs import allocate_slugs
+            self.slug = allocate_slugs(Course, [self.title])[0]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -87,23 +86,51 @@ class Course(models.Model):
     def get_absolute_url(self):
         return reverse('course_detail', kwargs={'slug': self.slug})
 
+    def is_visible_to(self, user):
+        """Inactive courses are only visible to their teacher and staff"""
+        return self.is_active or (user.is_authenticated and (user.pk == self.teacher_id or user.is_staff))
+
     def get_total_duration(self):
         """Calculate total course duration in minutes"""
-        from datetime import timedelta
-        total = sum(
-            (video.duration.total_seconds() for video in self.videos.all() if video.duration),
-            timedelta()
-        )
+        try:
+            total = self.stats.total_duration
+        except CourseStats.DoesNotExist:
+            # No stats row yet (bulk inserts skip the signals); aggregate directly
+            from .stats import _video_aggregates
+            total = _video_aggregates(self.pk)['total_duration']
         return total.total_seconds() / 60
 
     def get_student_count(self):
-        """Count unique students enrolled in the course"""
-        return (self.enrollments
-                .filter(user__is_teacher=False)
-                .distinct('user')
-                .count())
+        """Count unique students who have started the course"""
+        try:
+            return self.stats.student_count
+        except CourseStats.DoesNotExist:
+            from .stats import _student_count
+            return _student_count(self.pk)
 
     def increment_view_count(self):
         """Atomically increment view count"""
-        self.view_count = models.F('view_count') + 1
-        self.save(update_fields=['view_count'])
\ No newline at end of file
+        self.increment_views()
+
+class CourseStats(models.Model):
+    """
+    Denormalized per-course numbers for listing pages, kept in sync by the
+    signal handlers in courses/signals.py. Use ``rebuild_course_stats`` to
+    repair drift.
+    """
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    video_count = models.PositiveIntegerField(default=0)
+    total_duration = models.DurationField(default=timedelta)
+    student_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Course stats'
+
+    def __str__(self):
+        return f"Stats for {self.course.title}"
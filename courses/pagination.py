@@ -0,0 +1,66 @@
+### courses/pagination.py
+
+"""
+Keyset (cursor) pagination over ``(-created_at, -id)``.
+
+Each page continues strictly after the last row of the previous one, so deep
+pages cost the same as the first and rows inserted meanwhile never shift or
+duplicate entries. Cursors are signed, opaque tokens for the querystring.
+"""
+
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SALT = 'courses.pagination.cursor'
+ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(obj):
+    return signing.dumps([obj.created_at.isoformat(), obj.pk], salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    try:
+        created_at, pk = signing.loads(token, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    created_at = parse_datetime(created_at) if isinstance(created_at, str) else None
+    if created_at is None or not isinstance(pk, int):
+        raise InvalidCursor('Malformed cursor')
+    return created_at, pk
+
+
+def paginate(queryset, cursor=None, per_page=None):
+    """
+    Return the ``KeysetPage`` following ``cursor`` (the first page if empty).
+    Raises ``InvalidCursor`` for tampered or malformed tokens.
+    """
+    per_page = per_page or getattr(settings, 'COURSES_PER_PAGE', 24)
+    queryset = queryset.order_by(*ORDERING)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # One extra row tells us whether another page exists without a COUNT
+    rows = list(queryset[:per_page + 1])
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > per_page else None
+    return KeysetPage(items=items, next_cursor=next_cursor)
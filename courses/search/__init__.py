@@ -0,0 +1,31 @@
+### courses/search/__init__.py
+
+"""
+Course catalogue search.
+
+The backend is chosen with the ``COURSE_SEARCH_BACKEND`` setting (a dotted
+path to a ``SearchBackend`` subclass). It is kept up to date incrementally by
+the handlers in courses/signals.py and can be rebuilt with the
+``reindex_courses`` command.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import SearchBackend, SearchHit
+
+DEFAULT_BACKEND = 'courses.search.sqlite.SQLiteFTSBackend'
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_search_backend():
+    return _load_backend(getattr(settings, 'COURSE_SEARCH_BACKEND', DEFAULT_BACKEND))
+
+
+__all__ = ['SearchBackend', 'SearchHit', 'get_search_backend']
@@ -0,0 +1,53 @@
+### courses/search/base.py
+
+from dataclasses import dataclass
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# Markers wrapped around matched terms by backends; swapped for <mark> tags
+# only after the surrounding text has been escaped.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+def render_snippet(text):
+    html = escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    return mark_safe(html)
+
+
+@dataclass
+class SearchHit:
+    course_id: int
+    rank: float
+    snippet: str = ''
+
+
+class SearchBackend:
+    """Interface every course search backend implements."""
+
+    def index(self, courses):
+        """Add or replace the index entries for ``courses``."""
+        raise NotImplementedError
+
+    def remove(self, course_ids):
+        """Drop the index entries for ``course_ids``."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop every index entry."""
+        raise NotImplementedError
+
+    def search(self, query, limit=100):
+        """Return up to ``limit`` ``SearchHit``s, best match first."""
+        raise NotImplementedError
+
+    @staticmethod
+    def document(course):
+        """The searchable fields of a course, as indexed by every backend."""
+        return {
+            'title': course.title,
+            'description': course.description,
+            'teacher': course.teacher.username,
+            'topic': course.topic.name,
+        }
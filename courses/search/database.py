@@ -0,0 +1,32 @@
+### courses/search/database.py
+
+from django.db.models import Q
+
+from .base import SearchBackend, SearchHit
+
+
+class DatabaseBackend(SearchBackend):
+    """
+    Unindexed fallback for databases without a full-text engine. Matches with
+    ``icontains`` like the original course_list search and ranks by recency.
+    """
+
+    def index(self, courses):
+        pass
+
+    def remove(self, course_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit=100):
+        from courses.models import Course
+
+        ids = (Course.objects
+               .filter(Q(title__icontains=query) |
+                       Q(description__icontains=query) |
+                       Q(teacher__username__icontains=query) |
+                       Q(topic__name__icontains=query))
+               .values_list('pk', flat=True)[:limit])
+        return [SearchHit(course_id=pk, rank=position) for position, pk in enumerate(ids)]
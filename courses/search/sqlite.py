@@ -0,0 +1,76 @@
+### courses/search/sqlite.py
+
+import re
+
+from django.db import connection
+
+from .base import HIGHLIGHT_END, HIGHLIGHT_START, SearchBackend, SearchHit
+
+TABLE = 'courses_course_fts'
+
+# Column weights for bm25(): title, description, teacher, topic
+WEIGHTS = (10.0, 1.0, 4.0, 6.0)
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+    "USING fts5(title, description, teacher, topic, tokenize='porter unicode61')"
+)
+DROP_TABLE_SQL = f'DROP TABLE IF EXISTS {TABLE}'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match,
+    the last one as a prefix so results update while the user is typing.
+    Quoting each token keeps user input from being parsed as FTS5 syntax.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Inverted index in an SQLite FTS5 table keyed by course id (rowid)."""
+
+    def index(self, courses):
+        rows = []
+        for course in courses:
+            doc = self.document(course)
+            rows.append((course.pk, doc['title'], doc['description'], doc['teacher'], doc['topic']))
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, title, description, teacher, topic) '
+                'VALUES (%s, %s, %s, %s, %s)',
+                rows
+            )
+
+    def remove(self, course_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(pk,) for pk in course_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+
+    def search(self, query, limit=100):
+        expression = build_match_expression(query)
+        if expression is None:
+            return []
+        weights = ', '.join(str(w) for w in WEIGHTS)
+        sql = (
+            f"SELECT rowid, bm25({TABLE}, {weights}) AS rank, "
+            f"snippet({TABLE}, -1, %s, %s, '…', 24) "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY rank LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [HIGHLIGHT_START, HIGHLIGHT_END, expression, limit])
+            return [SearchHit(course_id=pk, rank=rank, snippet=snippet)
+                    for pk, rank, snippet in cursor.fetchall()]
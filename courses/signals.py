@@ -0,0 +1,121 @@
+### courses/signals.py
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Course, CourseStats, Topic
+from .fragments import bump_version
+from .search import get_search_backend
+from .stats import refresh_student_stats, refresh_video_stats
+
+
+def _course_id_for_video(video_id):
+    Video = apps.get_model('videos', 'Video')
+    return Video.objects.filter(pk=video_id).values_list('course_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        CourseStats.objects.get_or_create(course=instance)
+
+
+@receiver(post_save, sender='videos.Video')
+@receiver(post_delete, sender='videos.Video')
+def video_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        course_id = instance.course_id
+        transaction.on_commit(lambda: refresh_video_stats(course_id))
+
+
+@receiver(post_save, sender='videos.VideoProgress')
+@receiver(post_delete, sender='videos.VideoProgress')
+def progress_changed(sender, instance, created=True, raw=False, **kwargs):
+    # Updates to an existing row never change who has started the course
+    if created and not raw:
+        course_id = _course_id_for_video(instance.video_id)
+        if course_id is not None:
+            transaction.on_commit(lambda: refresh_student_stats(course_id))
+
+
+@receiver(post_save, sender=Course)
+def index_course(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+def _reindex_courses(courses):
+    """Reindex ``courses`` (a queryset) and retire their cached cards, in batches."""
+    batch_size = getattr(settings, 'COURSE_REINDEX_BATCH_SIZE', 500)
+    batch = []
+    for course in courses.select_related('teacher', 'topic').order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(course)
+        bump_version(course.pk)
+        if len(batch) >= batch_size:
+            get_search_backend().index(batch)
+            batch = []
+    get_search_backend().index(batch)
+
+
+@receiver(post_save, sender=Topic)
+def reindex_topic_courses(sender, instance, created, raw=False, **kwargs):
+    # A topic or teacher can have many courses; rather than hold the saving
+    # transaction open, they are reindexed once it commits
+    if not created and not raw:
+        topic_id = instance.pk
+        transaction.on_commit(lambda: _reindex_courses(Course.objects.filter(topic_id=topic_id)))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def reindex_teacher_courses(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins only touch last_login; names are what the index and cards show
+    name_fields = {'username', 'first_name', 'last_name'}
+    if created or raw or (update_fields is not None and not name_fields & set(update_fields)):
+        return
+    teacher_id = instance.pk
+    transaction.on_commit(lambda: _reindex_courses(Course.objects.filter(teacher_id=teacher_id)))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=CourseStats)
+@receiver(post_save, sender='videos.Video')
+@receiver(post_delete, sender='videos.Video')
+def bump_course_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        course_id = instance.pk if sender is Course else instance.course_id
+        transaction.on_commit(lambda: bump_version(course_id))
+
+
+@receiver(post_save, sender='videos.Comment')
+@receiver(post_delete, sender='videos.Comment')
+def bump_comment_course_fragments(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    course_id = _course_id_for_video(instance.video_id)
+    if course_id is not None:
+        transaction.on_commit(lambda: bump_version(course_id))
+
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender='videos.Video')
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def queue_image_derivatives(sender, instance, raw=False, update_fields=None, **kwargs):
+    field = 'thumbnail' if hasattr(instance, 'thumbnail') else 'profile_picture'
+    image = getattr(instance, field)
+    if raw or not image or (update_fields is not None and field not in update_fields):
+        return
+    # Rendering is left to process_media rather than the saving request;
+    # renditions that already exist are skipped there
+    MediaJob = apps.get_model('videos', 'MediaJob')
+    if not MediaJob.objects.filter(kind='derivatives', image=image.name, status='queued').exists():
+        MediaJob.objects.create(kind='derivatives', image=image.name)
@@ -0,0 +1,65 @@
+### courses/slugs.py
+
+"""
+Unique slug allocation for a whole batch of objects at once.
+
+``allocate_slugs`` finds every slug already taken under the batch's base
+slugs with one prefix query (per ``LOOKUP_CHUNK`` distinct bases) and hands
+out the next free ``-N`` suffix in memory, instead of probing the database
+once per collision.
+"""
+
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+LOOKUP_CHUNK = 200
+# Room left in the field for a "-<number>" suffix
+SUFFIX_ROOM = 8
+SUFFIXED = re.compile(r'^(.+)-(\d+)$')
+
+
+def base_slug(text, max_length=50, fallback='item'):
+    slug = slugify(text)[:max_length - SUFFIX_ROOM].strip('-')
+    return slug or fallback
+
+
+def _taken(queryset, field, bases):
+    """``{base: {suffix numbers in use}}``; 0 stands for the bare base."""
+    taken = {base: set() for base in bases}
+    bases = sorted(bases)
+    for start in range(0, len(bases), LOOKUP_CHUNK):
+        chunk = bases[start:start + LOOKUP_CHUNK]
+        condition = reduce(or_, (Q(**{field: base}) | Q(**{f'{field}__startswith': f'{base}-'}) for base in chunk))
+        for slug in queryset.filter(condition).values_list(field, flat=True):
+            # "python-2" is both the bare "python-2" and suffix 2 of "python"
+            if slug in taken:
+                taken[slug].add(0)
+            match = SUFFIXED.match(slug)
+            if match and match.group(1) in taken:
+                taken[match.group(1)].add(int(match.group(2)))
+    return taken
+
+
+def allocate_slugs(model, texts, field='slug'):
+    """
+    Unique slugs for ``texts``, in order, given those already stored on
+    ``model``. Slugs follow the ``Course.save()`` scheme: ``base``, then
+    ``base-1``, ``base-2``...
+    """
+    max_length = model._meta.get_field(field).max_length
+    bases = [base_slug(text, max_length) for text in texts]
+    taken = _taken(model._default_manager.all(), field, set(bases))
+
+    next_free = dict.fromkeys(taken, 0)
+    slugs = []
+    for base in bases:
+        number = next_free[base]
+        while number in taken[base]:
+            number += 1
+        next_free[base] = number + 1
+        slugs.append(f'{base}-{number}' if number else base)
+    return slugs
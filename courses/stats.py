@@ -0,0 +1,83 @@
+### courses/stats.py
+
+"""
+Maintenance of the denormalized ``CourseStats`` rows.
+
+Each refresh recomputes one course's numbers with a single aggregate over an
+indexed foreign key, so it costs the same no matter how many courses exist.
+"""
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.db.models import Count, Sum
+
+from .models import Course, CourseStats
+
+
+def _video_aggregates(course_id):
+    Video = apps.get_model('videos', 'Video')
+    agg = Video.objects.filter(course_id=course_id).aggregate(
+        video_count=Count('id'),
+        total_duration=Sum('duration'),
+    )
+    return {
+        'video_count': agg['video_count'],
+        'total_duration': agg['total_duration'] or timedelta(),
+    }
+
+
+def _student_count(course_id):
+    VideoProgress = apps.get_model('videos', 'VideoProgress')
+    return (VideoProgress.objects
+            .filter(video__course_id=course_id, user__user_type='student')
+            .values('user')
+            .distinct()
+            .count())
+
+
+def _update(course_id, values):
+    # The course may have been deleted by the time an on_commit hook runs
+    if Course.objects.filter(pk=course_id).exists():
+        CourseStats.objects.update_or_create(course_id=course_id, defaults=values)
+
+
+def refresh_video_stats(course_id):
+    _update(course_id, _video_aggregates(course_id))
+
+
+def refresh_video_stats_many(course_ids):
+    """``refresh_video_stats`` for many courses with one grouped aggregate."""
+    Video = apps.get_model('videos', 'Video')
+    course_ids = list(course_ids)
+    aggregates = {
+        row['course_id']: row
+        for row in (Video.objects.filter(course_id__in=course_ids).values('course_id')
+                    .annotate(video_count=Count('id'), total_duration=Sum('duration')).order_by())
+    }
+    CourseStats.objects.bulk_create(
+        [CourseStats(
+            course_id=pk,
+            video_count=aggregates.get(pk, {}).get('video_count', 0),
+            total_duration=aggregates.get(pk, {}).get('total_duration') or timedelta(),
+        ) for pk in course_ids],
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=['video_count', 'total_duration', 'updated_at'],
+    )
+
+
+def refresh_student_stats(course_id):
+    _update(course_id, {'student_count': _student_count(course_id)})
+
+
+def rebuild_course_stats(course_ids=None):
+    """Recompute stats rows from scratch; returns the number of courses rebuilt."""
+    courses = Course.objects.order_by('pk')
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    rebuilt = 0
+    for course_id in courses.values_list('pk', flat=True).iterator():
+        _update(course_id, {**_video_aggregates(course_id), 'student_count': _student_count(course_id)})
+        rebuilt += 1
+    return rebuilt
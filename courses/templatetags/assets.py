@@ -0,0 +1,52 @@
+from django import template
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+register = template.Library()
+
+STYLESHEET = 'css/app.css'
+NOT_BUILT = (f'{STYLESHEET} has not been built. Run `npm run build:css` and `manage.py collectstatic`, '
+             'or set STYLESHEET_CDN_FALLBACK in development.')
+
+
+def bundle_url():
+    """URL of the built Tailwind bundle, or ``None`` if it hasn't been built."""
+    try:
+        href = static(STYLESHEET)
+    except ValueError:
+        # Not in the collectstatic manifest
+        return None
+    if settings.DEBUG or not hasattr(staticfiles_storage, 'manifest_name'):
+        # Nothing checked this URL against the files on disk
+        return href if finders.find(STYLESHEET) else None
+    return href
+
+
+def cdn_fallback():
+    return getattr(settings, 'STYLESHEET_CDN_FALLBACK', settings.DEBUG)
+
+
+@register.inclusion_tag('_stylesheet.html')
+def app_stylesheet():
+    """
+    ``<link>`` to the built Tailwind bundle. Until ``npm run build:css`` (and
+    ``collectstatic``) has been run, development pages fall back to the
+    in-browser CDN compiler; anywhere else rendering fails.
+    """
+    href = bundle_url()
+    if href is None:
+        if not cdn_fallback():
+            raise ImproperlyConfigured(NOT_BUILT)
+        return {'cdn': True}
+    return {'href': href}
+
+
+@checks.register(checks.Tags.staticfiles, deploy=True)
+def check_stylesheet_built(app_configs, **kwargs):
+    if cdn_fallback() or bundle_url() is not None:
+        return []
+    return [checks.Error(NOT_BUILT, id='courses.E001')]
@@ -0,0 +1,18 @@
+from django import template
+
+from courses.fragments import get_versions
+
+register = template.Library()
+
+
+@register.filter
+def course_version(course):
+    """
+    Fragment cache version for ``course``, for use as a ``{% cache %}``
+    vary-on argument. Views should call ``attach_versions()`` first so a page
+    of cards costs one cache round trip instead of one per card.
+    """
+    version = getattr(course, 'cache_version', None)
+    if version is None:
+        version = course.cache_version = get_versions([course.pk])[course.pk]
+    return version
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from learnhub.images import srcsets
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, alt='', sizes='100vw', css_class=''):
+    """
+    ``<picture>`` with WebP and JPEG ``srcset``s for an ``ImageField`` value
+    (see learnhub/images.py), lazily loaded. ``sizes`` should describe the
+    box the image is shown in, e.g. ``"96px"``. Falls back to the original
+    upload when its renditions can't be made.
+    """
+    if not image:
+        return ''
+    sets = srcsets(image)
+    if sets is None:
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">',
+                           image.url, alt, css_class)
+
+    def srcset(fmt):
+        return format_html_join(', ', '{} {}w', sets[fmt])
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((f'image/{fmt}', srcset(fmt), sizes) for fmt in sets if fmt != 'jpg'),
+    )
+    fallback = sets.get('jpg') or next(iter(sets.values()))
+    # The middle width is a sensible src for browsers without srcset support
+    src = fallback[len(fallback) // 2][0]
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, src, format_html_join(', ', '{} {}w', fallback), sizes, alt, css_class,
+    )
@@ -0,0 +1,25 @@
+from django import template
+
+from learnhub.loaders import user_state
+
+register = template.Library()
+
+
+# Each filter takes the request; views should prime its loader with the
+# page's videos and courses first, so the page costs one query per kind.
+
+@register.filter
+def bookmarked(video, request):
+    return user_state(request).bookmarked(video)
+
+
+@register.filter
+def progress_for(video, request):
+    """The current user's ``VideoProgress`` for ``video``, or ``None``."""
+    return user_state(request).progress(video)
+
+
+@register.filter
+def rating_for(course, request):
+    """The current user's ``CourseRating`` for ``course``, or ``None``."""
+    return user_state(request).rating(course)
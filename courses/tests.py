@@ -1,3 +1,355 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from learnhub.instrumentation import QueryBudgetMixin
+from ratings.models import CourseRating
+from videos.models import Bookmark, Comment, Video, VideoProgress
+from videos.progress import write_progress
+from . import counters
+from .importer import CourseImporter
+from .fragments import bump_version, get_versions
+from .models import Course, CourseStats, Topic
+from .pagination import InvalidCursor, paginate
+from .search import get_search_backend
+from .templatetags.assets import check_stylesheet_built
+from .slugs import allocate_slugs
+from .stats import rebuild_course_stats
+
+# Buffered writes flush on a timer, which would make query counts depend on timing
+HOLD_BUFFERED_WRITES = {
+    'VIEW_COUNTER_FLUSH_INTERVAL': 3600,
+    'VIEW_EVENT_FLUSH_INTERVAL': 3600,
+    'PROGRESS_FLUSH_INTERVAL': 3600,
+}
+
+MANIFEST_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+
+class StylesheetTests(TestCase):
+
+    def test_pages_render_before_the_bundle_is_built(self):
+        for url in ('/', '/courses/', '/courses/topics/', '/accounts/login/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, 'cdn.tailwindcss.com')
+
+    @override_settings(STORAGES=MANIFEST_STORAGES, STYLESHEET_CDN_FALLBACK=False)
+    def test_missing_bundle_fails_outside_development(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'css/app.css has not been built'):
+            self.client.get('/')
+        self.assertEqual([error.id for error in check_stylesheet_built(None)], ['courses.E001'])
+
+    @override_settings(STORAGES=MANIFEST_STORAGES)
+    def test_missing_manifest_entry_falls_back_to_the_cdn(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'cdn.tailwindcss.com')
+
+    def test_built_bundle_is_linked(self):
+        with tempfile.TemporaryDirectory() as static_dir:
+            os.makedirs(os.path.join(static_dir, 'css'))
+            with open(os.path.join(static_dir, 'css', 'app.css'), 'w') as fh:
+                fh.write('body{}')
+            with override_settings(STATICFILES_DIRS=[static_dir]):
+                response = self.client.get('/')
+        self.assertContains(response, '<link rel="stylesheet" href="/static/css/app.css">')
+        self.assertNotContains(response, 'cdn.tailwindcss.com')
+
+
+class CourseFragmentTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        self.course = Course.objects.create(title='Django', description='d', teacher=teacher,
+                                            topic=Topic.objects.create(name='Python'))
+
+    def test_edits_retire_the_cached_cards(self):
+        self.assertContains(self.client.get('/courses/'), 'Django')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.title = 'Flask'
+            self.course.save()
+        response = self.client.get('/courses/')
+        self.assertContains(response, 'Flask')
+        self.assertNotContains(response, 'Django')
+
+    def test_cached_fragments_hold_whole_elements(self):
+        self.client.get('/courses/')
+        version = get_versions([self.course.pk])[self.course.pk]
+        for name in ('course_card_image', 'course_card_head', 'course_card_footer'):
+            fragment = cache.get(make_template_fragment_key(name, [self.course.pk, version]))
+            self.assertIsNotNone(fragment, name)
+            self.assertEqual(fragment.count('<div'), fragment.count('</div>'), name)
+
+    def test_lost_versions_never_repeat(self):
+        version = get_versions([self.course.pk])[self.course.pk]
+        bump_version(self.course.pk)
+        bumped = get_versions([self.course.pk])[self.course.pk]
+        self.assertGreater(bumped, version)
+        cache.delete(f'course-version:{self.course.pk}')
+        self.assertGreater(get_versions([self.course.pk])[self.course.pk], bumped)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('ada', password='pw', user_type='teacher')
+        self.python = Topic.objects.create(name='Python')
+        self.web = Topic.objects.create(name='Web')
+
+    def course(self, title, description='d', topic=None):
+        return Course.objects.create(title=title, description=description, teacher=self.teacher,
+                                     topic=topic or self.python)
+
+    def search(self, query):
+        return [hit.course_id for hit in get_search_backend().search(query)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        mention = self.course('Web basics', 'Ends with a short look at django templates')
+        title = self.course('Django in depth')
+        self.assertEqual(self.search('django'), [title.pk, mention.pk])
+        # The last word matches as a prefix; every word must match
+        self.assertEqual(self.search('djan'), [title.pk, mention.pk])
+        self.assertEqual(self.search('django depth'), [title.pk])
+        # FTS5 syntax in the query is matched as plain words
+        self.assertEqual(self.search('django* ('), [title.pk, mention.pk])
+
+    def test_snippets_are_escaped(self):
+        self.course('Security', 'Never trust <script>alert(1)</script> in a django form')
+        content = self.client.get(reverse('course_list'), {'search': 'django'}).content.decode()
+        self.assertIn('&lt;script&gt;alert(1)&lt;/script&gt; in a <mark>django</mark>', content)
+        self.assertNotIn('<script>alert(1)', content)
+
+    def test_deleted_courses_leave_the_index(self):
+        course = self.course('Django')
+        course.delete()
+        self.assertEqual(self.search('django'), [])
+
+    def test_topic_and_teacher_renames_reindex_their_courses(self):
+        course = self.course('Django', topic=self.web)
+        other = self.course('Flask')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.web.name = 'Backend'
+            self.web.save()
+            # Left until the rename commits
+            self.assertEqual(self.search('backend'), [])
+        self.assertEqual(self.search('backend'), [course.pk])
+        self.assertEqual(self.search('web'), [])
+
+        with mock.patch('courses.signals._reindex_courses') as reindex, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.teacher.last_login = timezone.now()
+            self.teacher.save(update_fields=['last_login'])
+        reindex.assert_not_called()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.username = 'grace'
+            self.teacher.save()
+        self.assertEqual(sorted(self.search('grace')), sorted([course.pk, other.pk]))
+        self.assertEqual(self.search('ada'), [])
+
+
+def make_catalogue(courses=10, videos=3):
+    """A teacher's courses and a student who bookmarked, watched and rated all of them."""
+    teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+    student = CustomUser.objects.create_user('student', password='pw', user_type='student')
+    topic = Topic.objects.create(name='Python')
+    positions = {}
+    for i in range(courses):
+        course = Course.objects.create(title=f'Course {i}', description='d', teacher=teacher, topic=topic)
+        CourseRating.objects.create(user=student, course=course, rating=4)
+        for j in range(videos):
+            video = Video.objects.create(title=f'Video {j}', course=course, video_file='videos/x.mp4',
+                                         duration=timedelta(seconds=100))
+            Bookmark.objects.create(user=student, video=video)
+            positions[student.pk, video.pk] = 50
+    write_progress(positions)
+    # Stats are refreshed on commit, which a TestCase never does
+    rebuild_course_stats()
+    return teacher, student
+
+
+@override_settings(**HOLD_BUFFERED_WRITES)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Page query counts, from a cold cache, stay flat however many rows are shown."""
+
+    def setUp(self):
+        cache.clear()
+        self.teacher, self.student = make_catalogue()
+        self.course = Course.objects.latest('created_at', 'id')
+
+    def test_listing(self):
+        with self.assertQueryBudget(2):
+            response = self.client.get('/courses/')
+        self.assertContains(response, 'Course 9')
+        cache.clear()
+        self.client.force_login(self.student)
+        with self.assertQueryBudget(3):
+            self.client.get('/courses/')
+        with self.assertQueryBudget(2):
+            self.assertEqual(self.client.get('/courses/feed/').status_code, 200)
+
+    def test_course_detail(self):
+        self.client.force_login(self.student)
+        with self.assertQueryBudget(9):
+            response = self.client.get(reverse('course_detail', args=[self.course.slug]))
+        self.assertContains(response, 'Video 2')
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        make_catalogue(courses=7, videos=0)
+        # Ties on created_at fall back to the id
+        Course.objects.filter(title__in=['Course 2', 'Course 3', 'Course 4']).update(
+            created_at=Course.objects.get(title='Course 2').created_at)
+
+    def test_pages_cover_every_row_once(self):
+        seen, cursor = [], None
+        while True:
+            page = paginate(Course.objects.all(), cursor, per_page=3)
+            seen.extend(course.pk for course in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, list(Course.objects.order_by('-created_at', '-id').values_list('pk', flat=True)))
+
+    def test_tampered_cursors(self):
+        cursor = paginate(Course.objects.all(), per_page=3).next_cursor
+        for bad in (cursor[:-2] + 'xx', 'garbage'):
+            with self.assertRaises(InvalidCursor):
+                paginate(Course.objects.all(), bad)
+            self.assertEqual(self.client.get('/courses/feed/', {'cursor': bad}).status_code, 400)
+            self.assertEqual(self.client.get('/courses/', {'cursor': bad}).status_code, 200)
+
+
+@override_settings(**HOLD_BUFFERED_WRITES)
+class ViewCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        counters.flush()
+        make_catalogue(courses=2, videos=0)
+        self.course = Course.objects.first()
+
+    def test_views_are_buffered_then_written_in_one_update(self):
+        for _ in range(3):
+            self.course.increment_views()
+        self.assertEqual(Course.objects.get(pk=self.course.pk).view_count, 0)
+        self.assertEqual(self.course.get_view_count(), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counters.flush(), 3)
+        self.assertEqual([q['sql'].split()[0] for q in queries if 'view_count' in q['sql']], ['UPDATE'])
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.view_count, 3)
+        self.assertEqual(self.course.get_view_count(), 3)
+
+    def test_a_held_lock_defers_the_flush(self):
+        self.course.increment_views()
+        cache.add(counters.FLUSH_LOCK_KEY, 1)
+        self.assertIsNone(counters.flush())
+        cache.delete(counters.FLUSH_LOCK_KEY)
+        self.assertEqual(counters.flush(), 1)
+
+    def test_a_failed_flush_writes_each_view_once(self):
+        for _ in range(3):
+            self.course.increment_views()
+        # The cache going away mid-flush must not leave written views pending
+        with mock.patch.object(counters._cache(), 'decr', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                counters.flush()
+        self.assertEqual(Course.objects.get(pk=self.course.pk).view_count, 0)
+        # Nor may a failed UPDATE drop the views it took off the cache
+        with mock.patch('django.db.models.QuerySet.update', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                counters.flush()
+        self.assertEqual(self.course.get_view_count(), 3)
+        self.assertEqual(counters.flush(), 3)
+        self.assertEqual(counters.flush(), 0)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.view_count, 3)
+
+
+class CourseStatsTests(TestCase):
+
+    def test_missing_row_falls_back_to_the_aggregates(self):
+        make_catalogue(courses=1, videos=3)
+        CourseStats.objects.all().delete()
+        course = Course.objects.get()
+        self.assertEqual(course.get_total_duration(), 5)
+        self.assertEqual(course.get_student_count(), 1)
+        # An empty course has nothing to aggregate
+        empty = Course.objects.create(title='Empty', description='d', teacher=course.teacher, topic=course.topic)
+        CourseStats.objects.filter(course=empty).delete()
+        empty = Course.objects.get(pk=empty.pk)
+        self.assertEqual((empty.get_total_duration(), empty.get_student_count()), (0, 0))
+
+
+class SeedDataTests(TestCase):
+    options = dict(students=5, teachers=2, topics=2, courses=3, videos=6, comments=20, progress=40,
+                   bookmarks=12, batch_size=7, no_index=True)
+
+    def test_unique_pairs_and_inserted_counts(self):
+        out = StringIO()
+        call_command('seed_data', stdout=out, **self.options)
+        # 40 progress rows asked for, but 5 students x 6 videos is all there is
+        self.assertEqual(VideoProgress.objects.count(), 30)
+        self.assertEqual(Bookmark.objects.count(), 12)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertIn('bookmarks: 12 rows', out.getvalue())
+
+        # Progress covers every pair, so a rerun over the same videos inserts nothing
+        out = StringIO()
+        call_command('seed_data', stdout=out, **{**self.options, 'videos': 0, 'comments': 0})
+        self.assertEqual(VideoProgress.objects.count(), 30)
+        self.assertIn(': 0 rows in', out.getvalue())
+        self.assertIn('30 already existed', out.getvalue())
+
+
+class ImporterTopicTests(TestCase):
+
+    def setUp(self):
+        CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        # Another import already holds the slug this chunk will be handed first
+        Topic.objects.create(name='Python!', slug='python')
+
+    def run_import(self):
+        rows = [(1, {'type': 'course', 'title': 'Django', 'teacher': 'teacher', 'topic': 'Python'})]
+        return CourseImporter().run(rows)
+
+    def test_slug_taken_between_allocation_and_insert(self):
+        stale = iter([['python']])
+        with mock.patch('courses.importer.allocate_slugs',
+                        side_effect=lambda model, texts: next(stale, None) or allocate_slugs(model, texts)):
+            result = self.run_import()
+        self.assertEqual(result.failed, [])
+        course = Course.objects.get(title='Django')
+        self.assertEqual((course.topic.name, course.topic.slug), ('Python', 'python-1'))
+        self.assertEqual(result.topics, 1)
+
+    def test_rows_fail_if_no_slug_can_be_had(self):
+        with mock.patch('courses.importer.allocate_slugs',
+                        side_effect=lambda model, texts: ['python'] * len(texts) if model is Topic
+                        else allocate_slugs(model, texts)):
+            result = self.run_import()
+        self.assertEqual(len(result.failed), 1)
+        self.assertIn('no free slug', result.failed[0].errors[0])
+        self.assertFalse(Course.objects.filter(title='Django').exists())
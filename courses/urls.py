@@ -5,6 +5,7 @@ from . import views
 
 urlpatterns = [
     path('', views.course_list, name='course_list'),
+    path('feed/', views.course_feed, name='course_feed'),
     path('topics/', views.topic_list, name='topic_list'),
     path('topics/<slug:slug>/', views.topic_detail, name='topic_detail'),
     path('create/', views.create_course, name='create_course'),
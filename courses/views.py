@@ -1,36 +1,85 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.db import models  # Added this import
 from .models import Course, Topic
 from .forms import CourseForm, TopicForm
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Case, Count, When
+from .search import get_search_backend
+from .search.base import render_snippet
+from .fragments import attach_versions
+from .pagination import InvalidCursor, KeysetPage, paginate
+from analytics.events import record_event
+from learnhub.loaders import user_state
+from analytics.recommendations import similar_courses
+from analytics.trending import top_courses
+
+def home(request):
+    """Landing page, with the trending courses served from the leaderboard"""
+    trending, title = top_courses('trending'), 'Trending Now'
+    if not trending:
+        trending, title = top_courses('popular'), 'Popular Courses'
+    attach_versions(trending)
+    return render(request, 'home.html', {'trending_courses': trending, 'trending_title': title})
+
+def _filtered_courses(request):
+    """Courses matching the search/topic querystring, plus search snippets"""
+    courses = Course.objects.all().select_related('teacher', 'topic', 'stats')
+    
+    # Search functionality - ranked results from the search index
+    search_query = request.GET.get('search', '')
+    snippets = {}
+    if search_query:
+        limit = getattr(settings, 'COURSE_SEARCH_RESULT_LIMIT', 200)
+        hits = get_search_backend().search(search_query, limit=limit)
+        snippets = {hit.course_id: render_snippet(hit.snippet) for hit in hits}
+        if hits:
+            relevance = Case(*[When(pk=hit.course_id, then=position)
+                               for position, hit in enumerate(hits)])
+            courses = courses.filter(pk__in=snippets).order_by(relevance)
+        else:
+            courses = courses.none()
+    
+    # Topic filtering
+    topic_filter = request.GET.get('topic')
+    if topic_filter:
+        courses = courses.filter(topic__slug=topic_filter)
+    
+    return courses, snippets
+
+def _course_page(request, courses, snippets):
+    """
+    Keyset page for browsing; search results are already relevance-ranked and
+    capped at COURSE_SEARCH_RESULT_LIMIT, so they are returned as one page.
+    """
+    if snippets:
+        courses = list(courses)
+        for course in courses:
+            course.search_snippet = snippets.get(course.pk)
+        page = KeysetPage(items=courses)
+    else:
+        page = paginate(courses, request.GET.get('cursor'))
+    attach_versions(page.items)
+    return page
 
 def course_list(request):
     try:
-        courses = Course.objects.all().select_related('teacher', 'topic')
-        topics = Topic.objects.all()
-        
-        # Search functionality - Parentheses now properly closed
-        search_query = request.GET.get('search', '')
-        if search_query:
-            courses = courses.filter(
-                Q(title__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(teacher__username__icontains=search_query) |
-                Q(topic__name__icontains=search_query)
-            )  # This parenthesis was missing
-        
-        # Topic filtering
-        topic_filter = request.GET.get('topic')
-        if topic_filter:
-            courses = courses.filter(topic__slug=topic_filter)
+        courses, snippets = _filtered_courses(request)
+        try:
+            page = _course_page(request, courses, snippets)
+        except InvalidCursor:
+            page = paginate(courses)
+            attach_versions(page.items)
         
         context = {
-            'courses': courses,
-            'topics': topics,
-            'selected_topic': topic_filter,
-            'search_query': search_query
+            'courses': page.items,
+            'page': page,
+            'topics': Topic.objects.all(),
+            'selected_topic': request.GET.get('topic'),
+            'search_query': request.GET.get('search', '')
         }
         return render(request, 'courses/course_list.html', context)
     
@@ -38,9 +87,20 @@ def course_list(request):
         messages.error(request, 'Error loading courses. Please try again.')
         return render(request, 'courses/course_list.html', {'courses': [], 'topics': []})
 
+def course_feed(request):
+    """JSON fragment of the next page of course cards for infinite scroll"""
+    courses, snippets = _filtered_courses(request)
+    try:
+        page = _course_page(request, courses, snippets)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    
+    html = render_to_string('courses/_course_cards.html', {'courses': page.items}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
 def topic_list(request):
     try:
-        topics = Topic.objects.all()
+        topics = Topic.objects.annotate(course_count=Count('courses'))
         return render(request, 'courses/topic_list.html', {'topics': topics})
     except Exception as e:
         messages.error(request, 'Error loading topics.')
@@ -49,10 +109,19 @@ def topic_list(request):
 def topic_detail(request, slug):
     try:
         topic = get_object_or_404(Topic, slug=slug)
-        courses = Course.objects.filter(topic=topic).select_related('teacher')
+        courses = Course.objects.filter(topic=topic).select_related('teacher', 'topic', 'stats')
+        try:
+            page = paginate(courses, request.GET.get('cursor'))
+        except InvalidCursor:
+            page = paginate(courses)
+        # Only the first page leads with the topic's trending courses
+        trending = [] if request.GET.get('cursor') else top_courses('trending', topic.pk, limit=3)
+        attach_versions(page.items + trending)
         return render(request, 'courses/topic_detail.html', {
             'topic': topic,
-            'courses': courses
+            'courses': page.items,
+            'page': page,
+            'trending_courses': trending,
         })
     except Http404:
         raise
@@ -62,22 +131,34 @@ def topic_detail(request, slug):
 
 def course_detail(request, slug):
     try:
-        course = get_object_or_404(Course, slug=slug)
-        videos = course.videos.all()
+        course = get_object_or_404(Course.objects.select_related('teacher', 'topic', 'stats'), slug=slug)
+        # Only evaluated when the cached video list fragment has expired
+        videos = course.videos.annotate(comment_count=Count('comments'))
         
         # Check if user is authenticated before counting view
         if request.user.is_authenticated:
             course.increment_views()
+            record_event(course.pk, user_id=request.user.pk)
         
         # Calculate average rating safely
         rating_agg = course.ratings.aggregate(models.Avg('rating'))
         avg_rating = rating_agg['rating__avg'] if rating_agg else None
         
+        # The video list is a shared cached fragment, so the user's bookmark
+        # and progress badges are sent alongside it and applied client-side
+        video_state = None
+        if request.user.is_authenticated:
+            state = user_state(request).prime(courses=[course])
+            video_state = state.video_state(course.videos.values_list('pk', flat=True))
+        
         context = {
             'course': course,
             'videos': videos,
+            'video_state': video_state,
+            'view_count': course.get_view_count(),
             'is_teacher': request.user.is_authenticated and request.user == course.teacher,
-            'average_rating': avg_rating
+            'average_rating': avg_rating,
+            'similar_courses': similar_courses(course),
         }
         return render(request, 'courses/course_detail.html', context)
     
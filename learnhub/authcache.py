@@ -0,0 +1,247 @@
+### learnhub/authcache.py
+
+"""
+Cached session and authenticated-user lookups.
+
+Out of the box every authenticated request reads its session row and then
+its ``CustomUser`` row before the view runs. Here:
+
+* Sessions (``SESSION_ENGINE = 'learnhub.authcache'``) are Django's
+  ``cached_db`` store: read from ``SESSION_CACHE_ALIAS``, falling back to
+  the database, and written to both. Sessions have no per-process copy: a
+  logout, or a write made by another worker, must be seen on the next
+  request.
+* Users (``CachedModelBackend``) are served from a per-process copy kept
+  for ``AUTH_USER_LOCAL_TIMEOUT`` seconds, then from ``AUTH_USER_CACHE``,
+  then from the database. A full ``save()`` writes the new field values
+  through to the shared cache and any other change (partial saves,
+  deletes, logout) drops the entry (see accounts/signals.py). Other
+  workers can keep a stale local copy for up to the local timeout, so keep
+  it short; 0 turns the local tier off.
+
+Only concrete field values are cached, never model instances, so every
+request gets its own ``CustomUser`` and adding a field to the model
+changes the cache key instead of unpickling old objects.
+
+Both caches must be shared between workers; ``check_shared_caches`` (run
+at startup) refuses a process-local cache when ``WEB_CONCURRENCY`` says
+there is more than one.
+
+Hit and miss counts are kept per worker and added to the shared cache
+every ``AUTH_CACHE_METRICS_INTERVAL`` seconds; ``auth_cache_stats`` reports
+them as database round trips saved.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.sessions.backends import cached_db
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+
+KEY_PREFIX = 'authcache'
+METRICS = (
+    'session_loads', 'session_db_loads',
+    'user_loads', 'user_local_hits', 'user_shared_hits', 'user_db_loads',
+)
+
+_local = {}
+_local_lock = threading.Lock()
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+_state = {'last_flush': time.monotonic()}
+
+PROCESS_LOCAL_BACKENDS = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE', 'default')]
+
+
+def check_shared_caches():
+    """
+    Raise ``ImproperlyConfigured`` if sessions or users are cached per
+    process while several workers serve requests: a logout or password
+    change handled by one would not reach the others.
+    """
+    if getattr(settings, 'WEB_CONCURRENCY', 1) <= 1:
+        return
+    for setting in ('SESSION_CACHE_ALIAS', 'AUTH_USER_CACHE'):
+        alias = getattr(settings, setting, 'default')
+        if settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+            raise ImproperlyConfigured(
+                f"{setting} is the process-local cache {alias!r}, but WEB_CONCURRENCY is "
+                f"{settings.WEB_CONCURRENCY}. Set REDIS_URL (or point CACHES[{alias!r}] at "
+                f"Redis or Memcached) so every worker sees logouts and password changes."
+            )
+
+
+# Metrics
+
+def record(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+        due = time.monotonic() - _state['last_flush'] >= getattr(settings, 'AUTH_CACHE_METRICS_INTERVAL', 30)
+    if due:
+        flush_metrics()
+
+
+def flush_metrics():
+    """Add this worker's counts to the shared totals."""
+    with _metrics_lock:
+        batch = dict(_metrics)
+        _metrics.clear()
+        _state['last_flush'] = time.monotonic()
+    cache = _cache()
+    for name, amount in batch.items():
+        key = f'{KEY_PREFIX}:metric:{name}'
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Key evicted between add() and incr()
+            cache.set(key, amount, timeout=None)
+
+
+def metrics():
+    """Shared totals plus this worker's unflushed counts."""
+    stored = _cache().get_many([f'{KEY_PREFIX}:metric:{name}' for name in METRICS])
+    with _metrics_lock:
+        totals = {name: stored.get(f'{KEY_PREFIX}:metric:{name}', 0) + _metrics[name] for name in METRICS}
+    totals['session_hits'] = totals['session_loads'] - totals['session_db_loads']
+    totals['user_hits'] = totals['user_local_hits'] + totals['user_shared_hits']
+    totals['db_round_trips_saved'] = totals['session_hits'] + totals['user_hits']
+    return totals
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+    _cache().delete_many([f'{KEY_PREFIX}:metric:{name}' for name in METRICS])
+
+
+# Sessions
+
+class SessionStore(cached_db.SessionStore):
+
+    def load(self):
+        record('session_loads')
+        return super().load()
+
+    async def aload(self):
+        record('session_loads')
+        return await super().aload()
+
+    def _get_session_from_db(self):
+        record('session_db_loads')
+        return super()._get_session_from_db()
+
+    async def _aget_session_from_db(self):
+        record('session_db_loads')
+        return await super()._aget_session_from_db()
+
+
+# Users
+
+@lru_cache(maxsize=None)
+def _fields():
+    return tuple(field.attname for field in get_user_model()._meta.concrete_fields)
+
+
+@lru_cache(maxsize=None)
+def _schema():
+    # Part of the key, so a change to the user model starts afresh
+    return hashlib.md5(','.join(_fields()).encode()).hexdigest()[:8]
+
+
+def _user_key(user_id):
+    return f'{KEY_PREFIX}:user:{_schema()}:{user_id}'
+
+
+def user_values(user):
+    return tuple(getattr(user, name) for name in _fields())
+
+
+def build_user(values):
+    UserModel = get_user_model()
+    return UserModel.from_db(UserModel._default_manager.db, _fields(), values)
+
+
+def _local_get(user_id):
+    with _local_lock:
+        entry = _local.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _local_set(user_id, values):
+    timeout = getattr(settings, 'AUTH_USER_LOCAL_TIMEOUT', 5)
+    if timeout <= 0:
+        return
+    with _local_lock:
+        if len(_local) >= getattr(settings, 'AUTH_USER_LOCAL_MAX_ENTRIES', 10_000):
+            _local.clear()
+        _local[user_id] = (time.monotonic() + timeout, values)
+
+
+def cached_user_values(user_id):
+    """Field values of user ``user_id`` from the fastest tier that has them."""
+    record('user_loads')
+    values = _local_get(user_id)
+    if values is not None:
+        record('user_local_hits')
+        return values
+    values = _cache().get(_user_key(user_id))
+    if values is not None:
+        record('user_shared_hits')
+    else:
+        record('user_db_loads')
+        UserModel = get_user_model()
+        values = UserModel._default_manager.filter(pk=user_id).values_list(*_fields()).first()
+        if values is None:
+            return None
+        _cache().set(_user_key(user_id), values, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 3600))
+    _local_set(user_id, values)
+    return values
+
+
+def store_user(user_id, values):
+    """Write a user's field values (from ``user_values``) through to both tiers."""
+    _cache().set(_user_key(user_id), values, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 3600))
+    _local_set(user_id, values)
+
+
+def forget_local_user(user_id):
+    with _local_lock:
+        _local.pop(user_id, None)
+
+
+def invalidate_user(user_id):
+    forget_local_user(user_id)
+    _cache().delete(_user_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` whose per-request ``get_user`` is served from the cache."""
+
+    def get_user(self, user_id):
+        try:
+            user_id = get_user_model()._meta.pk.to_python(user_id)
+        except ValidationError:
+            return None
+        values = cached_user_values(user_id)
+        if values is None:
+            return None
+        user = build_user(values)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
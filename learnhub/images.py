@@ -0,0 +1,222 @@
+### learnhub/images.py
+
+"""
+Resized WebP/JPEG renditions ("derivatives") of uploaded images.
+
+Course and video thumbnails and profile pictures are stored as uploaded, but
+pages show them in 64-384px boxes. Renditions at ``IMAGE_DERIVATIVE_WIDTHS``
+are written under ``MEDIA_ROOT/derivatives/<aa>/<sha256 of the source>/``
+as ``<width>.webp`` and ``<width>.jpg``, so identical uploads share files and
+a replaced image never serves stale renditions. A ``source`` file in the
+same directory records which upload the hash belongs to.
+
+Renditions are made by a ``derivatives`` MediaJob queued when an image is
+saved (see courses/signals.py and videos/processing.py), by the
+``build_image_derivatives`` backfill command, and otherwise on the first
+request: ``image_derivative`` is routed at the same URL as the file, so a
+missing rendition falls through to Django (with nginx, ``try_files $uri
+@django`` on the derivatives location) and is generated once.
+
+The ``{% responsive_image %}`` tag in courses/templatetags/images.py emits
+the ``<picture>``/``srcset`` markup.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.utils.http import http_date
+from PIL import ExifTags, Image, ImageOps
+
+DERIVATIVE_DIR = 'derivatives'
+FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpg': ('JPEG', 'image/jpeg')}
+SOURCE_CACHE_PREFIX = 'image-source'
+
+
+def widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', [96, 192, 320, 480, 768]))
+
+
+def formats():
+    return list(getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', ['webp', 'jpg']))
+
+
+def derivative_dir(digest):
+    return f'{DERIVATIVE_DIR}/{digest[:2]}/{digest}'
+
+
+def derivative_name(digest, width, fmt):
+    return f'{derivative_dir(digest)}/{width}.{fmt}'
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _source(name):
+    """
+    ``(sha256, width)`` of the stored file ``name``, remembered in the cache
+    (uploads get unique names, so a name's content never changes). The
+    width is as displayed, after EXIF rotation, and ``None`` if Pillow can't
+    read the file. ``None`` if the file is gone.
+    """
+    key = f'{SOURCE_CACHE_PREFIX}:{name}'
+    source = cache.get(key)
+    if source is None:
+        path = default_storage.path(name)
+        try:
+            source = (file_digest(path), _display_width(path))
+        except FileNotFoundError:
+            return None
+        cache.set(key, source, timeout=None)
+    # The cache can outlive MEDIA_ROOT (a restored backup, another host), and
+    # image_derivative can't serve a digest without its marker
+    _record_source(source[0], name)
+    return source
+
+
+def _display_width(path):
+    try:
+        with Image.open(path) as image:
+            # Orientations 5-8 are rotated a quarter turn
+            if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+                return image.height
+            return image.width
+    except FileNotFoundError:
+        raise
+    except OSError:
+        return None
+
+
+def source_digest(name):
+    """SHA-256 of the stored file ``name``, or ``None`` if the file is gone."""
+    source = _source(name)
+    return source and source[0]
+
+
+def _record_source(digest, name):
+    path = default_storage.path(f'{derivative_dir(digest)}/source')
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(name)
+
+
+def render(source_path, dest_dir, sizes, image_formats, quality=80):
+    """
+    Write ``<width>.<fmt>`` into ``dest_dir`` for every missing combination.
+    Widths beyond the source are capped at its own width rather than
+    upscaled. Plain paths in and out, so it can run in a process pool.
+    Returns the number of files written.
+    """
+    wanted = [(width, fmt) for width in sizes for fmt in image_formats
+              if not os.path.exists(os.path.join(dest_dir, f'{width}.{fmt}'))]
+    if not wanted:
+        return 0
+    os.makedirs(dest_dir, exist_ok=True)
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        resized = {}
+        for width, fmt in wanted:
+            if width not in resized:
+                target = min(width, image.width)
+                height = max(1, round(image.height * target / image.width))
+                resized[width] = image if target == image.width else image.resize((target, height), Image.LANCZOS)
+            path = os.path.join(dest_dir, f'{width}.{fmt}')
+            # Write then rename, so a concurrent request never serves half a
+            # file; the temporary name is unique to this call, not just the
+            # process, as threaded workers render the same file at once
+            fd, partial = tempfile.mkstemp(dir=dest_dir, prefix=f'{width}.{fmt}.', suffix='.tmp')
+            options = {'quality': quality, 'method': 4} if fmt == 'webp' else {
+                'quality': quality, 'optimize': True, 'progressive': True}
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    resized[width].save(fh, FORMATS[fmt][0], **options)
+                os.replace(partial, path)
+            except BaseException:
+                os.unlink(partial)
+                raise
+    return len(wanted)
+
+
+def render_args(name, sizes=None, image_formats=None):
+    """
+    The arguments ``render`` needs for stored image ``name``, or ``None``
+    when the file is gone.
+    """
+    digest = source_digest(name)
+    if digest is None:
+        return None
+    return (
+        default_storage.path(name),
+        default_storage.path(derivative_dir(digest)),
+        sizes or widths(),
+        image_formats or formats(),
+        getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80),
+    )
+
+
+def generate(name, sizes=None, image_formats=None):
+    """Make the missing renditions of stored image ``name``; returns files written."""
+    args = render_args(name, sizes, image_formats)
+    return render(*args) if args else 0
+
+
+def srcsets(image):
+    """
+    ``{fmt: [(url, width), ...]}`` for an ``ImageField`` value, or ``None``
+    when the source file is missing. Only widths up to the source's own are
+    offered: the first rendition at or beyond it is the source at full size,
+    described by its real width, and larger ones would be the same file.
+    """
+    if not image:
+        return None
+    source = _source(image.name)
+    if source is None:
+        return None
+    digest, source_width = source
+    offered = []
+    for width in widths():
+        if source_width is not None and width >= source_width:
+            offered.append((width, source_width))
+            break
+        offered.append((width, width))
+    return {
+        fmt: [(default_storage.url(derivative_name(digest, width, fmt)), shown) for width, shown in offered]
+        for fmt in formats()
+    }
+
+
+def image_derivative(request, prefix, digest, width, fmt):
+    """Serve a rendition, generating it first if it doesn't exist yet."""
+    width = int(width)
+    if fmt not in FORMATS or width not in widths() or prefix != digest[:2] or len(digest) != 64:
+        raise Http404
+    try:
+        with open(default_storage.path(f'{derivative_dir(digest)}/source')) as fh:
+            name = fh.read().strip()
+    except FileNotFoundError:
+        raise Http404
+    path = default_storage.path(derivative_name(digest, width, fmt))
+    if not os.path.exists(path):
+        try:
+            render(default_storage.path(name), os.path.dirname(path), [width], [fmt],
+                   getattr(settings, 'IMAGE_DERIVATIVE_QUALITY', 80))
+        except OSError:  # source deleted, or not an image Pillow can read
+            raise Http404
+    response = FileResponse(open(path, 'rb'), content_type=FORMATS[fmt][1])
+    # Content-addressed, so the bytes behind this URL never change
+    max_age = getattr(settings, 'IMAGE_DERIVATIVE_MAX_AGE', 365 * 24 * 3600)
+    response['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    response['Last-Modified'] = http_date(os.path.getmtime(path))
+    return response
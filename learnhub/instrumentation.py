@@ -0,0 +1,203 @@
+### learnhub/instrumentation.py
+
+"""
+Per-request SQL instrumentation and N+1 detection.
+
+``QueryInstrumentationMiddleware`` records every query a request runs (via
+``connection.execute_wrapper``, so it works with DEBUG off), groups them by
+fingerprint (the SQL with literals stripped) and flags any fingerprint
+repeated ``QUERY_N_PLUS_ONE_THRESHOLD`` times as a likely N+1, noting the
+template line or view code that triggered it. In DEBUG the summary is
+returned as ``X-DB-*`` response headers; otherwise it is logged as structured
+data on the ``learnhub.queries`` logger.
+
+``query_budget()`` / ``QueryBudgetMixin`` let tests assert a per-view budget.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('learnhub.queries')
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+LIBRARY_MARKERS = (os.sep + 'site-packages' + os.sep, os.sep + 'dist-packages' + os.sep)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def fingerprint(sql):
+    """Normalise SQL so queries differing only in parameters compare equal."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def _call_site():
+    """
+    Where the current query came from: the innermost template node being
+    rendered, else the innermost frame in project code.
+    """
+    frame = sys._getframe(2)
+    code_site = None
+    while frame is not None:
+        node = frame.f_locals.get('self') if frame.f_code.co_name == 'render_annotated' else None
+        origin = getattr(node, 'origin', None)
+        token = getattr(node, 'token', None)
+        if origin is not None and token is not None:
+            return f'{origin.template_name or origin.name}:{token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code_site is None and filename.startswith(PROJECT_ROOT)
+                and not any(marker in filename for marker in LIBRARY_MARKERS)
+                and not filename.endswith('instrumentation.py')):
+            code_site = f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_site or 'unknown'
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that collects counts, timings and N+1 call sites."""
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or getattr(settings, 'QUERY_N_PLUS_ONE_THRESHOLD', 5)
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+        self.sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - started
+            self.count += 1
+            key = fingerprint(sql)
+            self.fingerprints[key] += 1
+            # Walking the stack is only worth it once a query starts repeating
+            if self.fingerprints[key] == self.threshold:
+                self.sites[key] = _call_site()
+
+    @property
+    def duplicates(self):
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+    @property
+    def n_plus_one(self):
+        return [
+            {'sql': sql, 'count': n, 'site': self.sites.get(sql, 'unknown')}
+            for sql, n in self.fingerprints.most_common()
+            if n >= self.threshold
+        ]
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'db_time_ms': round(self.total_time * 1000, 2),
+            'duplicate_queries': sum(n - 1 for n in self.duplicates.values()),
+            'n_plus_one': self.n_plus_one,
+        }
+
+
+@contextmanager
+def record_queries(threshold=None, using=None):
+    """Record the queries run on ``using`` (default: all connections)."""
+    recorder = QueryRecorder(threshold)
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+class QueryInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            # Queries made while a streaming response is consumed are not counted
+            response = self.get_response(request)
+        return self.report(request, response, recorder.summary())
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return await self.get_response(request)
+
+        # Connections are per thread: install the wrappers on the thread the
+        # request's sync_to_async ORM calls run in, not on the event loop's
+        stack = ExitStack()
+        recorder = await sync_to_async(stack.enter_context)(record_queries())
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder.summary())
+
+    def report(self, request, response, summary):
+        if settings.DEBUG:
+            response['X-DB-Query-Count'] = str(summary['queries'])
+            response['X-DB-Query-Time-Ms'] = str(summary['db_time_ms'])
+            response['X-DB-Duplicate-Queries'] = str(summary['duplicate_queries'])
+            if summary['n_plus_one']:
+                response['X-DB-N-Plus-One'] = '; '.join(
+                    f"{item['count']}x at {item['site']}" for item in summary['n_plus_one']
+                )
+
+        budget = getattr(settings, 'QUERY_WARNING_BUDGET', 50)
+        level = logging.WARNING if summary['n_plus_one'] or summary['queries'] > budget else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                **summary,
+            }))
+        return response
+
+
+@contextmanager
+def query_budget(max_queries, allow_n_plus_one=False, using=None):
+    """
+    Fail if the block runs more than ``max_queries`` queries, or (unless
+    ``allow_n_plus_one``) repeats any query often enough to be an N+1.
+    """
+    with record_queries(using=using) as recorder:
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(f'{recorder.count} queries run, budget is {max_queries}')
+    if not allow_n_plus_one:
+        for item in recorder.n_plus_one:
+            problems.append(f"N+1: {item['count']}x at {item['site']}: {item['sql'][:200]}")
+    if problems:
+        raise AssertionError('\n'.join(problems))
+
+
+class QueryBudgetMixin:
+    """TestCase mixin: ``with self.assertQueryBudget(5): self.client.get(url)``."""
+
+    def assertQueryBudget(self, max_queries, allow_n_plus_one=False, using=None):
+        return query_budget(max_queries, allow_n_plus_one=allow_n_plus_one, using=using)
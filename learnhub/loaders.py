@@ -0,0 +1,113 @@
+### learnhub/loaders.py
+
+"""
+Request-scoped batch loading of the current user's per-object state:
+bookmarks and ``VideoProgress`` by video, ``CourseRating`` by course.
+
+Views ``prime()`` the loader with everything a page will show, and the
+first lookup of a kind then resolves every pending id of that kind with one
+query; later lookups are served from memory. Ids that are looked up without
+being primed are queued as well, so a lookup never costs more than one query
+per kind for whatever has been asked for so far. Anonymous users get empty
+state without touching the database.
+
+In templates, the filters in courses/templatetags/user_state.py take the
+request (from the ``request`` context processor)::
+
+    {% if video|bookmarked:request %}...{% endif %}
+    {% with progress=video|progress_for:request %}...{% endwith %}
+"""
+
+from django.apps import apps
+
+REQUEST_ATTR = '_user_state_loader'
+
+
+def _ids(objects):
+    return {getattr(obj, 'pk', obj) for obj in objects}
+
+
+class UserStateLoader:
+
+    def __init__(self, user):
+        self.user = user
+        self.active = user is not None and user.is_authenticated
+        # kind -> {id: row or None}, and ids asked for but not fetched yet
+        self._loaded = {'bookmark': {}, 'progress': {}, 'rating': {}}
+        self._pending = {'bookmark': set(), 'progress': set(), 'rating': set()}
+
+    def prime(self, videos=(), courses=()):
+        """Queue videos and courses (objects or ids) for the next load."""
+        if not self.active:
+            return self
+        video_ids, course_ids = _ids(videos), _ids(courses)
+        for kind in ('bookmark', 'progress'):
+            self._pending[kind] |= video_ids - self._loaded[kind].keys()
+        self._pending['rating'] |= course_ids - self._loaded['rating'].keys()
+        return self
+
+    def bookmark(self, video):
+        return self._get('bookmark', getattr(video, 'pk', video))
+
+    def bookmarked(self, video):
+        return self.bookmark(video) is not None
+
+    def progress(self, video):
+        """The user's ``VideoProgress`` for ``video``, or ``None``."""
+        return self._get('progress', getattr(video, 'pk', video))
+
+    def rating(self, course):
+        """The user's ``CourseRating`` for ``course``, or ``None``."""
+        return self._get('rating', getattr(course, 'pk', course))
+
+    def video_state(self, videos):
+        """``{video_id: {...}}`` for serializing to the page (see course_detail)."""
+        self.prime(videos=videos)
+        state = {}
+        for video_id in sorted(_ids(videos)):
+            progress = self.progress(video_id)
+            state[video_id] = {
+                'bookmarked': self.bookmarked(video_id),
+                'progress': progress.progress_percentage if progress else 0,
+                'completed': bool(progress and progress.completed),
+            }
+        return state
+
+    def _get(self, kind, key):
+        if not self.active or key is None:
+            return None
+        loaded = self._loaded[kind]
+        if key not in loaded:
+            self._pending[kind].add(key)
+            self._load(kind)
+        return loaded.get(key)
+
+    def _load(self, kind):
+        keys, self._pending[kind] = self._pending[kind], set()
+        rows = dict.fromkeys(keys)
+        if kind == 'bookmark':
+            Bookmark = apps.get_model('videos', 'Bookmark')
+            rows.update((row.video_id, row) for row in Bookmark.objects.filter(user=self.user, video_id__in=keys))
+        elif kind == 'progress':
+            VideoProgress = apps.get_model('videos', 'VideoProgress')
+            # The duration comes along for progress_percentage
+            rows.update((row.video_id, row) for row in (
+                VideoProgress.objects.filter(user=self.user, video_id__in=keys)
+                .select_related('video').only('user_id', 'video_id', 'watched_seconds', 'completed',
+                                              'last_watched', 'video__duration')))
+        else:
+            CourseRating = apps.get_model('ratings', 'CourseRating')
+            rows.update((row.course_id, row) for row in CourseRating.objects.filter(user=self.user, course_id__in=keys))
+        self._loaded[kind].update(rows)
+
+
+def user_state(request, user=None):
+    """
+    The request's ``UserStateLoader``, created on first use. Async views
+    pass the user from ``request.auser()``.
+    """
+    loader = getattr(request, REQUEST_ATTR, None)
+    if loader is None:
+        loader = UserStateLoader(user if user is not None else getattr(request, 'user', None))
+        setattr(request, REQUEST_ATTR, loader)
+    return loader
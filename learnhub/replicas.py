@@ -0,0 +1,151 @@
+### learnhub/replicas.py
+
+"""
+Read-replica routing.
+
+Writes always go to ``default`` (the primary). Reads go to one of the
+aliases in ``DATABASE_REPLICAS`` only while ``ReplicaRoutingMiddleware`` is
+handling a safe (GET/HEAD/OPTIONS) request, and only when none of these
+apply, since a lagging replica could then serve stale data:
+
+* the client sent a POST (or other unsafe request) in the last
+  ``REPLICA_STICKY_SECONDS`` (read-your-own-writes, tracked with a
+  short-lived cookie);
+* the request has already written (later reads must see that write);
+* a transaction is open on the primary;
+* the view is wrapped in ``pin_to_primary`` or code runs inside
+  ``use_primary()``.
+
+Everything outside a request (management commands, workers) reads from the
+primary. With no replicas configured the router changes nothing.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'primary_reads'
+
+
+class RoutingState:
+    """Per-request routing flags, shared by every context the request touches."""
+
+    def __init__(self, replica_reads=False):
+        self.replica_reads = replica_reads
+        self.pinned = 0
+        self.wrote = False
+
+
+_state = ContextVar('replica_routing_state', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary."""
+    state = _state.get()
+    if state is None:
+        # Outside a request reads already go to the primary
+        yield
+        return
+    state.pinned += 1
+    try:
+        yield
+    finally:
+        state.pinned -= 1
+
+
+def pin_to_primary(view):
+    """View decorator: never read from a replica in this view."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            with use_primary():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with use_primary():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        aliases = replicas()
+        if (not aliases or state is None or not state.replica_reads or state.pinned or state.wrote
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive schema changes through replication
+        return db not in replicas()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM calls made from worker
+        # threads share this request's state object
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(request, response)
+
+    def _start(self, request):
+        sticky = STICKY_COOKIE in request.COOKIES
+        state = RoutingState(replica_reads=request.method in SAFE_METHODS and not sticky)
+        return state, _state.set(state)
+
+    def _finish(self, request, response):
+        if replicas() and request.method not in SAFE_METHODS:
+            # Read from the primary until the replicas have caught up. Writes
+            # made during GETs (buffered counter flushes) aren't the user's own.
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 5),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -1,6 +1,7 @@
 # learnhub/settings.py
 
 import os
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -18,13 +19,20 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_tailwind',
+    'rest_framework',
     'accounts',
     'courses',
     'videos',
+    'ratings',
+    'analytics',
+    'api',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'learnhub.instrumentation.QueryInstrumentationMiddleware',
+    'learnhub.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,21 +67,203 @@ DATABASES = {
     }
 }
 
+# Read replicas (see learnhub/replicas.py). Locally, point
+# LEARNHUB_SQLITE_REPLICA at a second SQLite file and refresh it from the
+# primary with `manage.py sync_replica`.
+DATABASE_ROUTERS = ['learnhub.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 5  # primary reads after a POST, to cover replica lag
+
+if os.environ.get('LEARNHUB_SQLITE_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['LEARNHUB_SQLITE_REPLICA'],
+        'OPTIONS': {'init_command': 'PRAGMA query_only = 1'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+elif sys.argv[1:2] == ['test']:
+    # Routing tests turn this mirror of the test database on with DATABASE_REPLICAS
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+# Cache. Sessions, request users, buffered counters and fragment versions
+# all live here and must be shared by every worker, so production sets
+# REDIS_URL. Without it each process gets a private LocMemCache, which is
+# only right for a single-process runserver and the test suite: a logout
+# or password change in one worker would go unseen by the others. Startup
+# fails (see learnhub/authcache.py) when WEB_CONCURRENCY, the worker count
+# gunicorn and uvicorn read, is above 1 with sessions or users in LocMem.
+REDIS_URL = os.environ.get('REDIS_URL')
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'learnhub',
+        },
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+COURSE_VERSION_TIMEOUT = 7 * 24 * 3600  # longer than any fragment keyed on it (see courses/fragments.py)
+
 # Static files
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Build pipeline: `npm run build:css` writes the purged, minified Tailwind
+# bundle to static/css/app.css, then `manage.py collectstatic` stores every
+# asset under a content-hashed name with .gz and .br siblings. WhiteNoise
+# serves the hashed files with a one-year immutable Cache-Control and picks
+# the compressed variant from Accept-Encoding.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+if sys.argv[1:2] == ['test']:
+    # Tests render pages without running collectstatic first
+    STORAGES['staticfiles'] = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+# Whether pages may use the in-browser Tailwind CDN compiler while the bundle
+# isn't built. Anywhere else a missing bundle is an error: pages raise, and
+# `manage.py check --deploy` reports it (see courses/templatetags/assets.py).
+STYLESHEET_CDN_FALLBACK = DEBUG or sys.argv[1:2] == ['test']
+WHITENOISE_MAX_AGE = 60 if DEBUG else 3600  # unhashed names only; hashed ones are immutable
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Responsive image renditions (see learnhub/images.py); backfill existing
+# uploads with build_image_derivatives
+IMAGE_DERIVATIVE_WIDTHS = [96, 192, 320, 480, 768]
+IMAGE_DERIVATIVE_FORMATS = ['webp', 'jpg']
+IMAGE_DERIVATIVE_QUALITY = 80
+IMAGE_DERIVATIVE_MAX_AGE = 365 * 24 * 3600  # URLs are content-addressed
+
 # Auth
 AUTH_USER_MODEL = 'accounts.CustomUser'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
+# Cached sessions and request users (see learnhub/authcache.py). ModelBackend
+# stays listed so sessions started before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    'learnhub.authcache.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+SESSION_ENGINE = 'learnhub.authcache'
+SESSION_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE = 'default'
+# Saves and deletes refresh or drop the cached copy, but QuerySet.update()
+# sends no signal: after a bulk change such as update(is_active=False) the
+# users keep their cached rows until this expires. Save each user instead
+# when the change must apply at once, or lower this.
+AUTH_USER_CACHE_TIMEOUT = 3600
+AUTH_USER_LOCAL_TIMEOUT = 5  # seconds a worker reuses its own copy; 0 disables
+AUTH_USER_LOCAL_MAX_ENTRIES = 10_000
+AUTH_CACHE_METRICS_INTERVAL = 30  # seconds between adding worker counts to the totals
+
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
 CRISPY_TEMPLATE_PACK = "tailwind"
+
+# Buffered view counters (see courses/counters.py)
+VIEW_COUNTER_CACHE = 'default'
+VIEW_COUNTER_FLUSH_INTERVAL = 30  # seconds
+VIEW_COUNTER_FLUSH_THRESHOLD = 100  # buffered views per worker
+
+# Course search backend (see courses/search/). Use
+# 'courses.search.database.DatabaseBackend' on databases without FTS5.
+COURSE_SEARCH_BACKEND = 'courses.search.sqlite.SQLiteFTSBackend'
+COURSE_SEARCH_RESULT_LIMIT = 200
+COURSE_REINDEX_BATCH_SIZE = 500  # courses reindexed per batch after a topic or teacher rename
+
+# Keyset pagination page size for course listings (see courses/pagination.py)
+COURSES_PER_PAGE = 24
+
+# Video streaming (see videos/streaming.py). Set VIDEO_STREAM_OFFLOAD to
+# 'x-accel-redirect' (nginx, with an internal location at
+# VIDEO_STREAM_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' to let the
+# web server send the bytes after Django has checked access.
+VIDEO_STREAM_OFFLOAD = None
+VIDEO_STREAM_ACCEL_PREFIX = '/protected-media/'
+VIDEO_STREAM_CHUNK_SIZE = 512 * 1024
+VIDEO_STREAM_MAX_AGE = 3600
+
+# Resumable uploads (see videos/uploads.py)
+VIDEO_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+VIDEO_UPLOAD_MAX_SIZE = 10 * 1024 ** 3
+
+# Media post-processing worker (see videos/processing.py)
+VIDEO_THUMBNAIL_MAX_WIDTH = 640
+MEDIA_JOB_MAX_ATTEMPTS = 3
+MEDIA_JOB_TIMEOUT = 1800  # seconds before a running job is abandoned; counts as an attempt
+
+# Watch-progress heartbeats (see videos/progress.py)
+PROGRESS_FLUSH_INTERVAL = 10  # seconds
+PROGRESS_FLUSH_THRESHOLD = 500  # buffered (user, video) pairs per worker
+PROGRESS_COMPLETION_THRESHOLD = 0.9  # fraction of the duration
+PROGRESS_MAX_EVENTS = 100  # per heartbeat request
+
+# Per-request SQL instrumentation (see learnhub/instrumentation.py)
+QUERY_INSTRUMENTATION = True
+QUERY_N_PLUS_ONE_THRESHOLD = 5  # repeats of one query shape flagged as N+1
+QUERY_WARNING_BUDGET = 50  # queries per request before a warning is logged
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'learnhub.queries': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+# View-event log and rollups (see analytics/events.py, analytics/rollups.py).
+# Run compact_view_events periodically (e.g. every 5 minutes from cron).
+VIEW_EVENT_FLUSH_INTERVAL = 10  # seconds
+VIEW_EVENT_FLUSH_THRESHOLD = 500  # buffered events per worker
+VIEW_EVENT_RETENTION_DAYS = 7  # raw events kept after compaction
+VIEW_EVENT_COMPACTION_LAG = 300  # seconds; must exceed the longest transaction inserting events
+VIEW_ROLLUP_HOURLY_RETENTION_DAYS = 90  # daily rollups are kept forever
+
+# Trending/popular leaderboards (see analytics/trending.py). Run
+# compute_trending periodically (e.g. every 15 minutes from cron).
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_WINDOW_DAYS = 14
+TRENDING_TOP_N = 20  # courses kept per board
+TRENDING_WEIGHTS = {'view': 1, 'bookmark': 5, 'rating': 3, 'completion': 8}
+TRENDING_CACHE_TIMEOUT = 3600
+
+# Item-to-item recommendations (see analytics/recommendations.py). Run
+# build_recommendations nightly.
+RECOMMENDATIONS_TOP_K = 10  # neighbours stored per course
+RECOMMENDATIONS_BLOCK_MEMORY_MB = 64  # per block: dense scores plus the expanded triples
+RECOMMENDATIONS_WEIGHTS = {'progress': 1.0, 'completion': 1.0, 'bookmark': 1.0, 'rating': 1.0}
+
+# Read-only JSON API (see api/views.py), versioned in the path: /api/v1/
+REST_FRAMEWORK = {
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'DEFAULT_VERSION': 'v1',
+    'ALLOWED_VERSIONS': ['v1'],
+    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework.authentication.SessionAuthentication'],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.ApiCursorPagination',
+    'PAGE_SIZE': 20,
+}
+
+# Comment feed and live stream (see videos/comments.py, videos/pubsub/).
+# The stream needs ASGI (e.g. ``uvicorn learnhub.asgi:application``; see the
+# README); pages served over WSGI don't open it. With several ASGI workers
+# use the Redis broker.
+COMMENTS_PER_PAGE = 20
+COMMENT_STREAM_BROKER = 'videos.pubsub.memory.InProcessBroker'  # or 'videos.pubsub.redis.RedisBroker'
+COMMENT_STREAM_REDIS_URL = REDIS_URL or 'redis://localhost:6379/0'
+COMMENT_STREAM_HEARTBEAT = 15  # seconds between keep-alives; also the client retry delay
+COMMENT_STREAM_MAX_SECONDS = 300  # streams are closed and reopened after this
+COMMENT_STREAM_QUEUE_SIZE = 100  # messages buffered per slow client
@@ -0,0 +1,81 @@
+from django.db import connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses.models import Topic
+from .replicas import STICKY_COOKIE, ReplicaRoutingMiddleware, pin_to_primary, use_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    # 'replica' mirrors the test database, so both aliases see the same rows
+    databases = {'default', 'replica'}
+
+    def route(self, view, method='GET', cookies=None):
+        """Run ``view`` through the middleware; returns the alias of each read it made."""
+        reads = []
+
+        def get_response(request):
+            reads.extend(view() or [])
+            return HttpResponse()
+
+        request = RequestFactory().generic(method, '/')
+        request.COOKIES.update(cookies or {})
+        self.response = ReplicaRoutingMiddleware(get_response)(request)
+        return reads
+
+    @staticmethod
+    def read():
+        return router.db_for_read(Topic)
+
+    def test_safe_requests_read_from_the_replica(self):
+        Topic.objects.create(name='Python')
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            self.assertContains(self.client.get(reverse('topic_list')), 'Python')
+        self.assertTrue(any('courses_topic' in query['sql'] for query in replica))
+        self.assertFalse(any('courses_topic' in query['sql'] for query in primary))
+        self.assertNotIn(STICKY_COOKIE, self.client.cookies)
+
+    def test_unsafe_requests_never_read_from_the_replica(self):
+        for method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            self.assertEqual(self.route(lambda: [self.read()], method=method), ['default'])
+            self.assertEqual(self.response.cookies[STICKY_COOKIE]['max-age'], 5)
+
+    def test_sticky_cookie_sends_reads_to_the_primary(self):
+        self.assertEqual(self.route(lambda: [self.read()]), ['replica'])
+        self.assertEqual(self.route(lambda: [self.read()], cookies={STICKY_COOKIE: '1'}), ['default'])
+        # GETs don't extend the stickiness
+        self.assertNotIn(STICKY_COOKIE, self.response.cookies)
+
+    def test_pinned_views_and_blocks_read_from_the_primary(self):
+        def view():
+            with use_primary():
+                inside = self.read()
+            return [inside, self.read()]
+
+        self.assertEqual(self.route(view), ['default', 'replica'])
+        self.assertEqual(self.route(pin_to_primary(lambda: [self.read()])), ['default'])
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        def view():
+            before = self.read()
+            Topic.objects.create(name='Python')
+            return [before, self.read()]
+
+        self.assertEqual(self.route(view), ['replica', 'default'])
+
+    def test_reads_inside_a_transaction_go_to_the_primary(self):
+        def view():
+            with transaction.atomic():
+                inside = self.read()
+            return [inside, self.read()]
+
+        self.assertEqual(self.route(view), ['default', 'replica'])
+
+    def test_outside_a_request_reads_use_the_primary(self):
+        self.assertEqual(self.read(), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.route(lambda: [self.read()]), ['default'])
@@ -1,17 +1,26 @@
 ### learnhub/urls.py
 
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.generic import TemplateView
+from courses.views import home
+from learnhub.images import image_derivative
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('', home, name='home'),
     path('accounts/', include('accounts.urls')),
     path('courses/', include('courses.urls')),
     path('videos/', include('videos.urls')),
+    re_path(r'^api/(?P<version>v1)/', include('api.urls')),
+    # Renditions not made yet; existing ones are served straight from MEDIA_ROOT
+    re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}derivatives/(?P<prefix>[0-9a-f]{{2}})/(?P<digest>[0-9a-f]{{64}})/'
+        r'(?P<width>\d+)\.(?P<fmt>webp|jpg)$',
+        image_derivative,
+        name='image_derivative',
+    ),
 ]
 
 if settings.DEBUG:
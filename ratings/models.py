@@ -14,7 +14,7 @@ class CourseRating(models.Model):
     ]
     
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='ratings')
     rating = models.PositiveSmallIntegerField(choices=RATING_CHOICES)
     review = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,20 @@
+/** Tailwind build for templates/**; only classes found in `content` end up in static/css/app.css. */
+module.exports = {
+  content: [
+    './templates/**/*.html',
+    './*/templates/**/*.html',
+    // Classes set on widgets and in template tags
+    './*/forms.py',
+    './*/templatetags/*.py',
+  ],
+  darkMode: 'class',
+  theme: {
+    extend: {
+      colors: {
+        primary: '#3B82F6',
+        secondary: '#1E40AF',
+      },
+    },
+  },
+  plugins: [],
+};
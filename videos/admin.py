@@ -1,7 +1,7 @@
 ### videos/admin.py
 from django.contrib import admin
 from .models import Video, Bookmark, Comment
-from .models import VideoProgress
+from .models import CourseProgress, VideoProgress, UploadSession, MediaJob
 
 admin.site.register(VideoProgress)
 
@@ -23,4 +23,22 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('user', 'video', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('user__username', 'video__title', 'content')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'user', 'course', 'received', 'total_size', 'status', 'updated_at')
+    list_filter = ('status', 'created_at')
+    raw_id_fields = ('user', 'course', 'video')
+
+@admin.register(MediaJob)
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'kind', 'status', 'attempts', 'queued_at', 'started_at', 'finished_at', 'run_time')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('queued_at', 'started_at', 'finished_at', 'error')
+    raw_id_fields = ('video', 'upload')
+
+@admin.register(CourseProgress)
+class CourseProgressAdmin(admin.ModelAdmin):
+    list_display = ('user', 'course', 'videos_started', 'videos_completed', 'last_watched')
+    readonly_fields = ('videos_started', 'videos_completed', 'watched_seconds', 'last_video', 'last_watched', 'updated_at')
+    raw_id_fields = ('user', 'course')
@@ -0,0 +1,64 @@
+### videos/comments.py
+
+"""
+Comment feed and live updates.
+
+Video pages render only the newest ``COMMENTS_PER_PAGE`` comments; older
+ones come from ``comment_feed`` a page at a time (keyset cursors from
+courses/pagination.py), and new ones are pushed to open pages over the
+``comment_stream`` Server-Sent Events endpoint. Each comment is rendered to
+HTML once, when it is published, not once per viewer.
+"""
+
+import logging
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from courses.pagination import paginate
+from .models import Comment
+from .pubsub import get_broker, video_channel
+
+logger = logging.getLogger('learnhub.comments')
+
+
+def per_page():
+    return getattr(settings, 'COMMENTS_PER_PAGE', 20)
+
+
+def render_comment(comment):
+    return render_to_string('video/_comment.html', {'comment': comment})
+
+
+def comment_payload(comment):
+    return {'id': comment.pk, 'html': render_comment(comment)}
+
+
+def comment_page(video_id, cursor=None):
+    """The ``KeysetPage`` of comments after ``cursor``, newest first."""
+    comments = Comment.objects.filter(video_id=video_id).select_related('user')
+    return paginate(comments, cursor, per_page())
+
+
+def comments_after(video_id, last_id, limit=100):
+    """Comments newer than ``last_id``, oldest first (for reconnecting streams)."""
+    return list(Comment.objects.filter(video_id=video_id, pk__gt=last_id)
+                .select_related('user').order_by('pk')[:limit])
+
+
+def _publish(video_id, message):
+    # Runs after the comment has committed: an unreachable broker costs open
+    # pages a live update (reconnecting streams catch up on new comments),
+    # not the poster a 500 for a comment that was saved
+    try:
+        get_broker().publish(video_channel(video_id), message)
+    except Exception:
+        logger.exception('Could not publish %s event for video %s', message['event'], video_id)
+
+
+def publish_comment(comment):
+    _publish(comment.video_id, {'event': 'comment', **comment_payload(comment)})
+
+
+def publish_deletion(video_id, comment_id):
+    _publish(video_id, {'event': 'delete', 'id': comment_id})
@@ -0,0 +1,127 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from videos.models import Bookmark, Comment, Video
+
+BENCHMARK_COMMENT = '[benchmark_asgi]'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI (thread pool) and ASGI (event loop) throughput for '
+        'video_detail, toggle_bookmark and add_comment, in process. Run '
+        'seed_data first; bookmarks and comments made here are undone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests per endpoint and handler')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Threads for WSGI, in-flight requests for ASGI')
+        parser.add_argument('--only', nargs='*', help='Only run these endpoints')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        user = get_user_model().objects.filter(user_type='student').order_by('pk').first()
+        video_ids = list(Video.objects.order_by('?').values_list('pk', flat=True)[:100])
+        if user is None or not video_ids:
+            raise CommandError('Need a student and some videos; run seed_data first')
+        bookmarked = set(Bookmark.objects.filter(user=user, video_id__in=video_ids).values_list('video_id', flat=True))
+
+        endpoints = [
+            ('video_detail', 'get', 'video_detail', {}),
+            ('toggle_bookmark', 'post', 'toggle_bookmark', {}),
+            ('add_comment', 'post', 'add_comment', {'content': BENCHMARK_COMMENT}),
+        ]
+        if options['only']:
+            endpoints = [e for e in endpoints if e[0] in options['only']]
+
+        try:
+            for name, method, url_name, data in endpoints:
+                calls = [(method, reverse(url_name, args=[rng.choice(video_ids)]), data)
+                         for _ in range(options['requests'])]
+                wsgi = self.run_wsgi(user, calls, options['concurrency'])
+                asgi = self.run_asgi(user, calls, options['concurrency'])
+                self.report(name, 'wsgi', wsgi)
+                self.report(name, 'asgi', asgi)
+                change = (asgi['rps'] - wsgi['rps']) / wsgi['rps'] * 100 if wsgi['rps'] else 0
+                style = self.style.SUCCESS if change >= 0 else self.style.WARNING
+                self.stdout.write(style(f'{name:16} asgi vs wsgi throughput {change:+.1f}%'))
+        finally:
+            # Put the student's bookmarks back and drop benchmark comments
+            Bookmark.objects.filter(user=user, video_id__in=video_ids).exclude(video_id__in=bookmarked).delete()
+            missing = bookmarked - set(
+                Bookmark.objects.filter(user=user, video_id__in=bookmarked).values_list('video_id', flat=True))
+            Bookmark.objects.bulk_create([Bookmark(user=user, video_id=pk) for pk in missing])
+            Comment.objects.filter(user=user, content=BENCHMARK_COMMENT).delete()
+
+    def check(self, response, url):
+        if response.status_code not in (200, 302):
+            raise CommandError(f'{url} returned {response.status_code}')
+
+    def run_wsgi(self, user, calls, concurrency):
+        def worker(chunk):
+            # Clients aren't thread-safe: one per thread, like one per worker
+            client = Client(SERVER_NAME='localhost')
+            client.force_login(user)
+            latencies = []
+            for method, url, data in chunk:
+                started = time.perf_counter()
+                self.check(getattr(client, method)(url, data), url)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        chunks = [calls[i::concurrency] for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = [t for result in pool.map(worker, chunks) for t in result]
+        return self.summarize(latencies, time.perf_counter() - started)
+
+    def run_asgi(self, user, calls, concurrency):
+        client = AsyncClient(SERVER_NAME='localhost')
+        client.force_login(user)
+        latencies = []
+
+        async def one(limit, method, url, data):
+            # ASGIHandler gives every request its own thread for sync code;
+            # the test client doesn't, so do it here as a server would
+            async with limit, ThreadSensitiveContext():
+                started = time.perf_counter()
+                self.check(await getattr(client, method)(url, data), url)
+                latencies.append(time.perf_counter() - started)
+
+        async def main():
+            limit = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(one(limit, *call) for call in calls))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return self.summarize(latencies, time.perf_counter() - started)
+
+    def summarize(self, latencies, elapsed):
+        return {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        }
+
+    def report(self, name, handler, result):
+        self.stdout.write(
+            f"{name:16} {handler}: {result['rps']:8.1f} req/s  "
+            f"p50={result['p50_ms']:8.2f}ms p95={result['p95_ms']:8.2f}ms"
+        )
@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from videos.processing import claim_jobs, complete_job, execute, fail_job, job_payload
+
+
+class Command(BaseCommand):
+    help = 'Run queued video post-processing jobs in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=8)
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                close_old_connections()
+                jobs = claim_jobs(options['batch_size'])
+                if not jobs:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                self.run_batch(pool, jobs)
+
+    def run_batch(self, pool, jobs):
+        futures = {}
+        for job in jobs:
+            try:
+                futures[pool.submit(execute, job.kind, job_payload(job))] = job
+            except Exception as exc:
+                fail_job(job, exc)
+                self.stderr.write(f'{job}: {exc}')
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                complete_job(job, future.result())
+            except Exception as exc:
+                fail_job(job, exc)
+                self.stderr.write(f'{job}: {exc}')
+                continue
+            self.stdout.write(f'{job} in {job.run_time.total_seconds():.2f}s')
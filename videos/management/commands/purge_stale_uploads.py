@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from videos.models import UploadSession
+from videos.uploads import discard
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished upload sessions and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Idle time before a session is stale')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.exclude(status__in=['complete', 'verifying']).filter(updated_at__lt=cutoff)
+        purged = 0
+        for session in stale.iterator():
+            discard(session)
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} stale upload sessions'))
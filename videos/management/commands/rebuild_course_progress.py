@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from videos.progress import rebuild_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-course CourseProgress rollup from VideoProgress to backfill or repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Only rebuild these users')
+        parser.add_argument('--batch-size', type=int, default=500, help='Users per refresh')
+
+    def handle(self, *args, **options):
+        written = rebuild_course_progress(options['user_ids'] or None, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} course progress rows'))
@@ -0,0 +1,92 @@
+### videos/media.py
+
+"""
+Media inspection helpers used by the ``process_media`` worker.
+
+Everything here works on plain file paths and returns plain values, so it can
+run in a process pool without touching the database.
+"""
+
+import hashlib
+import os
+import struct
+from datetime import timedelta
+
+from PIL import Image, ImageOps
+
+# Boxes that only contain other boxes on the way to moov/mvhd
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia'}
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """Hex sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_boxes(fh, start, end):
+    """Yield ``(type, payload_start, box_end)`` for ISO BMFF boxes in a range."""
+    offset = start
+    while offset + 8 <= end:
+        fh.seek(offset)
+        header = fh.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', fh.read(8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - offset
+        if size < header_size:
+            return
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def mp4_duration(path):
+    """
+    Duration of an MP4/MOV file from its ``moov/mvhd`` header, or ``None``
+    if the file is not an ISO BMFF container. Only headers are read, so this
+    is cheap even for multi-GB files.
+    """
+    with open(path, 'rb') as fh:
+        end = os.fstat(fh.fileno()).st_size
+        for box_type, payload, box_end in _iter_boxes(fh, 0, end):
+            if box_type != b'moov':
+                continue
+            for child, child_payload, _ in _iter_boxes(fh, payload, box_end):
+                if child != b'mvhd':
+                    continue
+                fh.seek(child_payload)
+                version = fh.read(4)[0]
+                if version == 1:
+                    _, _, timescale, duration = struct.unpack('>QQIQ', fh.read(28))
+                else:
+                    _, _, timescale, duration = struct.unpack('>IIII', fh.read(16))
+                if not timescale:
+                    return None
+                return timedelta(seconds=duration / timescale)
+    return None
+
+
+def resize_image(source_path, dest_path, max_width, quality=85):
+    """
+    Write a JPEG copy of ``source_path`` at most ``max_width`` pixels wide,
+    honouring EXIF orientation. Returns the output ``(width, height)``.
+    """
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        image.save(dest_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        return image.size
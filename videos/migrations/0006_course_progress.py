@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 02:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_course_keyset_indexes'),
+        ('videos', '0005_video_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('videos_started', models.PositiveIntegerField(default=0)),
+                ('videos_completed', models.PositiveIntegerField(default=0)),
+                ('watched_seconds', models.PositiveBigIntegerField(default=0)),
+                ('last_watched', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_progress', to='courses.course')),
+                ('last_video', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='videos.video')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Course progress',
+                'indexes': [models.Index(fields=['user', '-last_watched'], name='courseprogress_recent_idx')],
+                'unique_together': {('user', 'course')},
+            },
+        ),
+    ]
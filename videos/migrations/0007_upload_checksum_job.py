@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_course_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediajob',
+            name='upload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='videos.uploadsession'),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(choices=[('checksum', 'Verify upload'), ('probe', 'Read duration'), ('thumbnail', 'Resize thumbnail')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='video',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='videos.video'),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('verifying', 'Verifying'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
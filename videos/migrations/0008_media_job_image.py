@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_upload_checksum_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediajob',
+            name='image',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='mediajob',
+            name='kind',
+            field=models.CharField(choices=[('checksum', 'Verify upload'), ('probe', 'Read duration'), ('thumbnail', 'Resize thumbnail'), ('derivatives', 'Render image sizes')], max_length=20),
+        ),
+    ]
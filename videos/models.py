@@ -1,5 +1,7 @@
 ### videos/models.py
 
+import uuid
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from courses.models import Course
@@ -15,11 +17,18 @@ class Video(models.Model):
     duration = models.DurationField(null=True, blank=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     view_count = models.PositiveIntegerField(default=0)
     
     def increment_views(self):
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+        """Buffer a view; it is written back in a batched F() update"""
+        from courses.counters import record_view
+        record_view(self)
+
+    def get_view_count(self):
+        """View count including views that have not been flushed yet"""
+        from courses.counters import get_view_count
+        return get_view_count(self)
 
     class Meta:
         ordering = ['order', 'created_at']
@@ -64,5 +73,136 @@ class VideoProgress(models.Model):
     @property
     def progress_percentage(self):
         if self.video.duration:
-            return min(round((self.watched_seconds / self.video.duration.total_seconds()) * 100, 100))
-        return 0
\ No newline at end of file
+            return min(round(self.watched_seconds / self.video.duration.total_seconds() * 100), 100)
+        return 0
+
+class CourseProgress(models.Model):
+    """
+    A student's ``VideoProgress`` rolled up per course, kept in sync by
+    ``refresh_course_progress`` in videos/progress.py so the dashboard can
+    read it with one indexed query. Use ``rebuild_course_progress`` to
+    backfill or repair drift.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_progress')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='student_progress')
+    videos_started = models.PositiveIntegerField(default=0)
+    videos_completed = models.PositiveIntegerField(default=0)
+    watched_seconds = models.PositiveBigIntegerField(default=0)
+    last_video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_watched = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'course')
+        verbose_name_plural = 'Course progress'
+        indexes = [
+            # "Continue watching" on the student dashboard
+            models.Index(fields=['user', '-last_watched'], name='courseprogress_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.course.title}"
+
+    @property
+    def is_complete(self):
+        """Every video in the course completed; needs ``course__stats`` loaded."""
+        total = self.course.stats.video_count
+        return total > 0 and self.videos_completed >= total
+
+    @property
+    def progress_percentage(self):
+        """Share of the course's running time watched, or of its videos completed."""
+        stats = self.course.stats
+        if self.is_complete:
+            return 100
+        if stats.total_duration:
+            return min(round(self.watched_seconds / stats.total_duration.total_seconds() * 100), 99)
+        if stats.video_count:
+            return round(self.videos_completed / stats.video_count * 100)
+        return 0
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress. Chunks are appended straight to
+    ``file_name`` in media storage; the ``Video`` row is created on finalize,
+    or once the media worker has checked ``sha256`` if one was given.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('verifying', 'Verifying'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='upload_sessions')
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    order = models.PositiveIntegerField(default=0)
+    file_name = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    video = models.OneToOneField(Video, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.received}/{self.total_size})"
+
+class MediaJob(models.Model):
+    """
+    Post-processing work for an uploaded video, run by ``process_media``.
+    ``checksum`` jobs verify a finished upload before its video exists, so
+    they point at the ``upload`` instead; ``derivatives`` jobs render the
+    sizes of any stored ``image`` (see learnhub/images.py).
+    """
+    KIND_CHOICES = (
+        ('checksum', 'Verify upload'),
+        ('probe', 'Read duration'),
+        ('thumbnail', 'Resize thumbnail'),
+        ('derivatives', 'Render image sizes'),
+    )
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, null=True, blank=True, related_name='media_jobs')
+    upload = models.ForeignKey(UploadSession, on_delete=models.CASCADE, null=True, blank=True, related_name='media_jobs')
+    image = models.CharField(max_length=255, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['queued_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'queued_at'], name='mediajob_queue_idx'),
+        ]
+
+    def __str__(self):
+        if self.video_id:
+            target = f"video {self.video_id}"
+        elif self.upload_id:
+            target = f"upload {self.upload_id}"
+        else:
+            target = self.image
+        return f"{self.get_kind_display()} for {target} ({self.status})"
+
+    @property
+    def run_time(self):
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
@@ -0,0 +1,139 @@
+### videos/processing.py
+
+"""
+Out-of-request post-processing for uploaded videos.
+
+Uploads only enqueue ``MediaJob`` rows. The ``process_media`` command claims
+them, runs the CPU/IO-heavy part in a process pool (``execute`` takes and
+returns plain values, with no database access in the children), and writes
+the results back from the parent process.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from learnhub import images
+from .media import file_sha256, mp4_duration, resize_image
+from .models import MediaJob, UploadSession, Video
+from .uploads import verify_upload
+
+
+def enqueue_media_jobs(video):
+    """Queue a duration probe, and a thumbnail resize if one was uploaded."""
+    kinds = ['probe']
+    if video.thumbnail:
+        kinds.append('thumbnail')
+    MediaJob.objects.bulk_create(MediaJob(video=video, kind=kind) for kind in kinds)
+
+
+def claim_jobs(limit):
+    """
+    Atomically move up to ``limit`` queued jobs to running. The conditional
+    UPDATE means two workers can never claim the same job, even on databases
+    without SELECT ... SKIP LOCKED.
+    """
+    stale_after = timedelta(seconds=getattr(settings, 'MEDIA_JOB_TIMEOUT', 1800))
+    max_attempts = getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 3)
+    # Jobs left running by a crashed (or killed) worker count as an attempt,
+    # so one that keeps taking its worker down stops being retried
+    stale = MediaJob.objects.filter(status='running', started_at__lt=timezone.now() - stale_after)
+    exhausted = stale.filter(attempts__gte=max_attempts - 1)
+    uploads = list(exhausted.filter(kind='checksum').values_list('upload_id', flat=True))
+    exhausted.update(
+        status='failed',
+        attempts=F('attempts') + 1,
+        error=f'Timed out after {stale_after}',
+        finished_at=timezone.now(),
+    )
+    UploadSession.objects.filter(pk__in=uploads, status='verifying').update(status='failed')
+    stale.update(status='queued', attempts=F('attempts') + 1)
+
+    claimed = []
+    candidates = MediaJob.objects.filter(status='queued').values_list('pk', flat=True)[:limit * 2]
+    for pk in candidates:
+        now = timezone.now()
+        if MediaJob.objects.filter(pk=pk, status='queued').update(status='running', started_at=now):
+            claimed.append(pk)
+        if len(claimed) >= limit:
+            break
+    return list(MediaJob.objects.filter(pk__in=claimed).select_related('video', 'upload'))
+
+
+def job_payload(job):
+    """The plain arguments ``execute`` needs for ``job``."""
+    if job.kind == 'checksum':
+        return {'path': default_storage.path(job.upload.file_name)}
+    if job.kind == 'derivatives':
+        args = images.render_args(job.image)
+        if args is None:
+            raise FileNotFoundError(job.image)
+        return {'args': args}
+    video = job.video
+    if job.kind == 'probe':
+        return {'path': video.video_file.path}
+    stem = os.path.splitext(os.path.basename(video.thumbnail.name))[0]
+    max_width = getattr(settings, 'VIDEO_THUMBNAIL_MAX_WIDTH', 640)
+    target = default_storage.get_available_name(f'video_thumbnails/{stem}_{max_width}w.jpg')
+    return {
+        'source': video.thumbnail.path,
+        'target': target,
+        'target_path': default_storage.path(target),
+        'max_width': max_width,
+    }
+
+
+def execute(kind, payload):
+    """Run one job in a worker process. Returns a dict of results."""
+    if kind == 'checksum':
+        return {'sha256': file_sha256(payload['path'])}
+    if kind == 'derivatives':
+        return {'written': images.render(*payload['args'])}
+    if kind == 'probe':
+        duration = mp4_duration(payload['path'])
+        return {'duration': duration.total_seconds() if duration is not None else None}
+    if kind == 'thumbnail':
+        width, height = resize_image(payload['source'], payload['target_path'], payload['max_width'])
+        return {'name': payload['target'], 'width': width, 'height': height}
+    raise ValueError(f'Unknown media job kind {kind!r}')
+
+
+def complete_job(job, result):
+    """Store a job's results on its video (or upload) and mark it done."""
+    with transaction.atomic():
+        if job.kind == 'checksum':
+            verify_upload(job.upload_id, result['sha256'])
+        elif job.kind != 'derivatives':
+            video = Video.objects.select_for_update().get(pk=job.video_id)
+            if job.kind == 'probe' and result['duration'] is not None:
+                video.duration = timedelta(seconds=result['duration'])
+                video.save(update_fields=['duration', 'updated_at'])
+            elif job.kind == 'thumbnail':
+                original = video.thumbnail.name
+                video.thumbnail.name = result['name']
+                video.save(update_fields=['thumbnail', 'updated_at'])
+                if original and original != result['name']:
+                    transaction.on_commit(lambda: default_storage.delete(original))
+        job.status = 'done'
+        job.error = ''
+        job.attempts += 1
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'attempts', 'finished_at'])
+
+
+def fail_job(job, error):
+    """Record a failure; the job is retried until MEDIA_JOB_MAX_ATTEMPTS."""
+    job.attempts += 1
+    job.error = str(error)[:2000]
+    job.finished_at = timezone.now()
+    max_attempts = getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 3)
+    job.status = 'failed' if job.attempts >= max_attempts else 'queued'
+    job.save(update_fields=['status', 'error', 'attempts', 'finished_at'])
+    if job.status == 'failed' and job.kind == 'checksum':
+        # The file could not be verified; the client sees ``failed``
+        UploadSession.objects.filter(pk=job.upload_id, status='verifying').update(status='failed')
@@ -0,0 +1,226 @@
+### videos/progress.py
+
+"""
+Batched ingestion of player heartbeats into ``VideoProgress``.
+
+Heartbeats are coalesced per ``(user, video)`` in a per-worker buffer that
+keeps only the furthest position reached, and are written with one bulk
+upsert when the buffer reaches ``PROGRESS_FLUSH_THRESHOLD`` pairs or is older
+than ``PROGRESS_FLUSH_INTERVAL`` seconds. A few seconds of progress can be
+lost if a worker dies, which the next heartbeat from the player makes good.
+
+Every write also refreshes the touched ``(user, course)`` rows of
+``CourseProgress``, the per-course rollup behind the dashboard's "continue
+watching" list, in the same transaction.
+"""
+
+import atexit
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from courses.stats import refresh_student_stats
+from .models import CourseProgress, Video, VideoProgress
+
+_buffer = {}
+_lock = threading.Lock()
+_state = {'last_flush': time.monotonic()}
+
+
+def record_heartbeat(user_id, video_id, position):
+    """Buffer the player position (seconds) for a user and video."""
+    if not math.isfinite(position):
+        raise ValueError(f'position must be a finite number, not {position!r}')
+    key = (user_id, video_id)
+    position = max(int(position), 0)
+    with _lock:
+        if position > _buffer.get(key, -1):
+            _buffer[key] = position
+        due = (
+            len(_buffer) >= getattr(settings, 'PROGRESS_FLUSH_THRESHOLD', 500)
+            or time.monotonic() - _state['last_flush'] >= getattr(settings, 'PROGRESS_FLUSH_INTERVAL', 10)
+        )
+    if due:
+        flush()
+
+
+def pending_position(user_id, video_id):
+    with _lock:
+        return _buffer.get((user_id, video_id))
+
+
+def _is_complete(watched_seconds, duration):
+    if not duration:
+        return False
+    threshold = getattr(settings, 'PROGRESS_COMPLETION_THRESHOLD', 0.9)
+    return watched_seconds >= duration.total_seconds() * threshold
+
+
+def flush():
+    """Write buffered positions; returns the number of rows upserted."""
+    with _lock:
+        batch = dict(_buffer)
+        _buffer.clear()
+        _state['last_flush'] = time.monotonic()
+    if not batch:
+        return 0
+    try:
+        return write_progress(batch)
+    except Exception:
+        # Put positions back (keeping anything newer) so the next flush retries
+        with _lock:
+            for key, position in batch.items():
+                if position > _buffer.get(key, -1):
+                    _buffer[key] = position
+        raise
+
+
+def write_progress(positions):
+    """
+    Upsert ``{(user_id, video_id): position}`` into ``VideoProgress`` with a
+    fixed number of queries, never moving ``watched_seconds`` backwards.
+
+    Positions for videos of courses the user can't see (the same rule as
+    ``Course.is_visible_to``) are dropped, so a heartbeat can't enrol a
+    student in an inactive course.
+
+    Missing rows are inserted first and then every row is re-read under
+    ``select_for_update``, so two workers flushing the same pair at once
+    are serialized and the later one compares against what the earlier one
+    wrote rather than against a stale read.
+    """
+    video_ids = {video_id for _, video_id in positions}
+    user_ids = {user_id for user_id, _ in positions}
+    videos = {}
+    hidden = {}
+    for pk, duration, course_id, is_active, teacher_id in Video.objects.filter(pk__in=video_ids).values_list(
+            'pk', 'duration', 'course_id', 'course__is_active', 'course__teacher_id'):
+        videos[pk] = (duration, course_id)
+        if not is_active:
+            hidden[pk] = teacher_id
+    if hidden:
+        staff_ids = set(get_user_model().objects.filter(pk__in=user_ids, is_staff=True).values_list('pk', flat=True))
+    positions = {
+        (user_id, video_id): position for (user_id, video_id), position in positions.items()
+        if video_id in videos and (video_id not in hidden or user_id == hidden[video_id] or user_id in staff_ids)
+    }
+    if not positions:
+        return 0
+    rows_for = VideoProgress.objects.filter(user_id__in=user_ids, video_id__in=video_ids)
+    existing = set(rows_for.values_list('user_id', 'video_id').order_by())
+
+    now = timezone.now()
+    with transaction.atomic():
+        VideoProgress.objects.bulk_create(
+            [VideoProgress(user_id=user_id, video_id=video_id, last_watched=now)
+             for user_id, video_id in positions if (user_id, video_id) not in existing],
+            ignore_conflicts=True,
+        )
+        rows = []
+        for row in rows_for.select_for_update().only('user_id', 'video_id', 'watched_seconds', 'completed'):
+            position = positions.get((row.user_id, row.video_id))
+            if position is None:
+                continue
+            duration = videos[row.video_id][0]
+            if duration:
+                # Clamp to the video length so bogus positions can't inflate progress
+                position = min(position, int(duration.total_seconds()))
+            row.watched_seconds = max(position, row.watched_seconds)
+            row.completed = row.completed or _is_complete(row.watched_seconds, duration)
+            row.last_watched = now
+            rows.append(row)
+        VideoProgress.objects.bulk_update(rows, ['watched_seconds', 'completed', 'last_watched'])
+
+        refresh_course_progress({(row.user_id, videos[row.video_id][1]) for row in rows})
+        created = [row for row in rows if (row.user_id, row.video_id) not in existing]
+        if created:
+            # bulk_create skips post_save, so tell the course stats directly
+            course_ids = {videos[row.video_id][1] for row in created}
+            transaction.on_commit(lambda: _refresh_courses(course_ids))
+    return len(rows)
+
+
+def refresh_course_progress(pairs):
+    """
+    Recompute the ``CourseProgress`` rows for ``{(user_id, course_id)}``
+    from ``VideoProgress`` (one read, one upsert) and drop rows whose
+    progress is all gone. A pair covers one course's videos, so the read is
+    small. Returns the number of rows written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+    totals = {}
+    for user_id, course_id, video_id, watched, completed, last_watched in (
+            VideoProgress.objects
+            .filter(user_id__in={user_id for user_id, _ in pairs},
+                    video__course_id__in={course_id for _, course_id in pairs})
+            .values_list('user_id', 'video__course_id', 'video_id', 'watched_seconds', 'completed', 'last_watched')
+            .order_by()):
+        if (user_id, course_id) not in pairs:
+            continue
+        row = totals.get((user_id, course_id))
+        if row is None:
+            row = totals[user_id, course_id] = CourseProgress(
+                user_id=user_id, course_id=course_id, last_video_id=video_id, last_watched=last_watched)
+        row.videos_started += 1
+        row.videos_completed += completed
+        row.watched_seconds += watched
+        if (last_watched, video_id) > (row.last_watched, row.last_video_id):
+            row.last_video_id, row.last_watched = video_id, last_watched
+
+    gone = pairs - set(totals)
+    with transaction.atomic():
+        CourseProgress.objects.bulk_create(
+            list(totals.values()),
+            update_conflicts=True,
+            unique_fields=['user', 'course'],
+            update_fields=['videos_started', 'videos_completed', 'watched_seconds',
+                           'last_video', 'last_watched', 'updated_at'],
+        )
+        if gone:
+            stale = Q()
+            for user_id, course_id in gone:
+                stale |= Q(user_id=user_id, course_id=course_id)
+            CourseProgress.objects.filter(stale).delete()
+    return len(totals)
+
+
+def rebuild_course_progress(user_ids=None, batch_size=500):
+    """
+    Recompute ``CourseProgress`` from scratch, a batch of users at a time;
+    returns the number of rows written.
+    """
+    users = (set(VideoProgress.objects.values_list('user_id', flat=True).distinct().order_by())
+             | set(CourseProgress.objects.values_list('user_id', flat=True).distinct().order_by()))
+    if user_ids is not None:
+        users &= set(user_ids)
+    users = sorted(users)
+    written = 0
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        # Existing rows are included so that pairs without progress get dropped
+        pairs = (set(VideoProgress.objects.filter(user_id__in=batch)
+                     .values_list('user_id', 'video__course_id').distinct().order_by())
+                 | set(CourseProgress.objects.filter(user_id__in=batch).values_list('user_id', 'course_id')))
+        written += refresh_course_progress(pairs)
+    return written
+
+
+def _refresh_courses(course_ids):
+    for course_id in course_ids:
+        refresh_student_stats(course_id)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
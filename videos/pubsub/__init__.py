@@ -0,0 +1,35 @@
+### videos/pubsub/__init__.py
+
+"""
+Publish/subscribe for live page updates (new comments on a video).
+
+The broker is chosen with the ``COMMENT_STREAM_BROKER`` setting (a dotted
+path to a ``Broker`` subclass). ``InProcessBroker`` only reaches clients
+connected to the same worker process, which is enough for a single ASGI
+worker; with several, use ``RedisBroker`` so every worker sees every message.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import Broker, Subscription
+
+DEFAULT_BROKER = 'videos.pubsub.memory.InProcessBroker'
+
+
+@lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    return _load_broker(getattr(settings, 'COMMENT_STREAM_BROKER', DEFAULT_BROKER))
+
+
+def video_channel(video_id):
+    return f'video:{video_id}:comments'
+
+
+__all__ = ['Broker', 'Subscription', 'get_broker', 'video_channel']
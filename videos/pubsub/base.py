@@ -0,0 +1,30 @@
+class Subscription:
+    """
+    Messages published on one channel after the subscription was opened.
+    Use as ``async with broker.subscribe(channel) as subscription``.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get(self, timeout):
+        """The next message (a dict), or None after ``timeout`` seconds."""
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+
+class Broker:
+    """Interface every pub/sub backend implements."""
+
+    def publish(self, channel, message):
+        """Send ``message`` (a JSON-serialisable dict); callable from sync code."""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """A ``Subscription`` to ``channel``; must be entered before use."""
+        raise NotImplementedError
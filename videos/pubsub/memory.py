@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .base import Broker, Subscription
+
+
+def _deliver(queue, message):
+    # A slow client loses its oldest messages rather than growing without bound
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class InProcessSubscription(Subscription):
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = None
+        self.loop = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=getattr(settings, 'COMMENT_STREAM_QUEUE_SIZE', 100))
+        self.broker._add(self.channel, self)
+        return self
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._remove(self.channel, self)
+
+
+class InProcessBroker(Broker):
+    """Fan-out to subscribers in this process, whichever thread publishes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def _add(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+
+    def _remove(self, channel, subscription):
+        with self._lock:
+            self._subscribers[channel].discard(subscription)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            # Queues belong to their event loop; hand the message over to it
+            try:
+                subscription.loop.call_soon_threadsafe(_deliver, subscription.queue, message)
+            except RuntimeError:
+                # Loop already closed; the subscription is going away
+                pass
+
+    def subscribe(self, channel):
+        return InProcessSubscription(self, channel)
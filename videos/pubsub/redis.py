@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import Broker, Subscription
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # optional dependency
+    redis = aioredis = None
+
+
+class RedisSubscription(Subscription):
+
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self.client = None
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.client = aioredis.Redis.from_url(self.url)
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(self.channel)
+        return self
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        if self.client is not None:
+            await self.client.aclose()
+
+
+class RedisBroker(Broker):
+    """Redis PUBLISH/SUBSCRIBE, shared by every worker process."""
+
+    def __init__(self):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker needs the redis package (pip install redis)')
+        self.url = getattr(settings, 'COMMENT_STREAM_REDIS_URL', 'redis://localhost:6379/0')
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, json.dumps(message))
+
+    def subscribe(self, channel):
+        return RedisSubscription(self.url, channel)
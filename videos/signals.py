@@ -0,0 +1,89 @@
+### videos/signals.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .comments import publish_comment, publish_deletion
+from .models import Comment, Video, VideoProgress
+from .processing import enqueue_media_jobs
+from .progress import refresh_course_progress
+
+
+@receiver(post_save, sender=Video)
+def queue_media_processing(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: enqueue_media_jobs(instance))
+
+
+@receiver(post_save, sender=Comment)
+def push_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: publish_comment(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def push_deleted_comment(sender, instance, **kwargs):
+    video_id, comment_id = instance.video_id, instance.pk
+    transaction.on_commit(lambda: publish_deletion(video_id, comment_id))
+
+
+def _deleting(origin):
+    """
+    What the delete started on ``origin`` (the instance or queryset whose
+    ``delete()`` was called) is removing. Django sends pre_delete for every
+    collected object before deleting any, so by the time the post_delete of
+    a cascaded VideoProgress row runs, its video, course and user are known.
+    """
+    if origin is None:
+        return {'videos': {}, 'courses': set(), 'users': set()}
+    if not hasattr(origin, '_progress_deleting'):
+        origin._progress_deleting = {'videos': {}, 'courses': set(), 'users': set()}
+    return origin._progress_deleting
+
+
+@receiver(pre_delete, sender=Video)
+def note_deleted_video(sender, instance, origin=None, **kwargs):
+    # The video's progress rows collect their users here, for one refresh
+    _deleting(origin)['videos'][instance.pk] = (instance.course_id, set())
+
+
+@receiver(pre_delete, sender='courses.Course')
+def note_deleted_course(sender, instance, origin=None, **kwargs):
+    _deleting(origin)['courses'].add(instance.pk)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def note_deleted_user(sender, instance, origin=None, **kwargs):
+    _deleting(origin)['users'].add(instance.pk)
+
+
+@receiver(post_save, sender=VideoProgress)
+@receiver(post_delete, sender=VideoProgress)
+def refresh_progress_rollup(sender, instance, raw=False, origin=None, **kwargs):
+    # Heartbeats go through write_progress, which refreshes the rollup itself;
+    # this covers the admin and deletes
+    if raw:
+        return
+    if origin is not None:
+        deleting = _deleting(origin)
+        if instance.user_id in deleting['users']:
+            return  # its CourseProgress rows go with the user
+        if instance.video_id in deleting['videos']:
+            deleting['videos'][instance.video_id][1].add(instance.user_id)
+            return
+    course_id = Video.objects.filter(pk=instance.video_id).values_list('course_id', flat=True).first()
+    if course_id is not None:
+        pair = (instance.user_id, course_id)
+        transaction.on_commit(lambda: refresh_course_progress({pair}))
+
+
+@receiver(post_delete, sender=Video)
+def refresh_deleted_video_rollups(sender, instance, origin=None, **kwargs):
+    deleting = _deleting(origin)
+    course_id, user_ids = deleting['videos'].pop(instance.pk, (None, set()))
+    # A deleted course takes its CourseProgress rows with it
+    if user_ids and course_id not in deleting['courses']:
+        pairs = {(user_id, course_id) for user_id in user_ids}
+        transaction.on_commit(lambda: refresh_course_progress(pairs))
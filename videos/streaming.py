@@ -0,0 +1,144 @@
+### videos/streaming.py
+
+"""
+HTTP byte-range streaming for uploaded video files.
+
+Access checks stay in Django; the bytes are either streamed in fixed-size
+chunks through ``FileResponse`` or, when ``VIDEO_STREAM_OFFLOAD`` is set,
+handed to the front-end server with ``X-Accel-Redirect`` (nginx) or
+``X-Sendfile`` (Apache/lighttpd), which then handles ranges itself.
+"""
+
+import mimetypes
+import re
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+DEFAULT_CHUNK_SIZE = 512 * 1024
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of ``file`` starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    ``None`` if the header should be ignored, or ``False`` if it cannot be
+    satisfied. Multi-range requests are ignored and get the whole file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def file_validators(field_file):
+    """``(etag, last_modified_timestamp)`` for a stored file."""
+    size = field_file.size
+    try:
+        modified = field_file.storage.get_modified_time(field_file.name)
+    except (NotImplementedError, OSError):
+        modified = datetime.fromtimestamp(0, tz=timezone.utc)
+    timestamp = int(modified.timestamp())
+    return f'"{size:x}-{timestamp:x}"', timestamp
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        # Weak validators never match If-Range
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _offload_response(field_file, content_type):
+    mode = getattr(settings, 'VIDEO_STREAM_OFFLOAD', None)
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'VIDEO_STREAM_ACCEL_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + field_file.name
+        return response
+    if mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+        return response
+    return None
+
+
+def stream_file(request, field_file):
+    """Serve ``field_file`` honouring Range, If-Range and conditional GET."""
+    etag, last_modified = file_validators(field_file)
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _offload_response(field_file, content_type)
+    if response is None:
+        response = _range_response(request, field_file, content_type, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=%d' % getattr(settings, 'VIDEO_STREAM_MAX_AGE', 3600)
+    return response
+
+
+def _range_response(request, field_file, content_type, etag, last_modified):
+    size = field_file.size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    body = RangeFile(field_file.open('rb'), start, length)
+    response = FileResponse(body, content_type=content_type, status=206 if byte_range else 200)
+    response.block_size = getattr(settings, 'VIDEO_STREAM_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
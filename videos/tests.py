@@ -1,3 +1,417 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import CustomUser
+from learnhub.instrumentation import QueryBudgetMixin
+from learnhub import images
+from learnhub.loaders import UserStateLoader
+from courses.models import Course, Topic
+from courses.tests import HOLD_BUFFERED_WRITES
+from . import progress
+from .comments import comments_after
+from .models import Bookmark, Comment, CourseProgress, MediaJob, UploadSession, Video, VideoProgress
+from .processing import claim_jobs, complete_job, execute, job_payload
+from .pubsub.memory import InProcessBroker
+
+
+def make_course(teacher, title='Django', **kwargs):
+    topic, _ = Topic.objects.get_or_create(name='Python')
+    return Course.objects.create(title=title, description='d', teacher=teacher, topic=topic, **kwargs)
+
+
+def make_video(course, title='Intro', seconds=100, **kwargs):
+    return Video.objects.create(title=title, course=course, video_file='videos/x.mp4',
+                                duration=timedelta(seconds=seconds), **kwargs)
+
+
+class VideoTestCase(TestCase):
+
+    def setUp(self):
+        # Cached users are written on commit, which a TestCase never does
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user('teacher', password='pw', user_type='teacher')
+        self.student = CustomUser.objects.create_user('student', password='pw', user_type='student')
+        self.course = make_course(self.teacher)
+        self.video = make_video(self.course)
+
+
+class InactiveCourseTests(VideoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        self.urls = [reverse(name, args=[self.video.pk])
+                     for name in ('video_detail', 'stream_video', 'comment_feed')]
+
+    def test_hidden_from_students_and_anonymous_users(self):
+        for login in (None, self.student):
+            if login:
+                self.client.force_login(login)
+            for url in self.urls:
+                self.assertEqual(self.client.get(url).status_code, 404, url)
+
+    def test_nothing_else_is_loaded_for_a_hidden_video(self):
+        self.client.force_login(self.student)
+        with mock.patch('videos.views.comment_page') as comment_page, \
+                mock.patch('videos.views._alist') as playlist:
+            self.assertEqual(self.client.get(reverse('video_detail', args=[self.video.pk])).status_code, 404)
+        comment_page.assert_not_called()
+        playlist.assert_not_called()
+
+    async def test_comment_stream_is_hidden(self):
+        response = await AsyncClient().get(reverse('comment_stream', args=[self.video.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_comments_and_bookmarks_are_refused(self):
+        self.client.force_login(self.student)
+        for name in ('add_comment', 'toggle_bookmark'):
+            response = self.client.post(reverse(name, args=[self.video.pk]), {'content': 'hi'})
+            self.assertEqual(response.status_code, 404, name)
+
+    def test_visible_to_the_teacher_and_staff(self):
+        staff = CustomUser.objects.create_user('staff', password='pw', is_staff=True)
+        for user in (self.teacher, staff):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get(reverse('video_detail', args=[self.video.pk])).status_code, 200)
+            self.assertEqual(self.client.get(reverse('comment_feed', args=[self.video.pk])).status_code, 200)
+
+
+class LiveCommentTests(VideoTestCase):
+
+    def test_no_stream_under_wsgi(self):
+        url = reverse('video_detail', args=[self.video.pk])
+        stream = reverse('comment_stream', args=[self.video.pk])
+        self.assertNotContains(self.client.get(url), stream)
+
+    async def test_stream_is_opened_under_asgi(self):
+        response = await AsyncClient().get(reverse('video_detail', args=[self.video.pk]))
+        self.assertContains(response, reverse('comment_stream', args=[self.video.pk]))
+
+
+class CommentFeedTests(VideoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.comments = [Comment.objects.create(video=self.video, user=self.student, content=f'Comment {i}')
+                         for i in range(5)]
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_feed_pages_from_newest_to_oldest(self):
+        url, cursor, seen = reverse('comment_feed', args=[self.video.pk]), None, []
+        while True:
+            page = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            self.assertLessEqual(len(page['comments']), 2)
+            seen += [comment['id'] for comment in page['comments']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [comment.pk for comment in reversed(self.comments)])
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
+
+    @override_settings(COMMENT_STREAM_MAX_SECONDS=0)
+    async def test_reconnecting_streams_replay_what_they_missed(self):
+        missed = await sync_to_async(comments_after)(self.video.pk, self.comments[2].pk)
+        self.assertEqual([comment.pk for comment in missed], [comment.pk for comment in self.comments[3:]])
+
+        response = await AsyncClient().get(reverse('comment_stream', args=[self.video.pk]),
+                                           headers={'Last-Event-ID': str(self.comments[2].pk)})
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(re.findall(r'^id: (\d+)$', body, re.M), [str(comment.pk) for comment in self.comments[3:]])
+        self.assertIn('Comment 4', body)
+
+    def test_broker_errors_dont_fail_the_comment(self):
+        broker = mock.Mock()
+        broker.publish.side_effect = ConnectionError('broker is down')
+        with mock.patch('videos.comments.get_broker', return_value=broker), \
+                self.assertLogs('learnhub.comments', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(video=self.video, user=self.student, content='Still saved')
+        broker.publish.assert_called_once()
+        self.assertTrue(Comment.objects.filter(pk=comment.pk).exists())
+
+
+class InProcessBrokerTests(SimpleTestCase):
+
+    async def test_fan_out_to_the_channel_only(self):
+        broker = InProcessBroker()
+        async with broker.subscribe('a') as first, broker.subscribe('a') as second, broker.subscribe('b') as other:
+            broker.publish('a', {'event': 'comment', 'id': 1})
+            self.assertEqual(await first.get(timeout=1), {'event': 'comment', 'id': 1})
+            self.assertEqual(await second.get(timeout=1), {'event': 'comment', 'id': 1})
+            self.assertIsNone(await other.get(timeout=0.01))
+        self.assertEqual(broker._subscribers, {})
+
+    @override_settings(COMMENT_STREAM_QUEUE_SIZE=2)
+    async def test_slow_subscribers_lose_their_oldest_messages(self):
+        broker = InProcessBroker()
+        async with broker.subscribe('a') as subscription:
+            # Published from another thread, as post-commit hooks in sync views are
+            await sync_to_async(lambda: [broker.publish('a', {'id': i}) for i in range(3)], thread_sensitive=False)()
+            await asyncio.sleep(0)
+            self.assertEqual([await subscription.get(timeout=1) for _ in range(2)], [{'id': 1}, {'id': 2}])
+            self.assertIsNone(await subscription.get(timeout=0.01))
+
+
+class UploadTests(VideoTestCase):
+    data = b'\x00\x01video bytes' * 100
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.client.force_login(self.teacher)
+
+    def upload(self, sha256=''):
+        response = self.client.post(
+            reverse('upload_session_create', args=[self.course.pk]),
+            json.dumps({'filename': 'talk.mp4', 'size': len(self.data), 'title': 'Talk', 'sha256': sha256}),
+            content_type='application/json',
+        )
+        url = response.json()['url']
+        response = self.client.patch(url, self.data, content_type='application/octet-stream',
+                                     headers={'Upload-Offset': '0'})
+        self.assertEqual(response.json()['offset'], len(self.data))
+        return url
+
+    def run_media_jobs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for job in claim_jobs(10):
+                complete_job(job, execute(job.kind, job_payload(job)))
+
+    def test_finalize_without_checksum_creates_the_video(self):
+        url = self.upload()
+        response = self.client.post(url + 'finalize/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Video.objects.get(pk=response.json()['video_id']).title, 'Talk')
+
+    def test_checksum_is_verified_by_the_media_worker(self):
+        url = self.upload(hashlib.sha256(self.data).hexdigest())
+        response = self.client.post(url + 'finalize/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get(url).json()['status'], 'verifying')
+        self.assertFalse(Video.objects.filter(title='Talk').exists())
+
+        self.run_media_jobs()
+        video = Video.objects.get(title='Talk')
+        state = self.client.get(url).json()
+        self.assertEqual(state['status'], 'complete')
+        self.assertEqual(state['video_url'], reverse('video_detail', args=[video.pk]))
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 201)
+
+    def test_checksum_mismatch_discards_the_upload(self):
+        url = self.upload('0' * 64)
+        self.client.post(url + 'finalize/')
+        session = UploadSession.objects.get()
+        self.run_media_jobs()
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'failed')
+        self.assertFalse(default_storage.exists(session.file_name))
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 410)
+        self.assertFalse(Video.objects.filter(title='Talk').exists())
+
+    def test_finalize_after_the_video_was_deleted(self):
+        url = self.upload()
+        video_id = self.client.post(url + 'finalize/').json()['video_id']
+        Video.objects.filter(pk=video_id).delete()
+        self.assertEqual(self.client.post(url + 'finalize/').status_code, 410)
+
+
+class ClaimJobsTests(VideoTestCase):
+
+    def stale_job(self, attempts):
+        return MediaJob.objects.create(video=self.video, kind='probe', status='running', attempts=attempts,
+                                       started_at=timezone.now() - timedelta(hours=1))
+
+    @override_settings(MEDIA_JOB_TIMEOUT=60, MEDIA_JOB_MAX_ATTEMPTS=3)
+    def test_stale_jobs_use_up_an_attempt(self):
+        MediaJob.objects.filter(video=self.video).delete()
+        retried, exhausted = self.stale_job(attempts=0), self.stale_job(attempts=2)
+        self.assertEqual([job.pk for job in claim_jobs(10)], [retried.pk])
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts), ('running', 1))
+        self.assertEqual((exhausted.status, exhausted.attempts), ('failed', 3))
+        self.assertIn('Timed out', exhausted.error)
+
+
+@override_settings(IMAGE_DERIVATIVE_WIDTHS=[96, 192], IMAGE_DERIVATIVE_FORMATS=['webp', 'jpg'])
+class ImageDerivativeTests(VideoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'teal').save(buffer, 'PNG')
+        self.course.thumbnail.save('cover.png', ContentFile(buffer.getvalue()))
+
+    def rendered(self):
+        directory = os.path.dirname(default_storage.path(images.derivative_name(
+            images.source_digest(self.course.thumbnail.name), 96, 'jpg')))
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_saving_queues_a_job_instead_of_rendering(self):
+        self.course.save()
+        self.course.save(update_fields=['title'])
+        job = MediaJob.objects.get(kind='derivatives')
+        self.assertEqual(job.image, self.course.thumbnail.name)
+        self.assertEqual(self.rendered(), ['source'])
+
+        for job in claim_jobs(10):
+            complete_job(job, execute(job.kind, job_payload(job)))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(self.rendered(), ['192.jpg', '192.webp', '96.jpg', '96.webp', 'source'])
+
+    def test_concurrent_renders_of_one_file(self):
+        args = images.render_args(self.course.thumbnail.name)
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: images.render(*args), range(16)))
+        self.assertEqual(self.rendered(), ['192.jpg', '192.webp', '96.jpg', '96.webp', 'source'])
+        with Image.open(os.path.join(args[1], '96.webp')) as image:
+            self.assertEqual(image.size, (96, 72))
+
+    def test_srcsets_stop_at_the_source_width(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (150, 100), 'teal').save(buffer, 'PNG')
+        self.course.thumbnail.save('small.png', ContentFile(buffer.getvalue()))
+        with self.settings(IMAGE_DERIVATIVE_WIDTHS=[96, 192, 320]):
+            sets = images.srcsets(self.course.thumbnail)
+        self.assertEqual([shown for _, shown in sets['jpg']], [96, 150])
+        self.assertTrue(sets['jpg'][1][0].endswith('/192.jpg'))
+
+    def test_lost_source_markers_are_rewritten(self):
+        images.srcsets(self.course.thumbnail)
+        marker = os.path.join(os.path.dirname(default_storage.path(images.derivative_name(
+            images.source_digest(self.course.thumbnail.name), 96, 'jpg'))), 'source')
+        os.remove(marker)
+        # The digest is still cached
+        url = images.srcsets(self.course.thumbnail)['jpg'][0][0]
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class ProgressTests(VideoTestCase):
+
+    def test_non_finite_positions_are_rejected(self):
+        self.client.force_login(self.student)
+        for body in ('{"events": [{"video": %d, "position": NaN}]}',
+                     '{"events": [{"video": %d, "position": Infinity}]}'):
+            response = self.client.post(reverse('progress_heartbeat'), body % self.video.pk,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        with self.assertRaises(ValueError):
+            progress.record_heartbeat(self.student.pk, self.video.pk, float('nan'))
+        self.assertIsNone(progress.pending_position(self.student.pk, self.video.pk))
+
+    def test_progress_never_moves_backwards(self):
+        key = (self.student.pk, self.video.pk)
+        progress.write_progress({key: 95})
+        progress.write_progress({key: 30})
+        row = VideoProgress.objects.get(user=self.student, video=self.video)
+        self.assertEqual((row.watched_seconds, row.completed), (95, True))
+
+    def test_positions_are_clamped_to_the_duration(self):
+        progress.write_progress({(self.student.pk, self.video.pk): 10_000})
+        self.assertEqual(VideoProgress.objects.get(user=self.student).watched_seconds, 100)
+
+    def test_inactive_courses_take_no_progress_from_students(self):
+        Course.objects.filter(pk=self.course.pk).update(is_active=False)
+        staff = CustomUser.objects.create_user('staff', password='pw', is_staff=True)
+        self.assertEqual(progress.write_progress({(user.pk, self.video.pk): 50
+                                                  for user in (self.student, self.teacher, staff)}), 2)
+        self.assertCountEqual(VideoProgress.objects.values_list('user_id', flat=True), [self.teacher.pk, staff.pk])
+        self.assertFalse(CourseProgress.objects.filter(user=self.student).exists())
+
+    def test_deletes_refresh_the_rollup_in_one_go(self):
+        students = [self.student] + [
+            CustomUser.objects.create_user(f'student{i}', password='pw', user_type='student') for i in range(5)]
+        videos = [self.video] + [make_video(self.course, f'Part {i}', order=i) for i in range(1, 3)]
+        progress.write_progress({(student.pk, video.pk): 50 for student in students for video in videos})
+
+        def delete(obj):
+            with mock.patch('videos.signals.refresh_course_progress', wraps=progress.refresh_course_progress) as refresh, \
+                    mock.patch('videos.signals.Video') as lookup, \
+                    self.captureOnCommitCallbacks(execute=True):
+                obj.delete()
+            lookup.objects.filter.assert_not_called()
+            return [call.args[0] for call in refresh.call_args_list]
+
+        self.assertEqual(delete(videos[2]), [{(student.pk, self.course.pk) for student in students}])
+        self.assertEqual(sorted(CourseProgress.objects.values_list('videos_started', flat=True)), [2] * 6)
+        # Rows deleted with their user or course need no refresh
+        self.assertEqual(delete(students[1]), [])
+        self.assertEqual(CourseProgress.objects.count(), 5)
+        self.assertEqual(delete(self.course), [])
+        self.assertFalse(CourseProgress.objects.exists())
+
+    def test_title_holds_no_script(self):
+        self.client.force_login(self.student)
+        content = self.client.get(reverse('video_detail', args=[self.video.pk])).content.decode()
+        title = re.search(r'<title>(.*?)</title>', content, re.S).group(1)
+        self.assertEqual(title.strip(), 'Intro - LearnHub')
+        self.assertIn(reverse('progress_heartbeat'), content.split('</title>', 1)[1])
+
+
+class PlaylistTestCase(VideoTestCase):
+    """A ten-video course the student has bookmarked and started watching."""
+
+    def setUp(self):
+        super().setUp()
+        self.videos = [self.video] + [make_video(self.course, f'Part {i}', order=i) for i in range(1, 10)]
+        Bookmark.objects.bulk_create(Bookmark(user=self.student, video=video) for video in self.videos[::2])
+        progress.write_progress({(self.student.pk, video.pk): 50 for video in self.videos})
+
+
+@override_settings(**HOLD_BUFFERED_WRITES)
+class VideoDetailBudgetTests(QueryBudgetMixin, PlaylistTestCase):
+
+    def test_video_detail(self):
+        self.client.force_login(self.student)
+        with self.assertQueryBudget(7):
+            response = self.client.get(reverse('video_detail', args=[self.video.pk]))
+        self.assertContains(response, 'Part 9')
+        self.assertContains(response, '50% watched')
+
+
+class UserStateLoaderTests(PlaylistTestCase):
+
+    def test_one_query_per_kind(self):
+        loader = UserStateLoader(self.student).prime(videos=self.videos, courses=[self.course])
+        with self.assertNumQueries(3):
+            self.assertEqual(sum(loader.bookmarked(video) for video in self.videos), 5)
+            self.assertEqual([loader.progress(video).watched_seconds for video in self.videos], [50] * 10)
+            self.assertIsNone(loader.rating(self.course))
+        with self.assertNumQueries(0):
+            state = loader.video_state(self.videos)
+        self.assertEqual(state[self.video.pk], {'bookmarked': True, 'progress': 50, 'completed': False})
+
+    def test_unprimed_lookups_are_batched_too(self):
+        loader = UserStateLoader(self.student)
+        with self.assertNumQueries(1):
+            self.assertTrue(loader.bookmarked(self.video))
+        with self.assertNumQueries(1):
+            loader.prime(videos=self.videos)
+            loader.bookmarked(self.videos[1])
+            loader.bookmarked(self.videos[2])
+
+    def test_anonymous_users_cost_nothing(self):
+        loader = UserStateLoader(AnonymousUser()).prime(videos=self.videos)
+        with self.assertNumQueries(0):
+            self.assertFalse(loader.bookmarked(self.video))
+            self.assertIsNone(loader.progress(self.video))
@@ -0,0 +1,187 @@
+### videos/uploads.py
+
+"""
+Resumable chunked uploads.
+
+Protocol (all JSON, see videos/urls.py):
+
+1. ``POST upload/<course_id>/sessions/`` with filename, size, title and an
+   optional whole-file ``sha256`` opens a session and reserves the final
+   file name in media storage.
+2. ``PATCH uploads/<id>/`` with the raw bytes as the body and an
+   ``Upload-Offset`` header appends a chunk. An optional
+   ``Upload-Checksum: sha256 <base64>`` header is verified before the chunk
+   is written. A mismatched offset returns 409 with the server's offset, and
+   ``GET uploads/<id>/`` reports it too, so clients resume after a drop.
+3. ``POST uploads/<id>/finalize/`` checks the size and creates the
+   ``Video`` (201). If a ``sha256`` was given, hashing the whole file is left
+   to the ``process_media`` worker: the answer is 202 and the session reads
+   ``verifying`` until ``verify_upload`` creates the video, or discards the
+   file on a mismatch (``failed``). Poll ``GET uploads/<id>/``.
+"""
+
+import base64
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+from .models import MediaJob, UploadSession, Video
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class UploadError(Exception):
+    """A protocol error, reported to the client with ``status``."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def max_chunk_size():
+    return getattr(settings, 'VIDEO_UPLOAD_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def _path(session):
+    # Chunks are appended in place, which needs a filesystem-backed storage
+    return default_storage.path(session.file_name)
+
+
+def create_session(user, course, filename, size, title, description='', order=0, sha256=''):
+    max_size = getattr(settings, 'VIDEO_UPLOAD_MAX_SIZE', 10 * 1024 ** 3)
+    if size <= 0 or size > max_size:
+        raise UploadError(f'size must be between 1 and {max_size} bytes')
+    if sha256 and len(sha256) != 64:
+        raise UploadError('sha256 must be a hex digest')
+
+    name = default_storage.generate_filename(f'videos/{get_valid_filename(filename)}')
+    # Reserve the final name now so concurrent sessions never share a file
+    name = default_storage.save(name, ContentFile(b''))
+    return UploadSession.objects.create(
+        user=user,
+        course=course,
+        title=title,
+        description=description,
+        order=order,
+        file_name=name,
+        total_size=size,
+        sha256=sha256.lower(),
+    )
+
+
+def read_chunk(stream, length):
+    """Read exactly ``length`` bytes from the request stream."""
+    if length > max_chunk_size():
+        raise UploadError(f'chunks may be at most {max_chunk_size()} bytes', status=413)
+    data = stream.read(length)
+    if len(data) != length:
+        raise UploadError('request body shorter than Content-Length')
+    return data
+
+
+def verify_chunk_checksum(data, header):
+    if not header:
+        return
+    algorithm, _, digest = header.partition(' ')
+    if algorithm.lower() != 'sha256':
+        raise UploadError('only sha256 chunk checksums are supported')
+    if base64.b64encode(hashlib.sha256(data).digest()).decode() != digest.strip():
+        # 460 is the tus protocol's "Checksum Mismatch": resend this chunk
+        raise UploadError('chunk checksum mismatch', status=460)
+
+
+def append_chunk(session_id, user, offset, data):
+    """Append ``data`` at ``offset`` and return the new offset."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, user=user)
+        if session.status != 'pending':
+            raise UploadError('upload is no longer pending', status=409, offset=session.received)
+        if offset != session.received:
+            raise UploadError('offset mismatch', status=409, offset=session.received)
+        if session.received + len(data) > session.total_size:
+            raise UploadError('chunk runs past the declared size', status=413, offset=session.received)
+
+        path = _path(session)
+        with open(path, 'r+b') as fh:
+            # Drop any tail left by an earlier interrupted write before appending
+            fh.truncate(session.received)
+            fh.seek(session.received)
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        session.received += len(data)
+        session.save(update_fields=['received', 'updated_at'])
+        return session.received
+
+
+def _create_video(session):
+    video = Video(
+        title=session.title,
+        description=session.description,
+        course=session.course,
+        order=session.order,
+    )
+    video.video_file.name = session.file_name
+    video.save()
+    session.status = 'complete'
+    session.video = video
+    session.save(update_fields=['status', 'video', 'updated_at'])
+    return video
+
+
+def finalize(session_id, user):
+    """
+    Close a fully received upload and return the session: ``complete`` with
+    its ``Video``, or ``verifying`` while a checksum job is queued.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id, user=user)
+        if session.status == 'complete':
+            if session.video_id is None:
+                raise UploadError('the video for this upload has been deleted', status=410)
+            return session
+        if session.status == 'verifying':
+            return session
+        if session.status == 'failed':
+            raise UploadError('checksum mismatch, upload discarded', status=410)
+        if session.received != session.total_size:
+            raise UploadError('upload is incomplete', status=409, offset=session.received)
+
+        if session.sha256:
+            session.status = 'verifying'
+            session.save(update_fields=['status', 'updated_at'])
+            MediaJob.objects.create(upload=session, kind='checksum')
+        else:
+            _create_video(session)
+    return session
+
+
+def verify_upload(session_id, digest):
+    """
+    Called with the worker's ``sha256`` of the file: create the ``Video`` if
+    it matches, otherwise mark the session failed and delete the file.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session_id).first()
+        if session is None or session.status != 'verifying':
+            # Abandoned while the job was running
+            return
+        if digest == session.sha256:
+            _create_video(session)
+        else:
+            session.status = 'failed'
+            session.save(update_fields=['status', 'updated_at'])
+            transaction.on_commit(lambda: default_storage.delete(session.file_name))
+
+
+def discard(session):
+    """Delete a session and its partial file."""
+    if session.status != 'complete':
+        default_storage.delete(session.file_name)
+    session.delete()
@@ -5,7 +5,14 @@ from . import views
 
 urlpatterns = [
     path('upload/<int:course_id>/', views.upload_video, name='upload_video'),
+    path('upload/<int:course_id>/sessions/', views.upload_session_create, name='upload_session_create'),
+    path('uploads/<uuid:session_id>/', views.upload_session, name='upload_session'),
+    path('uploads/<uuid:session_id>/finalize/', views.upload_session_finalize, name='upload_session_finalize'),
+    path('progress/', views.progress_heartbeat, name='progress_heartbeat'),
     path('<int:video_id>/', views.video_detail, name='video_detail'),
+    path('<int:video_id>/stream/', views.stream_video, name='stream_video'),
     path('<int:video_id>/bookmark/', views.toggle_bookmark, name='toggle_bookmark'),
     path('<int:video_id>/comment/', views.add_comment, name='add_comment'),
+    path('<int:video_id>/comments/', views.comment_feed, name='comment_feed'),
+    path('<int:video_id>/comments/stream/', views.comment_stream, name='comment_stream'),
 ]
\ No newline at end of file
@@ -1,13 +1,29 @@
 ## videos/views.py
 
-from django.shortcuts import render, get_object_or_404, redirect
+import json
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from .models import Video, Bookmark, Comment
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_http_methods
+from .models import Video, Bookmark, Comment, UploadSession
 from .forms import VideoForm, CommentForm
 from courses.models import Course
+from courses.pagination import InvalidCursor
+from analytics.events import record_event
+from learnhub.loaders import user_state
+from learnhub.replicas import pin_to_primary
+from .streaming import stream_file
+from . import progress, uploads
+from .comments import comment_page, comment_payload, comments_after
+from .pubsub import get_broker, video_channel
 
 @login_required
 def upload_video(request, course_id):
@@ -29,30 +45,139 @@ def upload_video(request, course_id):
     else:
         form = VideoForm()
     
-    return render(request, 'videos/upload_video.html', {
+    return render(request, 'video/upload.html', {
         'form': form,
-        'course': course
+        'course': course,
+        'chunk_size': uploads.max_chunk_size(),
     })
 
-def video_detail(request, video_id):
-    video = get_object_or_404(Video, id=video_id)
-    comments = video.comments.all().select_related('user')
+def _upload_error(exc):
+    data = {'error': str(exc)}
+    if exc.offset is not None:
+        data['offset'] = exc.offset
+    return JsonResponse(data, status=exc.status)
+
+@login_required
+@require_POST
+def upload_session_create(request, course_id):
+    """Open a resumable upload session (see videos/uploads.py)"""
+    course = get_object_or_404(Course, id=course_id)
+    if request.user != course.teacher:
+        return JsonResponse({'error': 'You can only upload videos to your own courses.'}, status=403)
+    
+    try:
+        payload = json.loads(request.body)
+        session = uploads.create_session(
+            user=request.user,
+            course=course,
+            filename=str(payload['filename']),
+            size=int(payload['size']),
+            title=str(payload['title'])[:200],
+            description=str(payload.get('description', '')),
+            order=max(int(payload.get('order') or 0), 0),
+            sha256=str(payload.get('sha256', '')),
+        )
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'filename, size and title are required'}, status=400)
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    
+    return JsonResponse({
+        'id': str(session.id),
+        'url': reverse('upload_session', args=[session.id]),
+        'offset': session.received,
+        'chunk_size': uploads.max_chunk_size(),
+    }, status=201)
+
+@login_required
+@require_http_methods(['GET', 'HEAD', 'PATCH', 'DELETE'])
+@pin_to_primary  # a stale offset from a lagging replica would corrupt the resume
+def upload_session(request, session_id):
+    """Report the current offset, append a chunk, or abandon the upload"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
     
-    # Check if user has bookmarked this video
-    is_bookmarked = False
-    if request.user.is_authenticated:
-        is_bookmarked = Bookmark.objects.filter(user=request.user, video=video).exists()
+    if request.method == 'DELETE':
+        uploads.discard(session)
+        return HttpResponse(status=204)
+    
+    if request.method == 'PATCH':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Upload-Offset and Content-Length are required'}, status=400)
+        try:
+            data = uploads.read_chunk(request, length)
+            uploads.verify_chunk_checksum(data, request.headers.get('Upload-Checksum'))
+            offset = uploads.append_chunk(session.id, request.user, offset, data)
+        except uploads.UploadError as exc:
+            return _upload_error(exc)
+    else:
+        offset = session.received
+    
+    data = {
+        'offset': offset,
+        'size': session.total_size,
+        'status': session.status,
+    }
+    if session.video_id:
+        data['video_id'] = session.video_id
+        data['video_url'] = reverse('video_detail', args=[session.video_id])
+    response = JsonResponse(data)
+    response['Upload-Offset'] = str(offset)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+@login_required
+@require_POST
+def upload_session_finalize(request, session_id):
+    """Create the Video, or queue the checksum check and answer 202"""
+    session = get_object_or_404(UploadSession, id=session_id, user=request.user)
+    try:
+        session = uploads.finalize(session.id, request.user)
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    
+    if session.status == 'verifying':
+        return JsonResponse({
+            'status': session.status,
+            'url': reverse('upload_session', args=[session.id]),
+        }, status=202)
+    return JsonResponse({
+        'video_id': session.video_id,
+        'url': reverse('video_detail', args=[session.video_id]),
+    }, status=201)
+
+async def video_detail(request, video_id):
+    """
+    Async so that under ASGI the page doesn't tie up a worker thread while
+    it waits on the database. The async ORM still runs its queries one at a
+    time on the shared sync thread, so the lookups below are sequential;
+    the visibility check comes first so a hidden course costs no more.
+    Everything the template needs is loaded here, before rendering.
+    """
+    user = await request.auser()
+    video = await _avisible_video_or_404(user, video_id)
+    comments = await sync_to_async(comment_page)(video_id)
+    comment_count = await Comment.objects.filter(video_id=video_id).acount()
+    course_videos = await _alist(Video.objects.filter(course_id=video.course_id).order_by('order', 'created_at'))
+    # Bookmark and progress badges for the whole playlist, one query each
+    # when the template first asks
+    user_state(request, user).prime(videos=course_videos)
+    
+    if user.is_authenticated:
+        await sync_to_async(_record_video_view)(video, user)
     
     # Handle comment form
     comment_form = None
-    if request.user.is_authenticated:
+    if user.is_authenticated:
         if request.method == 'POST':
             comment_form = CommentForm(request.POST)
             if comment_form.is_valid():
                 comment = comment_form.save(commit=False)
-                comment.user = request.user
+                comment.user = user
                 comment.video = video
-                comment.save()
+                await comment.asave()
                 messages.success(request, 'Comment added successfully!')
                 return redirect('video_detail', video_id=video.id)
         else:
@@ -60,26 +185,52 @@ def video_detail(request, video_id):
     
     context = {
         'video': video,
-        'comments': comments,
-        'is_bookmarked': is_bookmarked,
+        'comments': comments.items,
+        'comments_cursor': comments.next_cursor,
+        'comment_count': comment_count,
+        'course_videos': course_videos,
         'comment_form': comment_form,
+        # Each open stream holds a worker for minutes; under WSGI (runserver,
+        # gunicorn) that is a thread per viewer, so new comments wait for a reload
+        'live_comments': isinstance(request, ASGIRequest),
     }
-    return render(request, 'videos/video_detail.html', context)
+    # Context processors and the base template still use the sync session/user
+    return await sync_to_async(render)(request, 'video/detail.html', context)
+
+async def _avisible_video_or_404(user, video_id):
+    video = await aget_object_or_404(Video.objects.select_related('course'), id=video_id)
+    if not video.course.is_visible_to(user):
+        raise Http404
+    return video
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+def _record_video_view(video, user):
+    # The counter and event buffers may flush to the database
+    video.increment_views()
+    record_event(video.course_id, video.pk, user.pk)
+
+def stream_video(request, video_id):
+    """Serve the video file with HTTP Range support for seeking"""
+    video = get_object_or_404(Video.objects.select_related('course'), id=video_id)
+    if not video.course.is_visible_to(request.user) or not video.video_file:
+        raise Http404
+    
+    return stream_file(request, video.video_file)
 
 @login_required
 @require_POST
-def toggle_bookmark(request, video_id):
-    video = get_object_or_404(Video, id=video_id)
-    bookmark, created = Bookmark.objects.get_or_create(
-        user=request.user, 
-        video=video
-    )
-    
-    if not created:
-        bookmark.delete()
+async def toggle_bookmark(request, video_id):
+    user = await request.auser()
+    video = await _avisible_video_or_404(user, video_id)
+    # Delete first: one query when removing, and no get_or_create race
+    deleted, _ = await Bookmark.objects.filter(user=user, video=video).adelete()
+    if deleted:
         bookmarked = False
         message = 'Bookmark removed'
     else:
+        await Bookmark.objects.aget_or_create(user=user, video=video)
         bookmarked = True
         message = 'Video bookmarked'
     
@@ -93,16 +244,101 @@ def toggle_bookmark(request, video_id):
     return redirect('video_detail', video_id=video.id)
 
 @login_required
-def add_comment(request, video_id):
-    video = get_object_or_404(Video, id=video_id)
+async def add_comment(request, video_id):
+    user = await request.auser()
+    video = await _avisible_video_or_404(user, video_id)
     
     if request.method == 'POST':
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
-            comment.user = request.user
+            comment.user = user
             comment.video = video
-            comment.save()
+            await comment.asave()
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse(await sync_to_async(comment_payload)(comment), status=201)
             messages.success(request, 'Comment added successfully!')
+        elif request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({'errors': form.errors}, status=400)
     
     return redirect('video_detail', video_id=video.id)
+
+def comment_feed(request, video_id):
+    """Older comments, a page at a time: ?cursor=<next_cursor from the last page>"""
+    video = get_object_or_404(Video.objects.select_related('course'), id=video_id)
+    if not video.course.is_visible_to(request.user):
+        raise Http404
+    try:
+        page = comment_page(video_id, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'comments': [comment_payload(comment) for comment in page.items],
+        'next_cursor': page.next_cursor,
+    })
+
+async def comment_stream(request, video_id):
+    """
+    Server-Sent Events: ``comment`` and ``delete`` events for one video.
+    Needs ASGI; under WSGI each open stream would hold a worker thread.
+    Browsers reconnect with Last-Event-ID and get what they missed first.
+    """
+    await _avisible_video_or_404(await request.auser(), video_id)
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        last_id = 0
+    heartbeat = getattr(settings, 'COMMENT_STREAM_HEARTBEAT', 15)
+    lifetime = getattr(settings, 'COMMENT_STREAM_MAX_SECONDS', 300)
+
+    def event(message):
+        data = json.dumps({key: value for key, value in message.items() if key != 'event'})
+        event_id = f"id: {message['id']}\n" if message['event'] == 'comment' else ''
+        return f"{event_id}event: {message['event']}\ndata: {data}\n\n"
+
+    async def events():
+        yield f'retry: {heartbeat * 1000}\n\n'
+        # Subscribe before catching up, so nothing published in between is lost
+        async with get_broker().subscribe(video_channel(video_id)) as subscription:
+            sent = last_id
+            if last_id:
+                missed = await sync_to_async(comments_after)(video_id, last_id)
+                for comment in missed:
+                    payload = await sync_to_async(comment_payload)(comment)
+                    yield event({'event': 'comment', **payload})
+                    sent = comment.pk
+            deadline = time.monotonic() + lifetime
+            while time.monotonic() < deadline:
+                message = await subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ': keep-alive\n\n'
+                elif message['event'] != 'comment' or message['id'] > sent:
+                    yield event(message)
+        # Ending the response makes the browser reconnect, which bounds how
+        # long a connection (and its subscription) can live
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+
+@login_required
+@require_POST
+def progress_heartbeat(request):
+    """Accept a batch of player heartbeats: {"events": [{"video": id, "position": seconds}, ...]}"""
+    try:
+        events = json.loads(request.body)['events']
+        max_events = getattr(settings, 'PROGRESS_MAX_EVENTS', 100)
+        if not isinstance(events, list) or len(events) > max_events:
+            raise ValueError
+        parsed = [(int(event['video']), float(event['position'])) for event in events]
+        # json.loads accepts NaN and Infinity
+        if not all(math.isfinite(position) for _, position in parsed):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"events": [{"video": id, "position": seconds}]}'}, status=400)
+    
+    for video_id, position in parsed:
+        progress.record_heartbeat(request.user.id, video_id, position)
+    return JsonResponse({'accepted': len(parsed)}, status=202)